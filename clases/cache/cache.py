@@ -0,0 +1,103 @@
+import os
+import threading
+import time
+
+from clases.config import config as c
+from clases.jobs.jobs import jobs
+from clases.log import log as l
+
+YTDLP2STRM_CONFIG = c.config('config/config.json').get_config()
+
+# Leftovers of interrupted downloads and remuxes
+partial_suffixes = ('.part', '.ytdl', '.aria2', '.temp', '.urls')
+
+
+class TempCache:
+    """
+    Size-bounded media cache for temp/.
+
+    Serving a file records its last access in the file's atime. A sweep runs
+    on a timer and whenever a job finishes: files unused for longer than
+    ytdlp2strm_temp_file_duration go first, then the least recently used ones
+    until the cache fits ytdlp2strm_temp_cache_max_mb. Files that in-flight
+    jobs are writing are pinned.
+    """
+
+    def __init__(self, config):
+        self.temp_path = os.path.join(os.getcwd(), 'temp')
+        self.max_age = int(config.get('ytdlp2strm_temp_file_duration', 86400))
+        # 0 disables the byte budget
+        self.max_bytes = int(float(config.get('ytdlp2strm_temp_cache_max_mb', 0)) * 1024 * 1024)
+        self.partial_max_age = int(config.get('ytdlp2strm_temp_partial_duration', 600))
+        self.interval = int(config.get('ytdlp2strm_temp_cache_interval', 300))
+        self.wake = threading.Event()
+        jobs.listeners.append(lambda job: self.wake.set())
+
+    def touch(self, path):
+        """Record that a cached file was just served"""
+        try:
+            os.utime(path, (time.time(), os.stat(path).st_mtime))
+        except OSError as e:
+            l.log("cache", f"Could not record access to {path}: {e}")
+
+    def last_access(self, stat):
+        return max(stat.st_atime, stat.st_mtime)
+
+    def sweep(self):
+        now = time.time()
+        pinned = jobs.pinned_paths()
+        pinned_prefixes = jobs.pinned_prefixes()
+        cached = []
+        total = 0
+
+        with os.scandir(self.temp_path) as entries:
+            for entry in entries:
+                if not entry.is_file() or entry.name == "__init__.py":
+                    continue
+                path = os.path.abspath(entry.path)
+                stat = entry.stat()
+                total += stat.st_size
+                if path in pinned or path.startswith(pinned_prefixes):
+                    continue
+
+                if entry.name.endswith(partial_suffixes):
+                    # Partial files are only abandoned once nothing writes to them
+                    if stat.st_mtime < now - self.partial_max_age:
+                        total -= self.remove(path, stat.st_size, "old temporary file")
+                elif self.last_access(stat) < now - self.max_age:
+                    total -= self.remove(path, stat.st_size, "unused video file")
+                else:
+                    cached.append((self.last_access(stat), stat.st_size, path))
+
+        if self.max_bytes and total > self.max_bytes:
+            for _, size, path in sorted(cached):
+                if total <= self.max_bytes:
+                    break
+                total -= self.remove(path, size, "least recently used video file")
+
+        if self.max_bytes and total > self.max_bytes:
+            l.log("cache", f"Temp cache holds {total} bytes, over budget, remaining files are in use")
+
+    def remove(self, path, size, reason):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            return size
+        except Exception as e:
+            l.log("cache", f"Failed to remove {path}: {e}")
+            return 0
+        l.log("cache", f"Removing {reason}: {path}")
+        return size
+
+    def run(self, stop_event):
+        while not stop_event.is_set():
+            try:
+                self.sweep()
+            except Exception as e:
+                l.log("cache", f"Error sweeping temp cache: {e}")
+            self.wake.wait(self.interval)
+            self.wake.clear()
+        l.log("cache", "Exiting temp cache thread.")
+
+
+temp_cache = TempCache(YTDLP2STRM_CONFIG)
@@ -0,0 +1,153 @@
+import json
+import os
+import random
+import threading
+import time
+from datetime import datetime
+
+from clases.log import log as l
+
+# Keep this many recent uploads per channel to estimate the upload cadence
+recent_uploads_limit = 20
+state_lock = threading.Lock()
+
+
+class Cadence:
+    """
+    Per-channel sync scheduling based on observed upload cadence.
+
+    Every plugin keeps a small JSON state file with, per channel, the last
+    check, the next check, the most recent uploads and the consecutive
+    failures. A channel that uploads hourly is checked often, a channel that
+    uploads once a year is checked rarely, and failing channels back off.
+    """
+
+    def __init__(self, platform, config=None):
+        config = config or {}
+        self.platform = platform
+        self.enabled = str(config.get('adaptive_sync', False)).lower() == 'true'
+        self.min_interval = int(config.get('adaptive_min_interval', 3600))
+        self.max_interval = int(config.get('adaptive_max_interval', 604800))
+        self.jitter = float(config.get('adaptive_jitter', 0.1))
+        # Check a channel this many times per expected upload gap
+        self.checks_per_upload = float(config.get('adaptive_checks_per_upload', 2))
+        self.state_file = os.path.join('logs', f'cadence_{platform}.json')
+        self.state = self.load_state()
+
+    def load_state(self):
+        try:
+            with open(self.state_file, 'r', encoding='utf-8') as file:
+                state = json.load(file)
+            return state if isinstance(state, dict) else {}
+        except FileNotFoundError:
+            return {}
+        except Exception as e:
+            l.log("cadence", f"Error reading {self.state_file}: {e}")
+            return {}
+
+    def save_state(self, channel):
+        """
+        Write the state of one channel. Other jobs of the same platform run
+        concurrently with their own instance, so the file is read again and
+        only this channel is replaced, keeping what they saved meanwhile.
+        """
+        temp_file = f"{self.state_file}.tmp"
+        try:
+            with state_lock:
+                channel_state = self.state[channel]
+                self.state = self.load_state()
+                self.state[channel] = channel_state
+                os.makedirs(os.path.dirname(self.state_file), exist_ok=True)
+                with open(temp_file, 'w', encoding='utf-8') as file:
+                    json.dump(self.state, file, indent=4)
+                os.replace(temp_file, self.state_file)
+        except Exception as e:
+            l.log("cadence", f"Error saving {self.state_file}: {e}")
+
+    def is_due(self, channel, now=None):
+        if not self.enabled:
+            return True
+        now = now or time.time()
+        next_check = self.state.get(channel, {}).get('next_check')
+        return next_check is None or next_check <= now
+
+    def due_channels(self, channels):
+        """Filter a channel list down to the channels that should be synced now"""
+        if not self.enabled:
+            return list(channels)
+
+        due = [channel for channel in channels if self.is_due(channel)]
+        skipped = len(channels) - len(due)
+        if skipped:
+            l.log("cadence", f"{self.platform}: {len(due)} channels due, {skipped} not due yet")
+        return due
+
+    def mean_upload_interval(self, channel):
+        uploads = sorted(self.state.get(channel, {}).get('recent_uploads', {}).values())
+        if len(uploads) < 2:
+            return None
+        return (uploads[-1] - uploads[0]) / (len(uploads) - 1)
+
+    def next_interval(self, channel):
+        channel_state = self.state.get(channel, {})
+        mean_interval = self.mean_upload_interval(channel)
+
+        if mean_interval is None:
+            # Unknown cadence, stay fresh until there is enough history
+            interval = self.min_interval
+        else:
+            interval = mean_interval / self.checks_per_upload
+
+            # A channel overdue compared to its usual cadence is checked sooner
+            last_upload = channel_state.get('last_upload')
+            if last_upload and time.time() - last_upload > mean_interval:
+                interval = min(interval, max(self.min_interval, mean_interval / (2 * self.checks_per_upload)))
+
+        failures = channel_state.get('failures', 0)
+        if failures:
+            interval = self.min_interval * (2 ** min(failures, 10))
+
+        interval = min(max(interval, self.min_interval), self.max_interval)
+        if self.jitter:
+            interval *= 1 + random.uniform(-self.jitter, self.jitter)
+        return interval
+
+    def record_sync(self, channel, uploads=None):
+        """
+        Record a successful sync. uploads is an iterable of (video_id, upload_date)
+        with upload_date as YYYYMMDD, the format yt-dlp prints.
+        """
+        now = time.time()
+        channel_state = self.state.setdefault(channel, {})
+        recent_uploads = channel_state.setdefault('recent_uploads', {})
+
+        for video_id, upload_date in uploads or []:
+            try:
+                recent_uploads[video_id] = datetime.strptime(str(upload_date), '%Y%m%d').timestamp()
+            except (TypeError, ValueError):
+                continue
+
+        if len(recent_uploads) > recent_uploads_limit:
+            newest = sorted(recent_uploads.items(), key=lambda item: item[1], reverse=True)[:recent_uploads_limit]
+            channel_state['recent_uploads'] = recent_uploads = dict(newest)
+
+        if recent_uploads:
+            channel_state['last_upload'] = max(recent_uploads.values())
+        channel_state['mean_upload_interval'] = self.mean_upload_interval(channel)
+        channel_state['failures'] = 0
+        channel_state['last_check'] = now
+        channel_state['next_check'] = now + self.next_interval(channel)
+        self.save_state(channel)
+
+        if self.enabled:
+            next_check = datetime.fromtimestamp(channel_state['next_check']).strftime('%Y-%m-%d %H:%M:%S')
+            l.log("cadence", f"{self.platform}: next check for {channel} at {next_check}")
+
+    def record_failure(self, channel):
+        now = time.time()
+        channel_state = self.state.setdefault(channel, {})
+        channel_state['failures'] = channel_state.get('failures', 0) + 1
+        channel_state['last_check'] = now
+        channel_state['next_check'] = now + self.next_interval(channel)
+        self.save_state(channel)
+        l.log("cadence", f"{self.platform}: sync failed for {channel} ({channel_state['failures']} in a row)")
@@ -1,15 +1,150 @@
+import copy
 import json
 import os
 import shutil
+import threading
+import time
 from pathlib import Path
 
 from clases.log import log as l
 
 
+class ConfigStore:
+    """
+    Process-wide cache of parsed config, channel and cron files.
+
+    Files are keyed by absolute path and parser and revalidated by mtime,
+    size and inode on every lookup, so a lookup costs one stat until the
+    file is edited. Every reparse bumps version so models built from the
+    files can tell. Long-running components subscribe to a file to be
+    called with its new contents when it changes; a background thread
+    checks subscribed files every poll_interval seconds.
+    """
+
+    poll_interval = 5
+
+    def __init__(self):
+        self.entries = {}
+        self.version = 0
+        self.subscribers = {}
+        self.lock = threading.Lock()
+        self.poller = None
+
+    @staticmethod
+    def signature(path):
+        try:
+            stat = os.stat(path)
+            return stat.st_mtime_ns, stat.st_size, stat.st_ino
+        except OSError:
+            return None
+
+    def get(self, path, parse):
+        """parse(path), cached until the file changes. Shared between callers so treat it as read-only"""
+        key = (os.path.abspath(path), parse)
+        # Taken before reading, an edit landing meanwhile is picked up by the next lookup
+        signature = self.signature(key[0])
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry and entry[0] == signature:
+                return entry[1]
+
+        value = parse(key[0])
+        with self.lock:
+            self.entries[key] = (signature, value)
+            self.version += 1
+        return value
+
+    def load(self, path):
+        """Parsed contents of a config file, created from its example when missing"""
+        path = os.path.abspath(path)
+        with self.lock:
+            entry = self.entries.get((path, read_config_file))
+            callbacks = list(self.subscribers.get(path, ()))
+
+        data = self.get(path, read_config_file)
+        if entry and data is not entry[1] and data is not None and data != entry[1]:
+            l.log("config", f"{path} changed, applying it")
+            for callback in callbacks:
+                try:
+                    callback(copy.deepcopy(data))
+                except Exception as e:
+                    l.log("config", f"Error applying changes of {path}: {e}")
+        return data
+
+    def subscribe(self, path, callback):
+        """Call callback(data) whenever the parsed contents of path change"""
+        path = os.path.abspath(path)
+        self.load(path)
+        with self.lock:
+            self.subscribers.setdefault(path, []).append(callback)
+            if not self.poller:
+                self.poller = threading.Thread(target=self.poll, daemon=True)
+                self.poller.start()
+
+    def poll(self):
+        while True:
+            time.sleep(self.poll_interval)
+            with self.lock:
+                paths = list(self.subscribers)
+            for path in paths:
+                self.load(path)
+
+
+def read_config_file(config_file_path):
+    """
+    Load configuration from file with example file fallback.
+    Extracted to avoid code duplication.
+    """
+    config_file_path = Path(config_file_path)
+
+    # Check if config file exists
+    if config_file_path.exists():
+        try:
+            with open(config_file_path, "r") as file:
+                return json.load(file)
+        except (json.JSONDecodeError, IOError) as e:
+            l.log("config", f"Error reading config file {config_file_path}: {e}")
+            return None
+    else:
+        # Generate example config file name
+        example_config_file = config_file_path.parent / (config_file_path.stem + ".example.json")
+
+        # Check if example file exists
+        if example_config_file.exists():
+            log_text = f"No {config_file_path} detected, Building a copy from {example_config_file}. Please check this in config folder"
+            l.log("config", log_text)
+
+            try:
+                # Ensure the config directory exists
+                config_file_path.parent.mkdir(parents=True, exist_ok=True)
+
+                # Copy example to actual config
+                shutil.copyfile(example_config_file, config_file_path)
+
+                # Read the newly created config file
+                with open(config_file_path, "r") as file:
+                    return json.load(file)
+
+            except (IOError, json.JSONDecodeError) as e:
+                l.log("config", f"Error creating/reading config from example: {e}")
+                return None
+        else:
+            l.log("config", f"Neither config file {config_file_path} nor example file {example_config_file} found")
+            return None
+
+
+store = ConfigStore()
+# Resolved once, every config object used to walk the filesystem for it
+app_base_dir = None
+
+
 class config:
     def __init__(self, config_file=None):
         # Get the app base directory first
-        self.app_base_dir = self._get_app_base_dir()
+        global app_base_dir
+        if app_base_dir is None:
+            app_base_dir = self._get_app_base_dir()
+        self.app_base_dir = app_base_dir
 
         # Handle config file path
         if config_file is None:
@@ -81,46 +216,12 @@ class config:
         return self.app_base_dir / relative_path
 
     def _load_config_file(self, config_file_path):
-        """
-        Load configuration from file with example file fallback.
-        Extracted to avoid code duplication.
-        """
-        config_file_path = Path(config_file_path)
-
-        # Check if config file exists
-        if config_file_path.exists():
-            try:
-                with open(config_file_path, "r") as file:
-                    return json.load(file)
-            except (json.JSONDecodeError, IOError) as e:
-                l.log("config", f"Error reading config file {config_file_path}: {e}")
-                return None
-        else:
-            # Generate example config file name
-            example_config_file = config_file_path.parent / (config_file_path.stem + ".example.json")
-
-            # Check if example file exists
-            if example_config_file.exists():
-                log_text = f"No {config_file_path} detected, Building a copy from {example_config_file}. Please check this in config folder"
-                l.log("config", log_text)
+        """Configuration from the shared store, a copy the caller may modify"""
+        return copy.deepcopy(store.load(Path(config_file_path)))
 
-                try:
-                    # Ensure the config directory exists
-                    config_file_path.parent.mkdir(parents=True, exist_ok=True)
-
-                    # Copy example to actual config
-                    shutil.copyfile(example_config_file, config_file_path)
-
-                    # Read the newly created config file
-                    with open(config_file_path, "r") as file:
-                        return json.load(file)
-
-                except (IOError, json.JSONDecodeError) as e:
-                    l.log("config", f"Error creating/reading config from example: {e}")
-                    return None
-            else:
-                l.log("config", f"Neither config file {config_file_path} nor example file {example_config_file} found")
-                return None
+    def subscribe(self, callback):
+        """Call callback(data) whenever this file changes on disk"""
+        store.subscribe(self.config_file, callback)
 
     def get_config(self):
         """Get the main configuration"""
@@ -58,6 +58,8 @@ import argparse
 import sys
 import signal
 import json
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
 from pathlib import Path
 
 # Add the root directory to Python path to find modules
@@ -106,6 +108,50 @@ def setup_signal_handlers():
 # Always use project root directory for config files
 project_root = Path(__file__).resolve().parents[2]  # Go up 2 levels from clases/cron/
 config_path = os.path.join(project_root, 'config', 'crons.json')
+cron_state_path = os.path.join(project_root, 'logs', 'cron_status.json')
+
+# Upper bound for a single scheduler sleep so config reloads and shutdown are noticed
+max_idle_wait = 60
+cron_state_lock = threading.Lock()
+
+
+def get_job_key(do_command):
+    """Stable identifier for a cron command, used for overlap checks and persisted state"""
+    if isinstance(do_command, list):
+        return ' '.join(str(part) for part in do_command)
+    return str(do_command)
+
+
+def load_cron_state(state_file_path=None):
+    """Load persisted per-job state (last run, duration, result, next run)"""
+    if state_file_path is None:
+        state_file_path = cron_state_path
+
+    try:
+        with open(state_file_path, 'r') as f:
+            state = json.load(f)
+        return state if isinstance(state, dict) else {}
+    except FileNotFoundError:
+        return {}
+    except Exception as e:
+        l.log('cron', f"Error reading cron state {state_file_path}: {str(e)}")
+        return {}
+
+
+def save_cron_state(state, state_file_path=None):
+    """Persist per-job state atomically so readers never see a partial file"""
+    if state_file_path is None:
+        state_file_path = cron_state_path
+
+    temp_file = f"{state_file_path}.tmp"
+    try:
+        with cron_state_lock:
+            os.makedirs(os.path.dirname(state_file_path), exist_ok=True)
+            with open(temp_file, 'w') as f:
+                json.dump(state, f, indent=4)
+            os.replace(temp_file, state_file_path)
+    except Exception as e:
+        l.log('cron', f"Error saving cron state {state_file_path}: {str(e)}")
 
 
 def calculate_hash(file_path):
@@ -201,22 +247,50 @@ def validate_cron_file(config_file_path):
         return False
 
 
-def get_cron_status():
-    """Get current status of cron jobs"""
+def get_cron_status(state_file_path=None):
+    """Get current status of cron jobs, merging live schedule with persisted run data"""
+    state = load_cron_state(state_file_path)
     jobs = schedule.get_jobs()
     status = {
         'total_jobs': len(jobs),
         'jobs': []
     }
 
+    seen = set()
     for job in jobs:
+        job_key = next(iter(job.tags), str(job.job_func))
+        seen.add(job_key)
+        job_state = state.get(job_key, {})
         job_info = {
+            'job': job_key,
             'next_run': str(job.next_run),
             'interval': str(job.interval),
-            'job_func': str(job.job_func)
+            'job_func': str(job.job_func),
+            'running': job_state.get('running', False),
+            'last_run': job_state.get('last_run'),
+            'last_duration': job_state.get('last_duration'),
+            'last_result': job_state.get('last_result'),
+            'skipped_runs': job_state.get('skipped_runs', 0)
         }
         status['jobs'].append(job_info)
 
+    # Outside the scheduler process (e.g. --status) only persisted data is available
+    for job_key, job_state in state.items():
+        if job_key in seen:
+            continue
+        status['jobs'].append({
+            'job': job_key,
+            'next_run': job_state.get('next_run'),
+            'interval': job_state.get('interval'),
+            'job_func': job_key,
+            'running': job_state.get('running', False),
+            'last_run': job_state.get('last_run'),
+            'last_duration': job_state.get('last_duration'),
+            'last_result': job_state.get('last_result'),
+            'skipped_runs': job_state.get('skipped_runs', 0)
+        })
+    status['total_jobs'] = len(status['jobs'])
+
     l.log('cron', f"Cron status retrieved: {status['total_jobs']} jobs")
     return status
 
@@ -235,9 +309,14 @@ def print_cron_status():
 
     print(f"\n📋 Scheduled Jobs:")
     for i, job in enumerate(status['jobs'], 1):
-        print(f"   {i}. Next Run: {job['next_run']}")
+        print(f"   {i}. Job: {job['job']}")
+        print(f"      Next Run: {job['next_run']}")
         print(f"      Interval: {job['interval']}")
-        print(f"      Function: {job['job_func']}")
+        print(f"      Running: {job['running']}")
+        print(f"      Last Run: {job['last_run']}")
+        print(f"      Last Duration: {job['last_duration']}")
+        print(f"      Last Result: {job['last_result']}")
+        print(f"      Skipped Runs: {job['skipped_runs']}")
         print()
 
 
@@ -249,7 +328,22 @@ class Cron(threading.Thread):
         self.config_hash = None
         self.default_tz = None
         self.config_file_path = config_file_path or config_path
+
+        ytdlp2strm_config = c.config(os.path.join(project_root, 'config', 'config.json')).get_config() or {}
+        self.max_workers = self.validate_quantity(ytdlp2strm_config.get('ytdlp2strm_cron_max_workers', 2))
+        self.overlap_policy = ytdlp2strm_config.get('ytdlp2strm_cron_overlap', 'skip')
+        self.executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='cron-job')
+        self.running_jobs = {}
+        self.pending_reruns = set()
+        self.jobs_lock = threading.RLock()
+        self.state = load_cron_state()
+
+        # Anything marked running belongs to a previous process that did not finish
+        for job_state in self.state.values():
+            job_state['running'] = False
+
         l.log('cron', f"Cron thread initialized with config: {self.config_file_path}")
+        l.log('cron', f"Job executor: {self.max_workers} workers, overlap policy '{self.overlap_policy}'")
 
     def run(self):
         """Main run method - entry point for cron thread"""
@@ -362,35 +456,25 @@ class Cron(threading.Thread):
             return False
 
         do_command = self.prepare_command(cron_config['do'])
+        job_key = get_job_key(do_command)
         at_time = cron_config.get('at', '')
 
         try:
             if at_time and at_time.strip() and self.validate_time_format(at_time):
                 # Schedule job at specific time
-                if isinstance(do_command, list):
-                    job = every_method.at(at_time, local_tz_str).do(main_cli, *do_command)
-                else:
-                    job = every_method.at(at_time, local_tz_str).do(main_cli, do_command)
+                every_method.at(at_time, local_tz_str).do(self.submit_job, job_key, do_command).tag(job_key)
                 l.log('cron', f"Scheduled task {do_command} at {at_time} {local_tz_str}")
             else:
                 # Schedule job at interval
-                if isinstance(do_command, list):
-                    job = every_method.do(main_cli, *do_command)
-                else:
-                    job = every_method.do(main_cli, do_command)
+                every_method.do(self.submit_job, job_key, do_command).tag(job_key)
                 l.log('cron', f"Scheduled task {do_command} every {qty} {cron_config['every']}")
 
-            # Optional immediate execution
+            self.update_job_state(job_key, interval=f"{qty} {cron_config['every']}")
+
+            # Optional immediate execution, handed to the executor like any other run
             if is_first_run:
                 l.log('cron', f"Running first-time task immediately: {do_command}")
-                try:
-                    if isinstance(do_command, list):
-                        main_cli(*do_command)
-                    else:
-                        main_cli(do_command)
-                    l.log('cron', f"Immediate execution complete for: {do_command}")
-                except Exception as e:
-                    l.log('cron', f"Immediate execution error: {str(e)}")
+                self.submit_job(job_key, do_command)
 
             return True
 
@@ -401,10 +485,8 @@ class Cron(threading.Thread):
     def schedule_at_time(self, every_method, do_command, at_time, local_tz_str):
         """Schedule job at specific time"""
         try:
-            if isinstance(do_command, list):
-                every_method.at(at_time, local_tz_str).do(main_cli, *do_command)
-            else:
-                every_method.at(at_time, local_tz_str).do(main_cli, do_command)
+            job_key = get_job_key(do_command)
+            every_method.at(at_time, local_tz_str).do(self.submit_job, job_key, do_command).tag(job_key)
             l.log('cron', f"Scheduled task {do_command} at {at_time} {local_tz_str}")
             return True
         except Exception as e:
@@ -414,16 +496,79 @@ class Cron(threading.Thread):
     def schedule_interval(self, every_method, do_command, qty, every_unit):
         """Schedule job at interval"""
         try:
-            if isinstance(do_command, list):
-                every_method.do(main_cli, *do_command)
-            else:
-                every_method.do(main_cli, do_command)
+            job_key = get_job_key(do_command)
+            every_method.do(self.submit_job, job_key, do_command).tag(job_key)
             l.log('cron', f"Scheduled task {do_command} every {qty} {every_unit}")
             return True
         except Exception as e:
             l.log('cron', f"Error scheduling interval job: {str(e)}")
             return False
 
+    def submit_job(self, job_key, do_command):
+        """Hand a due job to the executor unless a previous run of it is still going"""
+        with self.jobs_lock:
+            future = self.running_jobs.get(job_key)
+            if future is not None and not future.done():
+                skipped_runs = self.state.get(job_key, {}).get('skipped_runs', 0) + 1
+                if self.overlap_policy == 'coalesce':
+                    self.pending_reruns.add(job_key)
+                    l.log('cron', f"Job {job_key} still running, coalescing into a single follow-up run")
+                else:
+                    l.log('cron', f"Job {job_key} still running, skipping this run")
+                self.update_job_state(job_key, skipped_runs=skipped_runs)
+                return
+
+            try:
+                self.running_jobs[job_key] = self.executor.submit(self.execute_job, job_key, do_command)
+            except RuntimeError as e:
+                # Executor already shut down
+                l.log('cron', f"Could not submit job {job_key}: {str(e)}")
+                return
+
+            self.update_job_state(job_key, running=True)
+
+    def execute_job(self, job_key, do_command):
+        """Run a single job on an executor thread and record how it went"""
+        started = time.time()
+        l.log('cron', f"Job started: {job_key}")
+        self.update_job_state(job_key, running=True, last_run=datetime.now().isoformat())
+
+        try:
+            if isinstance(do_command, list):
+                status = main_cli(*do_command)
+            else:
+                status = main_cli(do_command)
+            # main_cli reports plugin errors through its exit status instead of raising
+            result = 'success' if not status else f"error: exit status {status}"
+        except Exception as e:
+            result = f"error: {str(e)}"
+            l.log('cron', f"Job {job_key} failed: {str(e)}")
+
+        duration = round(time.time() - started, 3)
+        l.log('cron', f"Job finished: {job_key} in {duration}s ({result})")
+        self.update_job_state(job_key, running=False, last_duration=duration, last_result=result)
+
+        with self.jobs_lock:
+            if job_key in self.pending_reruns and not self.stop_event.is_set():
+                self.pending_reruns.discard(job_key)
+                try:
+                    self.running_jobs[job_key] = self.executor.submit(self.execute_job, job_key, do_command)
+                    self.update_job_state(job_key, running=True)
+                except RuntimeError:
+                    pass
+
+    def update_job_state(self, job_key, **values):
+        """Update persisted state for a job and refresh its next run time"""
+        with self.jobs_lock:
+            job_state = self.state.setdefault(job_key, {})
+            job_state.update(values)
+
+            for job in schedule.get_jobs(job_key):
+                if job.next_run:
+                    job_state['next_run'] = job.next_run.isoformat()
+
+            save_cron_state(self.state)
+
     def schedule_tasks(self, is_first_run=False):
         """Schedule all tasks from configuration"""
         l.log('cron', "Starting task scheduling process")
@@ -448,6 +593,14 @@ class Cron(threading.Thread):
         # Clear existing jobs
         self.clear_existing_jobs()
 
+        # Forget state of jobs that are no longer configured
+        configured_keys = {get_job_key(self.prepare_command(cron_config['do']))
+                           for cron_config in crons if 'do' in cron_config}
+        with self.jobs_lock:
+            for job_key in list(self.state):
+                if job_key not in configured_keys and not self.state[job_key].get('running'):
+                    del self.state[job_key]
+
         # Schedule new jobs
         successful_jobs = 0
         failed_jobs = 0
@@ -482,7 +635,7 @@ class Cron(threading.Thread):
         try:
             while not self.stop_event.is_set():
                 self.check_and_run_pending()
-                self.stop_event.wait(60)
+                self.stop_event.wait(self.seconds_until_next_run())
         except KeyboardInterrupt:
             l.log('cron', "Cron execution interrupted by user")
         except Exception as e:
@@ -492,20 +645,33 @@ class Cron(threading.Thread):
 
         l.log('cron', "Cron execution loop stopped")
 
+    def seconds_until_next_run(self):
+        """Seconds to sleep until the next job is due, capped by max_idle_wait"""
+        idle_seconds = schedule.idle_seconds()
+        if idle_seconds is None:
+            return max_idle_wait
+        return min(max(idle_seconds, 0), max_idle_wait)
+
     def check_and_run_pending(self):
-        """Check and run any pending scheduled jobs"""
-        pending_jobs = schedule.get_jobs()
-        if pending_jobs:
-            l.log('cron', f"Checking {len(pending_jobs)} scheduled jobs")
+        """Submit any due scheduled jobs to the executor"""
+        due_jobs = [job for job in schedule.get_jobs() if job.should_run]
+        if not due_jobs:
+            return
 
+        l.log('cron', f"Submitting {len(due_jobs)} due jobs")
         try:
             schedule.run_pending()
         except Exception as e:
             l.log('cron', f"Error running pending jobs: {str(e)}")
 
+        for job in due_jobs:
+            for job_key in job.tags:
+                self.update_job_state(job_key)
+
     def cleanup_resources(self):
         """Clean up resources"""
         l.log('cron', "Cleaning up cron resources")
+        self.executor.shutdown(wait=False, cancel_futures=True)
         if self.observer:
             self.observer.stop()
             self.observer.join()
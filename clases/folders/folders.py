@@ -1,18 +1,15 @@
 import os
 import time
 import platform
+from clases.cache.cache import temp_cache
 from clases.config import config as c
 from clases.log import log as l
+from clases.metrics.metrics import metrics
 from pathlib import Path
 YTDLP2STRM_CONFIG = c.config('config/config.json').get_config()
 
 class Folders:
 
-    keep_downloaded = 86400
-    temp_aria2_ffmpeg_files = 600
-    if 'ytdlp2strm_temp_file_duration' in YTDLP2STRM_CONFIG:
-        keep_downloaded = int(YTDLP2STRM_CONFIG['ytdlp2strm_temp_file_duration'])
-
     def make_clean_folder(self, folder_path, forceclean, config):
         if os.path.exists(folder_path):
             if forceclean or config.get("ytdlp2strm_keep_old_strm") == "False":
@@ -52,6 +49,7 @@ class Folders:
                 # Write to file with UTF-8 encoding
                 with open(file_path, "w", encoding="utf-8") as file:
                     file.write(content.replace('\n',''))
+                metrics.item_written(file_path)
                 
                 file_path = file_path.encode('utf-8').decode('utf-8')
                 log_text = f"File created: {file_path}"
@@ -69,6 +67,7 @@ class Folders:
                 # Write to file with UTF-8 encoding
                 with open(file_path, "w", encoding="utf-8") as file:
                     file.write(content)
+                metrics.item_written(file_path)
                 
                 file_path = file_path.encode('utf-8').decode('utf-8')
                 log_text = f"File created: {file_path}"
@@ -104,31 +103,4 @@ class Folders:
         return stat.st_mtime
     
     def clean_old_videos(self, stop_event):
-
-        while not stop_event.is_set():
-            try:
-                time.sleep(5)
-                path = os.getcwd()
-                temp_path = os.path.join(path, 'temp')
-                now = time.time()
-                aria2_ffmpeg_files = ['.part', 'aria2', 'urls', '.temp', 'm4a', '.ytdl']
-
-                for f in os.listdir(temp_path):
-                    temp_file = os.path.join(temp_path, f)
-                    if not f == "__init__.py":
-                        if any(keyword in f for keyword in aria2_ffmpeg_files):
-                            if os.path.isfile(temp_file) and self.modified_date(temp_file) < now - self.temp_aria2_ffmpeg_files:
-                                log_text = (f"Removing old temporary file: {temp_file}")
-                                l.log("folder", log_text)
-                                os.remove(temp_file)
-                        else:
-                            if os.path.isfile(temp_file) and self.modified_date(temp_file) < now - self.keep_downloaded:
-                                log_text = (f"Removing old video file: {temp_file}")
-                                l.log("folder", log_text)
-                                os.remove(temp_file)
-            except Exception as e:
-                log_text = (f"Error in clean_old_videos: {e}")
-                l.log("folder", log_text)
-                continue
-        log_text = ("Exiting clean_old_videos thread.")
-        l.log("folder", log_text)
+        temp_cache.run(stop_event)
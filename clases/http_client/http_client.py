@@ -0,0 +1,127 @@
+import threading
+import time
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from clases.config import config as c
+from clases.log import log as l
+
+YTDLP2STRM_CONFIG = c.config('config/config.json').get_config()
+
+
+class TimedAdapter(HTTPAdapter):
+    """HTTPAdapter that applies the default timeout and records how long each request took"""
+
+    def __init__(self, client, **kwargs):
+        self.client = client
+        super().__init__(**kwargs)
+
+    def send(self, request, timeout=None, **kwargs):
+        if timeout is None:
+            timeout = self.client.timeout
+        started = time.monotonic()
+        try:
+            response = super().send(request, timeout=timeout, **kwargs)
+        except Exception:
+            self.client.record(request.url, time.monotonic() - started, error=True)
+            raise
+        self.client.record(request.url, time.monotonic() - started, error=response.status_code >= 500)
+        return response
+
+
+class HttpClient:
+    """
+    Shared HTTP client for plugins and NFO artwork.
+
+    Sessions are pooled per proxy and keep connections alive per host, so
+    repeated calls to the same API skip the TCP and TLS handshake. Every
+    request gets a connect/read timeout unless the caller passes one, and
+    idempotent requests are retried with backoff on connection errors and
+    429/5xx answers. Timings are kept per host and slow requests are logged.
+    """
+
+    def __init__(self, config):
+        self.timeout = (
+            float(config.get('ytdlp2strm_http_connect_timeout', 5)),
+            float(config.get('ytdlp2strm_http_read_timeout', 30))
+        )
+        self.retries = int(config.get('ytdlp2strm_http_retries', 3))
+        self.backoff = float(config.get('ytdlp2strm_http_backoff', 0.5))
+        # Connections kept alive per host, and hosts kept per session
+        self.pool_size = int(config.get('ytdlp2strm_http_pool_size', 10))
+        self.pool_hosts = int(config.get('ytdlp2strm_http_pool_hosts', 20))
+        self.slow_seconds = float(config.get('ytdlp2strm_http_slow_seconds', 5))
+        self.sessions = {}
+        self.lock = threading.Lock()
+        self.stats = {}
+        self.stats_lock = threading.Lock()
+
+    @staticmethod
+    def proxy_for(config):
+        """Proxy URL a plugin config asks for, http_get_proxy taking precedence over proxy"""
+        if not config:
+            return None
+        for enabled, url in (('http_get_proxy', 'http_get_proxy_url'), ('proxy', 'proxy_url')):
+            if str(config.get(enabled, False)).lower() == 'true' and config.get(url):
+                return config[url]
+        return None
+
+    def session(self, config=None):
+        """Pooled session, behind the proxy set in a plugin config if any"""
+        proxy = self.proxy_for(config)
+        with self.lock:
+            session = self.sessions.get(proxy)
+            if session:
+                return session
+
+            session = requests.Session()
+            adapter = TimedAdapter(
+                self,
+                pool_connections=self.pool_hosts,
+                pool_maxsize=self.pool_size,
+                max_retries=Retry(
+                    total=self.retries,
+                    # A read timeout is not retried, a hung host would cost it several times over
+                    read=False,
+                    backoff_factor=self.backoff,
+                    status_forcelist=(429, 500, 502, 503, 504),
+                    raise_on_status=False
+                )
+            )
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
+            if proxy:
+                session.proxies = {'http': proxy, 'https': proxy}
+            self.sessions[proxy] = session
+            return session
+
+    def get(self, url, **kwargs):
+        return self.session().get(url, **kwargs)
+
+    def head(self, url, **kwargs):
+        return self.session().head(url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.session().post(url, **kwargs)
+
+    def record(self, url, elapsed, error=False):
+        host = urlsplit(url).hostname or ''
+        with self.stats_lock:
+            stats = self.stats.setdefault(host, {'requests': 0, 'errors': 0, 'seconds': 0.0, 'max_seconds': 0.0})
+            stats['requests'] += 1
+            stats['errors'] += int(error)
+            stats['seconds'] += elapsed
+            stats['max_seconds'] = max(stats['max_seconds'], elapsed)
+        if elapsed >= self.slow_seconds:
+            l.log("http", f"Slow request to {host}: {elapsed:.1f}s")
+
+    def snapshot(self):
+        """Per host request counts and timings since start"""
+        with self.stats_lock:
+            return {host: dict(stats) for host, stats in self.stats.items()}
+
+
+http = HttpClient(YTDLP2STRM_CONFIG)
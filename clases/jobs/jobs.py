@@ -0,0 +1,164 @@
+import os
+import threading
+
+from clases.log import log as l
+
+# Waiters give up after this many seconds unless they pass their own timeout
+default_wait_timeout = 3600
+
+
+class Job:
+    """A unit of media work in progress, shared by every request for the same item"""
+
+    def __init__(self, platform, media_id):
+        self.platform = platform
+        self.media_id = media_id
+        self.path = None
+        self.error = None
+        # Owner specific state, e.g. a progressive remux readers attach to
+        self.data = None
+        # Files the job is writing, kept out of temp cache eviction
+        self.files = set()
+        # Same for files whose names are only known to the tool writing them
+        self.prefixes = set()
+        self.finished = threading.Event()
+
+    def pin(self, *paths):
+        self.files.update(os.path.abspath(path) for path in paths)
+
+    def pin_prefix(self, *prefixes):
+        self.prefixes.update(os.path.abspath(prefix) for prefix in prefixes)
+
+    def wait(self, timeout=default_wait_timeout):
+        """Block until the job finishes. Returns the artefact path, or None on failure or timeout"""
+        if not self.finished.wait(timeout):
+            l.log("jobs", f"Timed out waiting for {self.platform}/{self.media_id}")
+            return None
+        return self.path
+
+
+class Jobs:
+    """
+    Process-wide registry of in-flight media jobs keyed by platform and ID.
+
+    The first request for an item claims the job and does the work, later
+    requests get the same Job and block on it. Finished artefacts go into an
+    index so the next lookup is a dictionary hit instead of a directory scan.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.in_flight = {}
+        self.artefacts = {}
+        # Called with every job that finishes or fails
+        self.listeners = []
+
+    def claim(self, platform, media_id, factory=None):
+        """
+        Return (job, owner). The owner must call finish() or fail(). factory,
+        when given, builds job.data under the registry lock so attaching
+        requests never see a half-initialised job.
+        """
+        key = (platform, media_id)
+        with self.lock:
+            job = self.in_flight.get(key)
+            if job:
+                return job, False
+
+            job = Job(platform, media_id)
+            if factory:
+                job.data = factory(job)
+            self.in_flight[key] = job
+            return job, True
+
+    def finish(self, job, path=None):
+        with self.lock:
+            self.in_flight.pop((job.platform, job.media_id), None)
+            if path:
+                self.artefacts[(job.platform, job.media_id)] = path
+        job.path = path
+        job.finished.set()
+        self.notify(job)
+
+    def fail(self, job, error=None):
+        with self.lock:
+            self.in_flight.pop((job.platform, job.media_id), None)
+        job.error = error
+        job.finished.set()
+        l.log("jobs", f"Job {job.platform}/{job.media_id} failed: {error}")
+        self.notify(job)
+
+    def notify(self, job):
+        for listener in list(self.listeners):
+            try:
+                listener(job)
+            except Exception as e:
+                l.log("jobs", f"Job listener failed: {e}")
+
+    def pinned_paths(self):
+        """Files written by jobs that are still running"""
+        with self.lock:
+            return set().union(*(job.files for job in self.in_flight.values()))
+
+    def pinned_prefixes(self):
+        """Path prefixes of files written by jobs that are still running"""
+        with self.lock:
+            return tuple(set().union(*(job.prefixes for job in self.in_flight.values())))
+
+    def get(self, platform, media_id):
+        """The in-flight job for an item, or None"""
+        with self.lock:
+            return self.in_flight.get((platform, media_id))
+
+    def artefact(self, platform, media_id):
+        """Path of a finished artefact that is still on disk, or None"""
+        key = (platform, media_id)
+        with self.lock:
+            path = self.artefacts.get(key)
+        if path and not os.path.isfile(path):
+            self.forget(platform, media_id)
+            return None
+        return path
+
+    def record(self, platform, media_id, path):
+        """Index an artefact produced outside a job, e.g. found on disk at startup"""
+        with self.lock:
+            self.artefacts[(platform, media_id)] = path
+
+    def forget(self, platform, media_id):
+        with self.lock:
+            self.artefacts.pop((platform, media_id), None)
+
+    def is_known(self, platform, media_id):
+        """True when the item is being produced or already available"""
+        return self.get(platform, media_id) is not None or self.artefact(platform, media_id) is not None
+
+    def run(self, platform, media_id, target, timeout=default_wait_timeout):
+        """
+        Produce an artefact once no matter how many requests ask for it.
+        target() returns the artefact path. Returns the path, or None when the
+        job failed or the wait timed out.
+        """
+        path = self.artefact(platform, media_id)
+        if path:
+            return path
+
+        job, owner = self.claim(platform, media_id)
+        if not owner:
+            return job.wait(timeout)
+
+        try:
+            path = target()
+        except Exception as e:
+            self.fail(job, e)
+            return None
+
+        if path and os.path.isfile(path):
+            self.finish(job, path)
+            return path
+
+        self.fail(job, "no artefact produced")
+        return None
+
+
+jobs = Jobs()
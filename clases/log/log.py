@@ -2,11 +2,18 @@ import os
 import sys
 import io
 import json
+import time
 from datetime import datetime, timedelta
 from typing import Optional, Dict, Any
 
-# Set UTF-8 encoding for stdout
-sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8', line_buffering=True)
+from clases.metrics.metrics import metrics
+
+# Set UTF-8 encoding for stdout, in place when possible: a replaced wrapper
+# closes the buffer it shares with the old stream once that is collected
+if hasattr(sys.stdout, 'reconfigure'):
+    sys.stdout.reconfigure(encoding='utf-8', line_buffering=True)
+else:
+    sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8', line_buffering=True)
 
 # Try to import Enum, with fallback
 try:
@@ -130,6 +137,7 @@ class Logger:
             return
 
         message = self._format_message(level, author, text, extra_data)
+        started = time.monotonic()
 
         # Console output with colors
         colored_msg = self._colorize(message, level)
@@ -138,6 +146,9 @@ class Logger:
 
         # File output (without colors)
         self._write_to_file(message)
+
+        metrics.log_seconds.inc(time.monotonic() - started)
+        metrics.log_lines.inc(level=getattr(level, 'name', str(level)))
     # Convenience methods
     def debug(self, author: str, text: str, extra_data: Optional[Dict[str, Any]] = None):
         self.log(LogLevel.DEBUG, author, text, extra_data)
@@ -0,0 +1,292 @@
+"""
+Process metrics in the Prometheus text format, served at /metrics.
+
+Metrics are plain counters, gauges and histograms kept in dicts under one
+lock each, so recording one costs a dict update. Plugins and shared modules
+record into the metrics singleton; nothing is computed until a scrape.
+"""
+
+import bisect
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+latency_buckets = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+duration_buckets = (0.1, 0.5, 1, 5, 10, 30, 60, 300, 900, 1800, 3600, 7200)
+
+# Subprocesses are labelled by program, anything else is counted as other
+known_programs = ('yt-dlp', 'ffmpeg', 'ffprobe', 'streamlink')
+
+
+def escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{escape(value)}"' for name, value in pairs) + '}'
+
+
+def format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class Metric:
+    kind = 'untyped'
+
+    def __init__(self, name, documentation, labels=()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def key(self, labels):
+        return tuple(str(labels.get(name, '')) for name in self.labels)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        with self.lock:
+            values = dict(self.values)
+        for key, value in sorted(values.items()):
+            lines.append(f"{self.name}{format_labels(self.labels, key)} {format_value(value)}")
+        return lines
+
+
+class Counter(Metric):
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self.key(labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+
+class Gauge(Metric):
+    kind = 'gauge'
+
+    def inc(self, amount=1, **labels):
+        key = self.key(labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    def set(self, value, **labels):
+        with self.lock:
+            self.values[self.key(labels)] = value
+
+
+class Histogram(Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labels=(), buckets=latency_buckets):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        key = self.key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self.lock:
+            counts = self.values.get(key)
+            if counts is None:
+                # Per bucket counts, then the sum and the count
+                counts = self.values[key] = [0] * (len(self.buckets) + 1) + [0.0, 0]
+            counts[index] += 1
+            counts[-2] += value
+            counts[-1] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        with self.lock:
+            values = {key: list(counts) for key, counts in self.values.items()}
+        for key, counts in sorted(values.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += count
+                labels = format_labels(self.labels, key, [('le', format_value(bound))])
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = format_labels(self.labels, key)
+            lines.append(f"{self.name}_sum{labels} {format_value(counts[-2])}")
+            lines.append(f"{self.name}_count{labels} {counts[-1]}")
+        return lines
+
+
+class CountedStream:
+    """Response body that counts the bytes it hands to the server"""
+
+    def __init__(self, iterable, counter, route):
+        self.iterable = iterable
+        self.counter = counter
+        self.route = route
+
+    def __iter__(self):
+        for chunk in self.iterable:
+            self.counter.inc(len(chunk), route=self.route)
+            yield chunk
+
+    def close(self):
+        close = getattr(self.iterable, 'close', None)
+        if close:
+            close()
+
+
+class Metrics:
+    def __init__(self):
+        self.registry = []
+        self.started = time.time()
+        self.syncs = threading.local()
+        self.active_syncs = {}
+        self.active_syncs_lock = threading.Lock()
+
+        # -- HTTP
+        self.request_seconds = self.histogram(
+            'ytdlp2strm_http_request_duration_seconds',
+            'Time until the response headers were ready, by route',
+            ('route', 'method', 'status'))
+        self.active_streams = self.gauge(
+            'ytdlp2strm_active_streams',
+            'Streaming responses currently being served', ('route',))
+        self.bytes_served = self.counter(
+            'ytdlp2strm_bytes_served_total',
+            'Response body bytes sent', ('route',))
+
+        # -- SUBPROCESSES
+        self.spawns = self.counter(
+            'ytdlp2strm_subprocess_spawns_total',
+            'Subprocess launches attempted through Worker', ('program',))
+        self.subprocess_seconds = self.histogram(
+            'ytdlp2strm_subprocess_duration_seconds',
+            'Subprocess run time through Worker', ('program',), duration_buckets)
+        self.exits = self.counter(
+            'ytdlp2strm_subprocess_exits_total',
+            'Subprocess exit codes through Worker', ('program', 'code'))
+
+        # -- SYNC RUNS
+        self.sync_seconds = self.histogram(
+            'ytdlp2strm_sync_duration_seconds',
+            'Plugin sync run time', ('plugin', 'result'), duration_buckets)
+        self.items_written = self.counter(
+            'ytdlp2strm_sync_items_written_total',
+            'Library files written by sync runs', ('plugin', 'kind'))
+
+        # -- CACHES AND LOGGING
+        self.cache_requests = self.counter(
+            'ytdlp2strm_cache_requests_total',
+            'Cache lookups by result', ('cache', 'result'))
+        self.log_lines = self.counter(
+            'ytdlp2strm_log_lines_total',
+            'Log lines written', ('level',))
+        self.log_seconds = self.counter(
+            'ytdlp2strm_log_write_seconds_total',
+            'Time callers spent blocked writing log lines')
+
+    def counter(self, name, documentation, labels=()):
+        metric = Counter(name, documentation, labels)
+        self.registry.append(metric)
+        return metric
+
+    def gauge(self, name, documentation, labels=()):
+        metric = Gauge(name, documentation, labels)
+        self.registry.append(metric)
+        return metric
+
+    def histogram(self, name, documentation, labels=(), buckets=latency_buckets):
+        metric = Histogram(name, documentation, labels, buckets)
+        self.registry.append(metric)
+        return metric
+
+    ## -- HELPERS
+    @staticmethod
+    def program(command):
+        """Program label of a command given as a list or a string"""
+        if isinstance(command, (list, tuple)):
+            first = str(command[0]) if command else ''
+        else:
+            first = str(command).split(' ', 1)[0]
+        name = os.path.basename(first)
+        return name if name in known_programs else 'other'
+
+    def subprocess_finished(self, command, started, returncode):
+        program = self.program(command)
+        self.subprocess_seconds.observe(time.monotonic() - started, program=program)
+        # None when the caller stopped reading before the process ended
+        self.exits.inc(program=program, code='unknown' if returncode is None else returncode)
+
+    def cache(self, name, hit):
+        self.cache_requests.inc(cache=name, result='hit' if hit else 'miss')
+
+    @contextmanager
+    def sync(self, plugin):
+        """Time a sync run and attribute the files written meanwhile to the plugin"""
+        self.syncs.plugin = plugin
+        with self.active_syncs_lock:
+            self.active_syncs[plugin] = self.active_syncs.get(plugin, 0) + 1
+        started = time.monotonic()
+        result = 'error'
+        try:
+            yield
+            result = 'ok'
+        finally:
+            self.sync_seconds.observe(time.monotonic() - started, plugin=plugin, result=result)
+            self.syncs.plugin = None
+            with self.active_syncs_lock:
+                self.active_syncs[plugin] -= 1
+                if not self.active_syncs[plugin]:
+                    del self.active_syncs[plugin]
+
+    def item_written(self, file_path):
+        plugin = getattr(self.syncs, 'plugin', None)
+        if not plugin:
+            # Written from a helper thread of a sync, attributable while only one runs
+            with self.active_syncs_lock:
+                plugin = next(iter(self.active_syncs)) if len(self.active_syncs) == 1 else 'unknown'
+        extension = os.path.splitext(file_path)[1].lstrip('.')
+        self.items_written.inc(plugin=plugin, kind=extension if extension in ('strm', 'nfo') else 'other')
+
+    ## -- FLASK
+    def instrument(self, app):
+        """Record latency, active streams and bytes served for every route of a Flask app"""
+        from flask import g, request
+
+        @app.before_request
+        def metrics_start():
+            g.metrics_started = time.monotonic()
+
+        @app.after_request
+        def metrics_finish(response):
+            started = g.pop('metrics_started', None)
+            route = request.url_rule.rule if request.url_rule else 'unmatched'
+            if started is not None:
+                self.request_seconds.observe(
+                    time.monotonic() - started,
+                    route=route, method=request.method, status=response.status_code)
+
+            if response.is_streamed and not response.direct_passthrough:
+                self.active_streams.inc(route=route)
+                response.response = CountedStream(response.response, self.bytes_served, route)
+                response.call_on_close(lambda: self.active_streams.dec(route=route))
+            elif response.content_length:
+                self.bytes_served.inc(response.content_length, route=route)
+            return response
+
+    def render(self):
+        lines = [
+            "# HELP ytdlp2strm_uptime_seconds Seconds since the process started",
+            "# TYPE ytdlp2strm_uptime_seconds gauge",
+            f"ytdlp2strm_uptime_seconds {format_value(round(time.time() - self.started, 3))}"
+        ]
+        for metric in self.registry:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+metrics = Metrics()
@@ -4,6 +4,7 @@ import re
 from PIL import Image
 from io import BytesIO
 from clases.folders import folders as f
+from clases.http_client.http_client import http
 from clases.log import log as l
 
 class Nfo:
@@ -53,7 +54,7 @@ class Nfo:
 
     def download_image(self, url, path):
         try:
-            response = requests.get(url)
+            response = http.get(url)
             response.raise_for_status()  # Check if the request was successful
             
             # Convertir a PNG
@@ -0,0 +1,313 @@
+import hmac
+import os
+import queue
+import re
+import threading
+import time
+from urllib.parse import urlparse
+
+import requests
+from cachetools import TTLCache
+from flask import has_request_context, request
+
+from clases.config import config as c
+from clases.http_client.http_client import http
+from clases.log import log as l
+
+YTDLP2STRM_CONFIG = c.config('config/config.json').get_config()
+
+# Sent with warm-up requests to our own endpoints so they do not prefetch in turn
+prefetch_header = 'X-Ytdlp2strm-Prefetch'
+
+episode_pattern = re.compile(r'S(\d+)E(\d+)', re.IGNORECASE)
+season_folder_pattern = re.compile(r'^S\d+\b', re.IGNORECASE)
+release_date_pattern = re.compile(r'<releasedate>([^<]*)</releasedate>')
+
+
+def parse_strm_url(url):
+    """Split a STRM URL http://host:port/<platform>/<method>/<id> into its parts, or None"""
+    parts = urlparse(url.strip()).path.strip('/').split('/')
+    if len(parts) < 3:
+        return None
+    return parts[-3], parts[-2], parts[-1]
+
+
+def read_strm(path):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return f.read().strip()
+    except Exception:
+        return None
+
+
+class Prefetch:
+    """
+    Predictive next-episode prefetch.
+
+    When an episode is played through a plugin endpoint, or Jellyfin reports
+    a playback start, the next episodes in library order are warmed in the
+    background: season/episode order for SxxEyy files, upload order for
+    everything else. Plugins register a warmer per endpoint method, e.g.
+    resolving and caching the stream URL or remuxing the whole episode into
+    temp/. Download endpoints without a warmer get their first
+    ytdlp2strm_prefetch_mb pulled through our own server.
+    """
+
+    def __init__(self, config):
+        self.enabled = str(config.get('ytdlp2strm_prefetch', False)).lower() == 'true'
+        # Budget: episodes ahead, concurrent warmers and bytes per partial warm
+        self.episodes = int(config.get('ytdlp2strm_prefetch_episodes', 1))
+        self.workers = int(config.get('ytdlp2strm_prefetch_workers', 1))
+        self.max_bytes = int(float(config.get('ytdlp2strm_prefetch_mb', 64)) * 1024 * 1024)
+        self.timeout = int(config.get('ytdlp2strm_prefetch_timeout', 1800))
+        self.index_ttl = int(config.get('ytdlp2strm_prefetch_index_ttl', 900))
+        self.jellyfin_url = config.get('ytdlp2strm_jellyfin_base_url', '').rstrip('/')
+        self.jellyfin_api_key = config.get('ytdlp2strm_jellyfin_api_key', '')
+        self.webhook_token = config.get('ytdlp2strm_prefetch_webhook_token', '')
+        self.session = http.session()
+        self.media_folders = {}
+        self.warmers = {}
+        self.indexes = {}
+        self.index_lock = threading.Lock()
+        # Items played or warmed recently are not queued again
+        self.recent = TTLCache(maxsize=1000, ttl=int(config.get('ytdlp2strm_prefetch_cooldown', 3600)))
+        self.recent_lock = threading.Lock()
+        # Drop events rather than build a backlog of stale predictions
+        self.events = queue.Queue(maxsize=max(self.workers, 1) * 4)
+        self.threads = []
+        self.threads_lock = threading.Lock()
+
+    def register(self, platform, media_folder, warmers=None):
+        """
+        Make a plugin's library known to the prefetcher.
+        warmers maps an endpoint method to a callable taking the media ID.
+        """
+        self.media_folders[platform] = media_folder
+        self.warmers[platform] = warmers or {}
+
+    def start(self):
+        with self.threads_lock:
+            if self.threads:
+                return
+            for _ in range(max(self.workers, 1)):
+                thread = threading.Thread(target=self.worker, daemon=True)
+                thread.start()
+                self.threads.append(thread)
+
+    def claim_recent(self, key):
+        with self.recent_lock:
+            if key in self.recent:
+                return False
+            self.recent[key] = time.time()
+            return True
+
+    def played(self, platform, media_id):
+        """Called by plugin endpoints when an item is requested for playback"""
+        if not self.enabled or platform not in self.media_folders:
+            return
+        if has_request_context() and request.headers.get(prefetch_header):
+            return
+        if not self.claim_recent(('played', platform, media_id)):
+            return
+
+        self.start()
+        try:
+            self.events.put_nowait((platform, media_id))
+        except queue.Full:
+            l.log("prefetch", f"Prefetch queue full, not predicting after {platform}/{media_id}")
+
+    def worker(self):
+        while True:
+            platform, media_id = self.events.get()
+            try:
+                for url in self.next_episodes(platform, media_id):
+                    self.warm(url)
+            except Exception as e:
+                l.log("prefetch", f"Prefetch after {platform}/{media_id} failed: {e}")
+            finally:
+                self.events.task_done()
+
+    ## -- LIBRARY INDEX
+    def build_index(self, platform):
+        index = {}
+        for root, _, files in os.walk(self.media_folders[platform]):
+            for file_name in files:
+                if not file_name.endswith('.strm'):
+                    continue
+                path = os.path.join(root, file_name)
+                parsed = parse_strm_url(read_strm(path) or '')
+                if parsed and parsed[0] == platform:
+                    index[parsed[2]] = path
+        return index
+
+    def locate(self, platform, media_id):
+        """STRM file of an item, rebuilding a stale index or one that misses the item"""
+        with self.index_lock:
+            built_at, index = self.indexes.get(platform, (0, {}))
+            path = index.get(media_id)
+            now = time.time()
+            if path and os.path.isfile(path) and now - built_at < self.index_ttl:
+                return path
+            if now - built_at < 60:
+                # Rebuilt moments ago, the item is not in the library
+                return None
+
+            index = self.build_index(platform)
+            self.indexes[platform] = (time.time(), index)
+            return index.get(media_id)
+
+    def release_order(self, path):
+        """Upload order key: the NFO release date, file age as a tie breaker"""
+        release_date = ''
+        try:
+            with open(f"{os.path.splitext(path)[0]}.nfo", 'r', encoding='utf-8') as f:
+                match = release_date_pattern.search(f.read())
+                if match:
+                    release_date = match.group(1)
+        except Exception:
+            pass
+        try:
+            mtime = os.path.getmtime(path)
+        except OSError:
+            mtime = 0
+        return release_date, mtime
+
+    def ordered_episodes(self, strm_path):
+        folder = os.path.dirname(strm_path)
+
+        if episode_pattern.search(os.path.basename(strm_path)):
+            # Season folders sit next to each other in the series folder
+            if season_folder_pattern.match(os.path.basename(folder)):
+                folder = os.path.dirname(folder)
+            episodes = []
+            for root, _, files in os.walk(folder):
+                for file_name in files:
+                    match = episode_pattern.search(file_name)
+                    if file_name.endswith('.strm') and match:
+                        key = (int(match.group(1)), int(match.group(2)))
+                        episodes.append((key, os.path.join(root, file_name)))
+            return [path for _, path in sorted(episodes)]
+
+        # Skip live placeholders such as the Twitch !000-live entries
+        episodes = [
+            os.path.join(folder, file_name) for file_name in os.listdir(folder)
+            if file_name.endswith('.strm') and not file_name.startswith('!')
+        ]
+        return sorted(episodes, key=self.release_order)
+
+    def next_episodes(self, platform, media_id):
+        """STRM URLs of the episodes following an item in library order"""
+        strm_path = self.locate(platform, media_id)
+        if not strm_path:
+            l.log("prefetch", f"{platform}/{media_id} is not in the library, nothing to prefetch")
+            return []
+
+        episodes = self.ordered_episodes(strm_path)
+        try:
+            position = episodes.index(strm_path)
+        except ValueError:
+            return []
+
+        urls = []
+        for path in episodes[position + 1:position + 1 + self.episodes]:
+            url = read_strm(path)
+            if url:
+                urls.append(url)
+        return urls
+
+    ## -- WARMING
+    def warm(self, url):
+        parsed = parse_strm_url(url)
+        if not parsed:
+            return False
+        platform, method, media_id = parsed
+        if not self.claim_recent(('warm', platform, media_id)):
+            return False
+
+        warmer = self.warmers.get(platform, {}).get(method)
+        started = time.time()
+        if warmer:
+            l.log("prefetch", f"Warming {platform}/{method}/{media_id}")
+            warmer(media_id)
+        elif method == 'download':
+            l.log("prefetch", f"Pulling up to {self.max_bytes} bytes of {platform}/{media_id}")
+            self.warm_partial(url)
+        else:
+            # Redirect endpoints have nothing to keep unless the plugin caches the resolution
+            return False
+
+        l.log("prefetch", f"Warmed {platform}/{media_id} in {time.time() - started:.1f}s")
+        return True
+
+    def warm_partial(self, url):
+        """Read the first max_bytes of one of our own endpoints so it caches the item"""
+        received = 0
+        try:
+            with self.session.get(url, stream=True, headers={prefetch_header: '1'},
+                                  timeout=(10, self.timeout)) as response:
+                for chunk in response.iter_content(chunk_size=64 * 1024):
+                    received += len(chunk)
+                    if received >= self.max_bytes:
+                        break
+        except requests.RequestException as e:
+            l.log("prefetch", f"Error prefetching {url}: {e}")
+        return received
+
+    ## -- JELLYFIN WEBHOOK
+    def check_token(self, token):
+        """The webhook can trigger remuxes, so it is refused until a token is configured"""
+        if not self.webhook_token:
+            l.log("prefetch", "Jellyfin webhook refused, ytdlp2strm_prefetch_webhook_token is not set")
+            return False
+        return hmac.compare_digest(token.encode('utf-8'), self.webhook_token.encode('utf-8'))
+
+    def jellyfin_item_url(self, item_id, user_id=None):
+        """STRM URL behind a Jellyfin library item"""
+        if not self.jellyfin_url or not self.jellyfin_api_key:
+            l.log("prefetch", "Jellyfin webhook received but ytdlp2strm_jellyfin_base_url or api key is not set")
+            return None
+
+        if user_id:
+            item_url = f"{self.jellyfin_url}/Users/{user_id}/Items/{item_id}"
+        else:
+            item_url = f"{self.jellyfin_url}/Items/{item_id}"
+        try:
+            response = self.session.get(item_url, headers={'X-Emby-Token': self.jellyfin_api_key}, timeout=10)
+            response.raise_for_status()
+            item = response.json()
+        except (requests.RequestException, ValueError) as e:
+            l.log("prefetch", f"Error fetching Jellyfin item {item_id}: {e}")
+            return None
+
+        paths = [source.get('Path', '') for source in item.get('MediaSources') or []]
+        paths.append(item.get('Path', ''))
+        for path in paths:
+            if path.startswith('http'):
+                return path
+            if path.endswith('.strm') and os.path.isfile(path):
+                return read_strm(path)
+        return None
+
+    def jellyfin_event(self, payload):
+        """
+        Handle a Jellyfin webhook plugin notification.
+        Returns True when it led to a prefetch.
+        """
+        if not self.enabled or payload.get('NotificationType') != 'PlaybackStart':
+            return False
+
+        item_id = payload.get('ItemId')
+        if not item_id:
+            return False
+
+        url = self.jellyfin_item_url(item_id, payload.get('UserId'))
+        parsed = parse_strm_url(url) if url else None
+        if not parsed:
+            return False
+
+        platform, _, media_id = parsed
+        self.played(platform, media_id)
+        return True
+
+
+prefetch = Prefetch(YTDLP2STRM_CONFIG)
@@ -0,0 +1,65 @@
+"""
+Serving modes for the web app and its SocketIO endpoint.
+
+werkzeug is the threaded development server the app has always used, one
+OS thread per connection. gevent serves every connection from a greenlet,
+so long-lived bridge, download and remux streams cost a few KiB each while
+they wait on their subprocess, and websockets are handled by
+gevent-websocket. gevent needs the standard library patched before anything
+else is imported, which is why this module only uses json and os.
+"""
+
+import json
+import os
+
+modes = ('werkzeug', 'gevent')
+
+
+def server_mode(config_file='./config/config.json'):
+    """Serving mode from YTDLP2STRM_SERVER or ytdlp2strm_server, werkzeug by default"""
+    mode = os.environ.get('YTDLP2STRM_SERVER')
+    if not mode:
+        try:
+            with open(config_file, 'r', encoding='utf-8') as f:
+                mode = json.load(f).get('ytdlp2strm_server')
+        except Exception:
+            mode = None
+    mode = str(mode or 'werkzeug').lower()
+    return mode if mode in modes else 'werkzeug'
+
+
+def patch(mode):
+    """
+    Monkey patch the standard library for a mode.
+    Returns the mode that can actually be served, werkzeug when gevent is missing.
+    """
+    if mode != 'gevent':
+        return mode
+    try:
+        from gevent import monkey
+    except ImportError:
+        return 'werkzeug'
+    monkey.patch_all()
+    return mode
+
+
+def async_mode(mode):
+    """SocketIO async_mode matching a serving mode"""
+    return 'gevent' if mode == 'gevent' else 'threading'
+
+
+def run_options(mode, config):
+    """Keyword arguments for socketio.run in a serving mode"""
+    if mode == 'gevent':
+        from gevent.pool import Pool
+
+        # Connections beyond the limit wait in the listen backlog
+        max_connections = int(config.get('ytdlp2strm_server_max_connections', 1000))
+        return {
+            'spawn': Pool(max_connections),
+            'backlog': int(config.get('ytdlp2strm_server_backlog', 256)),
+            'log_output': False
+        }
+    return {
+        'allow_unsafe_werkzeug': True
+    }
@@ -1,41 +1,101 @@
 import os
 import subprocess
 import shlex
-import requests
 import time
-import threading
 from clases.log import log as l
-
-# Inicializa un objeto Lock para el control de concurrencia
-preload_lock = threading.Lock()
-
-# Variable de cierre para controlar la ejecución concurrente de la función preload_video
-is_preloading = False
+from clases.metrics.metrics import metrics
 
 
 class Worker:
     def __init__(self, command):
         self.command = command
         self.wd =  os.path.abspath('.')
+        self.process = None
+
+    def started(self):
+        metrics.spawns.inc(program=metrics.program(self.command))
+        return time.monotonic()
+
+    def finished(self, started, returncode):
+        metrics.subprocess_finished(self.command, started, returncode)
 
     def output(self):
+        started = self.started()
         process = subprocess.run(
             self.command,  # Unimos el comando en una cadena de texto
             #shell=True,
             capture_output=True,  # Capturamos stdout y stderr
             text=True
         )
+        self.finished(started, process.returncode)
         if process.stderr:
             if not 'The channel is not currently live' in process.stderr and not '[twitch:stream] videos: videos does not exist' in process.stderr:
                 l.log("worker", process.stderr)
         return process.stdout
     
+    def stream(self):
+        # Yields stdout lines as they are produced, stopping early kills the process
+        started = self.started()
+        process = subprocess.Popen(
+            self.command,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            text=True
+        )
+        try:
+            for line in process.stdout:
+                yield line
+        finally:
+            if process.poll() is None:
+                process.terminate()
+            self.finished(started, process.wait())
+
+    def chunks(self, chunk_size=64 * 1024):
+        # Yields binary stdout as it is produced, stopping early kills the process
+        started = self.started()
+        self.returncode = None
+        process = subprocess.Popen(
+            self.command,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL
+        )
+        try:
+            while True:
+                chunk = process.stdout.read1(chunk_size)
+                if not chunk:
+                    break
+                yield chunk
+        finally:
+            if process.poll() is None:
+                process.kill()
+            self.returncode = process.wait()
+            self.finished(started, self.returncode)
+
+    def spawn(self, **kwargs):
+        # Starts the process for callers that wire its pipes themselves, reap() records its exit
+        self.started_at = self.started()
+        self.process = subprocess.Popen(self.command, **kwargs)
+        return self.process
+
+    def reap(self):
+        if self.process is None:
+            return None
+        if self.process.poll() is None:
+            self.process.kill()
+        returncode = self.process.wait()
+        if self.started_at is not None:
+            self.finished(self.started_at, returncode)
+            self.started_at = None
+        return returncode
+
     def shell(self):
+        started = self.started()
         process = subprocess.run(
             ' '.join(self.command),  # Unimos el comando en una cadena de texto
             shell=True,
             capture_output=True  # Capturamos stdout y stderr
         )
+        self.finished(started, process.returncode)
         try:
             return process.stdout.decode('utf-8')  # Intentamos decodificar como UTF-8
         except UnicodeDecodeError:
@@ -43,24 +103,33 @@ class Worker:
 
     
     def call(self):
-        return subprocess.call(
+        started = self.started()
+        returncode = subprocess.call(
             self.command
         )
+        self.finished(started, returncode)
+        return returncode
 
 
     def run(self):
+        started = self.started()
         process = subprocess.Popen(self.command, stdout=subprocess.PIPE, shell=True)
-        while True:
-            line = process.stdout.readline().rstrip()
-            if not line:
-                break
-            try:
-                yield line.decode('utf-8')
-            except:
-                yield line.decode('latin-1')
+        try:
+            while True:
+                line = process.stdout.readline().rstrip()
+                if not line:
+                    break
+                try:
+                    yield line.decode('utf-8')
+                except:
+                    yield line.decode('latin-1')
+            process.wait()
+        finally:
+            self.finished(started, process.poll())
 
 
     def run_command(self):
+        started = self.started()
         process = subprocess.Popen(shlex.split(self.command), stdout=subprocess.PIPE)
         while True:
             try:
@@ -73,50 +142,5 @@ class Worker:
                 log_text = (output.strip())
                 l.log("worker", log_text)
         rc = process.poll()
+        self.finished(started, rc)
         return rc
-
-    def preload(self):
-        global is_preloading
-
-        current_dir = os.getcwd()
-
-        # Construyes la ruta hacia la carpeta 'temp' dentro del directorio actual
-        temp_dir = os.path.join(current_dir, 'temp')
-
-        # Intenta adquirir el Lock
-        if not preload_lock.acquire(blocking=False):
-            # Si no se puede adquirir el Lock, significa que otra instancia ya está ejecutando preload_video
-            return
-        
-        # Verifica si ya se está ejecutando la función
-        if is_preloading:
-            preload_lock.release()  # No olvides liberar el Lock si decides no proceder
-            return
-        
-        is_preloading = True  # Marca el inicio de la ejecución
-
-        def download_and_cancel():
-            try:
-                with requests.get(self.command, stream=True) as r:
-                    time.sleep(5)  # Esperamos 5 segundos y luego cancelamos la solicitud
-            except:
-                log_text = ("error on preloading {}".format(self.command))
-                l.log("worker", log_text)
-
-        video_id = self.command.split('_')[-1]
-
-        isin = False
-        # Iterar sobre todos los archivos en la carpeta 'temp'
-        for filename in os.listdir(temp_dir):
-            # Comprobar si el crunchroll_id está en el nombre del archivo
-            if video_id in filename:
-                isin = True
-                # Si necesitas hacer algo más que imprimir, este es el lugar.
-                # Por ejemplo, podrías romper el bucle con 'break' si solo te interesa saber si al menos uno existe
-
-        if not isin:
-            preload_thread = threading.Thread(target=download_and_cancel)
-            preload_thread.start()
-
-        is_preloading = False  # Restablece el estado
-        preload_lock.release()  # Libera el Lock
\ No newline at end of file
@@ -10,6 +10,7 @@ sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 try:
     import config.plugins as plugins
     from clases.log import log as l
+    from clases.metrics.metrics import metrics
     from sanitize_filename import sanitize
 except ImportError as e:
     print(f"Import error: {e}")
@@ -19,7 +20,7 @@ except ImportError as e:
 
 
 def main(*raw_args):
-    """Main CLI entry point"""
+    """Main CLI entry point, returns the exit status: 0 when the plugin ran without errors"""
     # Debug: Print all received arguments
     print(f"[CLI] Starting with args: {raw_args if raw_args else sys.argv[1:]}")
     l.log("CLI", f"Received raw_args: {raw_args}")
@@ -46,7 +47,7 @@ def main(*raw_args):
             args = parser.parse_args()
     except SystemExit:
         print("[CLI] Error parsing arguments")
-        return
+        return 2
 
     # Debug: Print parsed arguments
     print(f"[CLI] Parsed args: media={args.media}, params={args.params}")
@@ -61,13 +62,13 @@ def main(*raw_args):
         version = '1.0.1'
         print(f'ytdlp2STRM version: {version}')
         l.log("CLI", f'ytdlp2STRM version: {version}')
-        return
+        return 0
 
     # Validate method
     if not method:
         print("[CLI] ERROR: No media platform specified. Use --media <platform>")
         l.log("CLI", "ERROR: No method specified")
-        return
+        return 1
 
     # Process params
     if params:
@@ -83,55 +84,59 @@ def main(*raw_args):
     l.log("CLI", log_text)
 
     # Execute the appropriate plugin method
+    status = 0
     try:
-        if method == "youtube":
-            print(f"[CLI] Loading YouTube plugin...")
-            l.log("CLI", f"Loading YouTube plugin...")
-
-            # FIXED: Import the module, not just the function
-            from plugins.youtube import youtube as youtube_module
-
-            if params and params in ["download", "download-all"]:
-                print(f"[CLI] Executing YouTube download mode")
-                l.log("CLI", f"Calling YouTube download mode")
-                # FIXED: Call the function from the module
-                youtube_module.to_download('download')
-            else:
-                # Default to STRM mode
-                print(f"[CLI] Executing YouTube STRM mode with params: {params or 'direct'}")
-                l.log("CLI", f"Calling YouTube STRM mode with params: {params or 'direct'}")
-                # FIXED: Call the function from the module
-                youtube_module.to_strm(params or 'direct')
-
-        elif method == "twitch":
-            print(f"[CLI] Loading Twitch plugin...")
-            l.log("CLI", f"Loading Twitch plugin...")
-
-            # Import Twitch module
-            from plugins.twitch import twitch as twitch_module
-
-            print(f"[CLI] Executing Twitch with params: {params or 'direct'}")
-            twitch_module.to_strm(params or 'direct')
+        with metrics.sync(method):
+            if method == "youtube":
+                print(f"[CLI] Loading YouTube plugin...")
+                l.log("CLI", f"Loading YouTube plugin...")
+
+                # FIXED: Import the module, not just the function
+                from plugins.youtube import youtube as youtube_module
+
+                if params and params in ["download", "download-all"]:
+                    print(f"[CLI] Executing YouTube download mode")
+                    l.log("CLI", f"Calling YouTube download mode")
+                    # FIXED: Call the function from the module
+                    youtube_module.to_download('download')
+                else:
+                    # Default to STRM mode
+                    print(f"[CLI] Executing YouTube STRM mode with params: {params or 'direct'}")
+                    l.log("CLI", f"Calling YouTube STRM mode with params: {params or 'direct'}")
+                    # FIXED: Call the function from the module
+                    youtube_module.to_strm(params or 'direct')
 
-        else:
-            # Try to dynamically load the plugin
-            print(f"[CLI] Attempting to load plugin: {method}")
-            l.log("CLI", f"Attempting to load plugin: {method}")
+            elif method == "twitch":
+                print(f"[CLI] Loading Twitch plugin...")
+                l.log("CLI", f"Loading Twitch plugin...")
 
-            try:
-                # Dynamic import - FIXED: Import the module correctly
-                plugin_module = __import__(f'plugins.{method}.{method}', fromlist=[method])
+                # Import Twitch module
+                from plugins.twitch import twitch as twitch_module
 
-                if hasattr(plugin_module, 'to_strm'):
-                    print(f"[CLI] Executing {method} plugin")
-                    plugin_module.to_strm(params or 'direct')
-                else:
-                    print(f"[CLI] ERROR: Plugin {method} does not have to_strm method")
-                    l.log("CLI", f"ERROR: Plugin {method} missing to_strm method")
+                print(f"[CLI] Executing Twitch with params: {params or 'direct'}")
+                twitch_module.to_strm(params or 'direct')
 
-            except ImportError as e:
-                print(f"[CLI] ERROR: Failed to import plugin {method}: {e}")
-                l.log("CLI", f"ERROR: Failed to import plugin {method}: {e}")
+            else:
+                # Try to dynamically load the plugin
+                print(f"[CLI] Attempting to load plugin: {method}")
+                l.log("CLI", f"Attempting to load plugin: {method}")
+
+                try:
+                    # Dynamic import - FIXED: Import the module correctly
+                    plugin_module = __import__(f'plugins.{method}.{method}', fromlist=[method])
+
+                    if hasattr(plugin_module, 'to_strm'):
+                        print(f"[CLI] Executing {method} plugin")
+                        plugin_module.to_strm(params or 'direct')
+                    else:
+                        print(f"[CLI] ERROR: Plugin {method} does not have to_strm method")
+                        l.log("CLI", f"ERROR: Plugin {method} missing to_strm method")
+                        status = 1
+
+                except ImportError as e:
+                    print(f"[CLI] ERROR: Failed to import plugin {method}: {e}")
+                    l.log("CLI", f"ERROR: Failed to import plugin {method}: {e}")
+                    status = 1
 
     except Exception as e:
         error_msg = f"ERROR executing {method}: {str(e)}"
@@ -141,12 +146,14 @@ def main(*raw_args):
         # Print full traceback for debugging
         traceback.print_exc()
         l.log("CLI", f"Full traceback: {traceback.format_exc()}")
+        status = 1
 
     print(f"[CLI] Execution completed")
     l.log("CLI", "Execution completed")
+    return status
 
 
 if __name__ == "__main__":
     # Ensure output is unbuffered
     sys.stdout.flush()
-    main()
\ No newline at end of file
+    sys.exit(main())
\ No newline at end of file
@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+Concurrent stream load test.
+
+Opens many long-lived streaming requests at once and reports how many of
+them start, how long the first byte takes and how many are still flowing
+at the end. Point it at a running instance:
+
+    python3 load_test.py --url http://127.0.0.1:5000/youtube/bridge/<id> --clients 50
+
+or compare the werkzeug and gevent serving modes on a synthetic stream that
+behaves like bridge (a chunk every interval, forever):
+
+    python3 load_test.py --compare --clients 200 --duration 30
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import threading
+import time
+
+
+def serve(mode, port, chunk_kb, interval):
+    """Synthetic streaming server, run in a child process of --compare"""
+    from clases.server import server
+
+    mode = server.patch(mode)
+
+    from flask import Flask, Response
+    from flask_socketio import SocketIO
+
+    app = Flask(__name__)
+    socketio = SocketIO(app, async_mode=server.async_mode(mode))
+    chunk = b'\0' * (chunk_kb * 1024)
+
+    @app.route('/load-test/ping')
+    def ping():
+        return mode
+
+    @app.route('/load-test/stream')
+    def stream():
+        def generate():
+            while True:
+                yield chunk
+                time.sleep(interval)
+        return Response(generate(), mimetype='video/mp2t')
+
+    options = server.run_options(mode, {'ytdlp2strm_server_max_connections': 10000})
+    socketio.run(app, host='127.0.0.1', port=port, debug=False, use_reloader=False, **options)
+
+
+def run_clients(url, clients, duration, ramp, connect_timeout):
+    import requests
+
+    results = []
+    results_lock = threading.Lock()
+    stop_at = time.monotonic() + duration
+
+    def client():
+        result = {'first_byte': None, 'bytes': 0, 'alive': False, 'error': None}
+        started = time.monotonic()
+        try:
+            with requests.get(url, stream=True, timeout=(connect_timeout, 30)) as response:
+                response.raise_for_status()
+                for data in response.iter_content(chunk_size=64 * 1024):
+                    if result['first_byte'] is None:
+                        result['first_byte'] = time.monotonic() - started
+                    result['bytes'] += len(data)
+                    if time.monotonic() >= stop_at:
+                        result['alive'] = True
+                        break
+        except Exception as e:
+            result['error'] = type(e).__name__
+        with results_lock:
+            results.append(result)
+
+    threads = []
+    for _ in range(clients):
+        thread = threading.Thread(target=client, daemon=True)
+        thread.start()
+        threads.append(thread)
+        time.sleep(ramp / max(clients, 1))
+    for thread in threads:
+        thread.join(duration + connect_timeout + 60)
+
+    first_bytes = sorted(r['first_byte'] for r in results if r['first_byte'] is not None)
+    errors = {}
+    for r in results:
+        if r['error']:
+            errors[r['error']] = errors.get(r['error'], 0) + 1
+
+    return {
+        'clients': clients,
+        'started': len(first_bytes),
+        'alive': sum(1 for r in results if r['alive']),
+        'ttfb_median': statistics.median(first_bytes) if first_bytes else None,
+        'ttfb_p95': first_bytes[int(len(first_bytes) * 0.95) - 1] if first_bytes else None,
+        'mbytes': sum(r['bytes'] for r in results) / 1024 / 1024,
+        'errors': errors
+    }
+
+
+def report(label, stats, duration):
+    def seconds(value):
+        return f"{value:.2f}s" if value is not None else "-"
+
+    print(f"{label}: {stats['alive']}/{stats['clients']} streams alive after {duration}s, "
+          f"{stats['started']} started, first byte median {seconds(stats['ttfb_median'])} "
+          f"p95 {seconds(stats['ttfb_p95'])}, {stats['mbytes'] / duration:.1f} MiB/s total"
+          + (f", errors {stats['errors']}" if stats['errors'] else ""))
+
+
+def wait_ready(port, process, timeout=30):
+    import requests
+
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            return False
+        try:
+            if requests.get(f"http://127.0.0.1:{port}/load-test/ping", timeout=1).ok:
+                return True
+        except requests.RequestException:
+            time.sleep(0.2)
+    return False
+
+
+def compare(args):
+    for mode in ('werkzeug', 'gevent'):
+        process = subprocess.Popen(
+            [sys.executable, os.path.abspath(__file__), '--serve', mode, '--port', str(args.port),
+             '--chunk-kb', str(args.chunk_kb), '--interval', str(args.interval)],
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL
+        )
+        try:
+            if not wait_ready(args.port, process):
+                print(f"{mode}: server did not start")
+                continue
+            stats = run_clients(
+                f"http://127.0.0.1:{args.port}/load-test/stream",
+                args.clients, args.duration, args.ramp, args.connect_timeout
+            )
+            report(mode, stats, args.duration)
+        finally:
+            process.terminate()
+            process.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent stream load test")
+    parser.add_argument('--url', help="Streaming endpoint of a running instance")
+    parser.add_argument('--compare', action='store_true', help="Compare serving modes on a synthetic stream")
+    parser.add_argument('--serve', choices=('werkzeug', 'gevent'), help=argparse.SUPPRESS)
+    parser.add_argument('--clients', type=int, default=50)
+    parser.add_argument('--duration', type=int, default=30, help="Seconds each stream is held open")
+    parser.add_argument('--ramp', type=float, default=5, help="Seconds over which clients connect")
+    parser.add_argument('--connect-timeout', type=float, default=10)
+    parser.add_argument('--port', type=int, default=5099)
+    parser.add_argument('--chunk-kb', type=int, default=64)
+    parser.add_argument('--interval', type=float, default=0.1, help="Seconds between synthetic chunks")
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args.serve, args.port, args.chunk_kb, args.interval)
+    elif args.compare:
+        compare(args)
+    elif args.url:
+        report(args.url, run_clients(args.url, args.clients, args.duration, args.ramp, args.connect_timeout), args.duration)
+    else:
+        parser.print_help()
+
+
+if __name__ == "__main__":
+    main()
@@ -2,6 +2,12 @@
 # SIMPLIFIED main.py - Import existing routes.py properly
 # =============================================================================
 
+# The gevent server needs the standard library patched before anything imports it
+from clases.server import server
+
+requested_server_mode = server.server_mode()
+server_mode = server.patch(requested_server_mode)
+
 import signal
 import time
 import logging
@@ -187,8 +193,16 @@ except Exception as e:
 # Initialize SocketIO ONCE here
 from flask_socketio import SocketIO
 
-socketio = SocketIO(app, cors_allowed_origins="*", logger=False, engineio_logger=False)
-logger.info("✓ SocketIO initialized")
+socketio = SocketIO(
+    app,
+    cors_allowed_origins="*",
+    logger=False,
+    engineio_logger=False,
+    async_mode=server.async_mode(server_mode)
+)
+logger.info(f"✓ SocketIO initialized ({server.async_mode(server_mode)})")
+if server_mode != requested_server_mode:
+    logger.warning(f"⚠ {requested_server_mode} server requested but not installed, using {server_mode}")
 
 # Import custom modules with error handling
 try:
@@ -274,6 +288,13 @@ except Exception as e:
     logger.error(f"Failed to register routes: {e}")
     logger.exception("Route registration error:")
 
+# 3Cat routes register themselves on app with @app.route when imported
+try:
+    import plugins.tv3cat.routes
+    logger.info("✓ 3Cat routes registered")
+except Exception as e:
+    logger.error(f"Failed to register 3Cat routes: {e}")
+
 
 # Add debug route to check app status
 @app.route('/debug/config')
@@ -317,16 +338,16 @@ def run_flask_app(stop_event, port):
                 func()
 
     try:
-        logger.info(f"Starting Flask app on {host}:{port}")
+        logger.info(f"Starting Flask app on {host}:{port} ({server_mode} server)")
         logger.info(f"Secret key status: {'SET' if app.secret_key else 'NOT SET'}")
-        # Use socketio.run with allow_unsafe_werkzeug=True for development
+        # ytdlp2strm_server selects the server, werkzeug needs allow_unsafe_werkzeug
         socketio.run(
             app,
             host=host,
             port=port,
             debug=False,
             use_reloader=False,
-            allow_unsafe_werkzeug=True  # This fixes the Werkzeug error
+            **server.run_options(server_mode, ytdlp2strm_config)
         )
     except Exception as e:
         log_text = (f"Exception in Flask app: {e}")
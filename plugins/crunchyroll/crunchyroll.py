@@ -2,13 +2,14 @@ from flask import send_file, redirect, stream_with_context, Response, abort
 from sanitize_filename import sanitize
 import os
 import ffmpeg
-import time
 from clases.config import config as c
 from clases.worker import worker as w
 from clases.folders import folders as f
+from clases.cache.cache import temp_cache
+from clases.jobs.jobs import jobs
+from clases.prefetch.prefetch import prefetch
 from clases.nfo import nfo as n
 from clases.log import log as l
-from plugins.crunchyroll.jellyfin import daemon
 import subprocess
 import threading
 
@@ -48,7 +49,7 @@ class Crunchyroll:
         self.set_auth(command)
         self.set_proxy(command)
         self.set_start_episode(command)
-        returnWorker(command).pipe()
+        return w.Worker(command).stream()
 
     def get_start_episode(self):
         last_episode = 0
@@ -76,17 +77,15 @@ class Crunchyroll:
             command.append('{}'.format(next_episode))
 
     def set_last_episode(self, playlist_count):
-        if self.new_content:
-            f.Folders().write_file(
-                self.last_episode_file, 
-                playlist_count
-            )
-        else:
-            #sum_episode = int(self.last_episode) + int(playlist_count)
-            f.Folders().write_file(
-                self.last_episode_file,
-                str(playlist_count)
-            )
+        # Replace the watermark atomically, a crash leaves the previous one in place
+        temp_file = f"{self.last_episode_file}.tmp"
+        try:
+            with open(temp_file, 'w', encoding='utf-8') as fl:
+                fl.write(str(playlist_count))
+            os.replace(temp_file, self.last_episode_file)
+        except OSError as e:
+            log_text = (f"Error saving {self.last_episode_file}: {e}")
+            l.log("crunchyroll", log_text)
 
     def set_auth(self, command, quotes=False):
         if config['crunchyroll_auth'] == "browser":
@@ -149,14 +148,34 @@ mutate_values = c.config(
     config["mutate_values"]
 ).get_channels()
 
+def compile_mutations(rules):
+    """
+    Turn a channel's ordered mutation rules into {field: {value: replacement}}.
+    Rules apply in file order, so a later rule also rewrites what an earlier
+    one produced.
+    """
+    compiled = {}
+    for rule in rules:
+        mapping = compiled.setdefault(rule['field'], {})
+        for value, replacement in mapping.items():
+            if replacement == rule['value']:
+                mapping[value] = rule['replace']
+        mapping.setdefault(rule['value'], rule['replace'])
+    return compiled
+
+mutation_rules = {
+    channel: compile_mutations(rules)
+    for channel, rules in mutate_values.items()
+}
+
 source_platform = "crunchyroll"
 media_folder = config["strm_output_folder"]
 channels_list = config["channels_list_file"]
 cookies_file = config["crunchyroll_cookies_file"]
 subtitle_language = config["crunchyroll_subtitle_language"]
 audio_language = config['crunchyroll_audio_language']
-jellyfin_preload = False
-jellyfin_preload_last_episode = False
+# Persist the last_episode.txt watermark every this many episodes
+watermark_batch = int(config.get('watermark_batch', 50))
 port = ytdlp2strm_config['ytdlp2strm_port']
 SECRET_KEY = os.environ.get('AM_I_IN_A_DOCKER_CONTAINER', False)
 DOCKER_PORT = os.environ.get('DOCKER_PORT', False)
@@ -164,10 +183,6 @@ if SECRET_KEY:
     port = DOCKER_PORT
 
 
-if 'jellyfin_preload' in config:
-    jellyfin_preload = bool(config['jellyfin_preload'])
-if 'jellyfin_preload_last_episode' in config:
-    jellyfin_preload_last_episode = bool(config['jellyfin_preload_last_episode'])
 if 'proxy' in config:
     proxy = config['proxy']
     proxy_url = config['proxy_url']
@@ -176,11 +191,6 @@ else:
     proxy_url = ""
 ## -- END
 
-## -- JELLYFIN DAEMON
-#if jellyfin_preload:
-#    threading.Thread(target=daemon, daemon=False).start()
-## -- END
-
 ## -- MANDATORY TO_STRM FUNCTION 
 def to_strm(method):
     for crunchyroll_channel in channels:
@@ -208,8 +218,12 @@ def to_strm(method):
         # -- BUILD STRM
         process = crunchyroll.videos
         file_content = ""
+        mutations = mutation_rules.get(crunchyroll_channel, {})
+        prepared_folders = set()
+        watermark = None
+        pending = 0
         try:
-            for line in iter(process.stdout.readline, b''):
+            for line in process:
                 if line != "" and not 'ERROR' in line and not 'WARNING' in line:
                     # Extrae los valores dividiendo la línea una sola vez y procesa según sea necesario.
                     split_line = str(line).rstrip().split(';')
@@ -230,16 +244,10 @@ def to_strm(method):
                         'playlist_count': playlist_count,
                     }
 
-                    # Verifica si hay mutaciones especificadas para este canal.
-                    if crunchyroll_channel in mutate_values:
-                        for values in mutate_values[crunchyroll_channel]:
-                            # Obtén el campo y el valor objetivo a mutar del diccionario 'values'.
-                            field = values['field']
-                            value = values['value']
-
-                            # Si el valor actual en el campo corresponde al valor objetivo, reemplázalo.
-                            if field in data and data[field] == value:
-                                data[field] = values['replace']
+                    # Aplica las mutaciones compiladas para este canal.
+                    for field, mapping in mutations.items():
+                        if field in data and data[field] in mapping:
+                            data[field] = mapping[data[field]]
 
                     # Actualiza las variables con los valores posiblemente mutados.
                     season_number, season, episode_number, episode, url, playlist_count = (
@@ -264,7 +272,7 @@ def to_strm(method):
                             url
                         )
 
-                        file_path = "{}/{}/{}/{}.{}".format(
+                        season_folder = "{}/{}/{}".format(
                             media_folder,  
                             sanitize(
                                 "{}".format(
@@ -276,29 +284,22 @@ def to_strm(method):
                                     season_number, 
                                     season
                                 )
-                            ), 
+                            )
+                        )
+                        file_path = "{}/{}.{}".format(
+                            season_folder,
                             sanitize(video_name), 
                             "strm"
                         )
 
-                        f.Folders().make_clean_folder(
-                            "{}/{}/{}".format(
-                                media_folder,  
-                                sanitize(
-                                    "{}".format(
-                                        crunchyroll.channel_folder
-                                    )
-                                ),  
-                                sanitize(
-                                    "S{} - {}".format(
-                                        season_number, 
-                                        season
-                                    )
-                                )
-                            ),
-                            False,
-                            config
-                        )
+                        # Once per season, a second pass would clean what this run wrote
+                        if season_folder not in prepared_folders:
+                            prepared_folders.add(season_folder)
+                            f.Folders().make_clean_folder(
+                                season_folder,
+                                False,
+                                config
+                            )
 
                         if not os.path.isfile(file_path):
                             f.Folders().write_file(
@@ -307,28 +308,27 @@ def to_strm(method):
                             )
 
                         if crunchyroll.new_content:
-                            crunchyroll.set_last_episode(playlist_count)
+                            watermark = playlist_count
                         else:
                             try:
-                                sum_episode = int(crunchyroll.last_episode) + int(playlist_count)
+                                watermark = str(int(crunchyroll.last_episode) + int(playlist_count))
                             except:
                                 try:
-                                    sum_episode = 1 + int(playlist_count)
+                                    watermark = str(1 + int(playlist_count))
                                 except:
-                                    sum_episode = 1
+                                    watermark = "1"
 
-                            crunchyroll.set_last_episode(
-                                str(sum_episode)
-                            )
+                        # The STRM above is written, so the watermark may move past it
+                        pending += 1
+                        if pending >= watermark_batch:
+                            crunchyroll.set_last_episode(watermark)
+                            pending = 0
 
-                if not line:
-                    if jellyfin_preload_last_episode and (method == 'download' or method =='direct'):
-                        if 'http' in file_content:
-                           Worker(file_content).preload()
-                    break
+            if pending:
+                crunchyroll.set_last_episode(watermark)
                 
         finally:
-            process.kill()
+            process.close()
         ## -- END
     return True 
 ## -- END
@@ -354,15 +354,247 @@ def direct(crunchyroll_id):
 
     return download(crunchyroll_id)
 
+def media_commands(crunchyroll_id, video_output, audio_output):
+    """yt-dlp commands for the bestvideo and bestaudio tracks of an episode"""
+    command_video = [
+        'yt-dlp', 
+        '-f', 'bestvideo',
+        '--no-warnings',
+        '--no-mtime',
+        '--extractor-args', 'crunchyrollbeta:hardsub={}'.format(subtitle_language),
+        'https://www.crunchyroll.com/{}'.format(crunchyroll_id.replace('_','/')),
+        '--output', video_output
+    ]
+    Crunchyroll().set_auth(command_video,False)
+    Crunchyroll().set_proxy(command_video)
+
+    command_audio = [
+        'yt-dlp', 
+        '-f', 'bestaudio',
+        '--no-warnings',
+        '--no-mtime',
+        '--match-filter', 'language={}'.format(audio_language),
+        '--extractor-args', 'crunchyrollbeta:hardsub={}'.format(subtitle_language),
+        'https://www.crunchyroll.com/{}'.format(crunchyroll_id.replace('_','/')),
+        '--output', audio_output
+    ]
+    Crunchyroll().set_auth(command_audio,False)
+    Crunchyroll().set_proxy(command_audio)
+
+    return command_video, command_audio
+
+
+## -- PROGRESSIVE REMUX
+class ProgressiveJob:
+    """
+    Pipe bestvideo and bestaudio from yt-dlp into ffmpeg, mux them to
+    fragmented MP4 and append it to the temp cache file. Any number of
+    clients stream the file while it grows.
+    """
+    chunk_size = 64 * 1024
+    # Give up on a reader when the download makes no progress for this long
+    stall_timeout = 120
+
+    def __init__(self, job, temp_dir):
+        self.job = job
+        self.crunchyroll_id = job.media_id
+        self.final_path = os.path.join(temp_dir, f'crunchyroll-{self.crunchyroll_id}.mp4')
+        self.part_path = f'{self.final_path}.part'
+        self.size = 0
+        self.done = False
+        self.failed = False
+        self.condition = threading.Condition()
+        job.pin(self.part_path, self.final_path)
+        # Readers open the part file as soon as the job is registered
+        open(self.part_path, 'wb').close()
+
+    def start(self):
+        threading.Thread(target=self.run, daemon=True).start()
+
+    def run(self):
+        video_read, video_write = os.pipe()
+        audio_read, audio_write = os.pipe()
+        open_fds = [video_read, video_write, audio_read, audio_write]
+
+        def close_fd(fd):
+            os.close(fd)
+            open_fds.remove(fd)
+
+        command_video, command_audio = media_commands(self.crunchyroll_id, '-', '-')
+
+        video_worker = w.Worker(command_video)
+        audio_worker = w.Worker(command_audio)
+        ffmpeg_worker = w.Worker([
+            'ffmpeg',
+            '-loglevel', 'error',
+            '-i', f'pipe:{video_read}',
+            '-i', f'pipe:{audio_read}',
+            '-map', '0:v:0',
+            '-map', '1:a:0',
+            '-c', 'copy',
+            '-f', 'mp4',
+            '-movflags', 'frag_keyframe+empty_moov+default_base_moof',
+            'pipe:1'
+        ])
+        workers = [video_worker, audio_worker, ffmpeg_worker]
+        try:
+            video_worker.spawn(stdout=video_write, stderr=subprocess.DEVNULL)
+            audio_worker.spawn(stdout=audio_write, stderr=subprocess.DEVNULL)
+            close_fd(video_write)
+            close_fd(audio_write)
+
+            ffmpeg_process = ffmpeg_worker.spawn(
+                stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL,
+                pass_fds=(video_read, audio_read)
+            )
+            close_fd(video_read)
+            close_fd(audio_read)
+
+            with open(self.part_path, 'ab') as output:
+                while True:
+                    chunk = ffmpeg_process.stdout.read1(self.chunk_size)
+                    if not chunk:
+                        break
+                    output.write(chunk)
+                    output.flush()
+                    with self.condition:
+                        self.size += len(chunk)
+                        self.condition.notify_all()
+
+            ffmpeg_process.wait()
+            self.failed = ffmpeg_process.returncode != 0 or self.size == 0
+        except Exception as e:
+            log_text = (f'Progressive remux failed for {self.crunchyroll_id}: {e}')
+            l.log("crunchyroll", log_text)
+            self.failed = True
+        finally:
+            for worker in workers:
+                worker.reap()
+            for fd in list(open_fds):
+                close_fd(fd)
+
+            with self.condition:
+                if not self.failed:
+                    os.replace(self.part_path, self.final_path)
+                self.done = True
+                self.condition.notify_all()
+
+            if self.failed:
+                jobs.fail(self.job, 'remux failed')
+                f.Folders().clean_waste([self.part_path])
+            else:
+                jobs.finish(self.job, self.final_path)
+                log_text = (f'Remux of {self.crunchyroll_id} finished, {self.size} bytes cached')
+                l.log("crunchyroll", log_text)
+
+    def open(self):
+        with self.condition:
+            path = self.final_path if self.done else self.part_path
+            return open(path, 'rb')
+
+    def stream(self, handle):
+        offset = 0
+        try:
+            while True:
+                with self.condition:
+                    if self.size <= offset and not self.done:
+                        self.condition.wait(timeout=self.stall_timeout)
+                    available = self.size
+                    done = self.done
+
+                if offset < available:
+                    data = handle.read(min(self.chunk_size, available - offset))
+                    if not data:
+                        break
+                    offset += len(data)
+                    yield data
+                elif done:
+                    break
+                elif self.size <= offset:
+                    log_text = (f'No progress on {self.crunchyroll_id} for {self.stall_timeout}s, closing stream')
+                    l.log("crunchyroll", log_text)
+                    break
+        finally:
+            handle.close()
+
+
 def download(crunchyroll_id):
 
+    prefetch.played(source_platform, crunchyroll_id)
+
     current_dir = os.getcwd()
 
     # Construyes la ruta hacia la carpeta 'temp' dentro del directorio actual
     temp_dir = os.path.join(current_dir, 'temp')
+    final_path = os.path.join(temp_dir, f'crunchyroll-{crunchyroll_id}.mp4')
+
+    cached_path = jobs.artefact(source_platform, crunchyroll_id)
+    if not cached_path and os.path.isfile(final_path):
+        # Remuxed before this process started
+        jobs.record(source_platform, crunchyroll_id, final_path)
+        cached_path = final_path
+    if cached_path:
+        temp_cache.touch(cached_path)
+        return send_file(cached_path)
+
+    # Handing pipe file descriptors to ffmpeg needs POSIX
+    if os.name != 'posix':
+        return download_blocking(crunchyroll_id, temp_dir)
+
+    job = start_progressive(crunchyroll_id, temp_dir)
+
+    try:
+        handle = job.data.open()
+    except FileNotFoundError:
+        abort(500)
+
+    return Response(
+        stream_with_context(job.data.stream(handle)),
+        mimetype='video/mp4'
+    )
+## -- END
+
+def start_progressive(crunchyroll_id, temp_dir):
+    """Claim the progressive remux of an episode, starting it unless one is in flight"""
+    job, owner = jobs.claim(
+        source_platform,
+        crunchyroll_id,
+        lambda job: ProgressiveJob(job, temp_dir)
+    )
+    if owner:
+        log_text = (f'Starting progressive remux of {crunchyroll_id}')
+        l.log("crunchyroll", log_text)
+        job.data.start()
+    else:
+        log_text = (f'Attaching to in-flight remux of {crunchyroll_id}')
+        l.log("crunchyroll", log_text)
+    return job
+
+def prefetch_episode(crunchyroll_id):
+    """Remux an episode into the temp cache before it is played"""
+    temp_dir = os.path.join(os.getcwd(), 'temp')
+    final_path = os.path.join(temp_dir, f'crunchyroll-{crunchyroll_id}.mp4')
+    if jobs.is_known(source_platform, crunchyroll_id) or os.path.isfile(final_path):
+        return
+    # The blocking fallback only runs inside a request
+    if os.name != 'posix':
+        return
+
+    job = start_progressive(crunchyroll_id, temp_dir)
+    job.wait()
+
+# Warm the next episode whichever method the STRM files use
+prefetch.register(
+    source_platform,
+    media_folder,
+    {'direct': prefetch_episode, 'download': prefetch_episode}
+)
+
+def download_blocking(crunchyroll_id, temp_dir):
 
     def extract_media(command):
-        subprocess.run(command)
+        w.Worker(command).call()
 
     def preprocess_video(input_video, input_audio, output_file):
         """Pre-procesa el video y el audio para optimizarlo para streaming usando ffmpeg-python."""
@@ -379,37 +611,18 @@ def download(crunchyroll_id):
             c='copy', 
             movflags='faststart'
         ).run(overwrite_output=True)
-    isin = False
-    
-    for filename in os.listdir(temp_dir):
-        if crunchyroll_id in filename:
-            isin = True
-
-    if not isin:        
-        command_video = [
-            'yt-dlp', 
-            '-f', 'bestvideo',
-            '--no-warnings',
-            '--no-mtime',
-            '--extractor-args', 'crunchyrollbeta:hardsub={}'.format(subtitle_language),
-            'https://www.crunchyroll.com/{}'.format(crunchyroll_id.replace('_','/')),
-            '--output', os.path.join(temp_dir, f'{crunchyroll_id}.mp4')
-        ]
-        Crunchyroll().set_auth(command_video,False)
-        Crunchyroll().set_proxy(command_video)
 
-        command_audio = [
-            'yt-dlp', 
-            '-f', 'bestaudio',
-            '--no-warnings',
-            '--no-mtime',
-            '--match-filter', 'language={}'.format(audio_language),
-            '--extractor-args', 'crunchyrollbeta:hardsub={}'.format(subtitle_language),
-            'https://www.crunchyroll.com/{}'.format(crunchyroll_id.replace('_','/')),
-            '--output', os.path.join(temp_dir, f'{crunchyroll_id}.m4a')
-        ]
-        Crunchyroll().set_auth(command_audio,False)
-        Crunchyroll().set_proxy(command_audio)
+    def produce():
+        jobs.get(source_platform, crunchyroll_id).pin(
+            os.path.join(temp_dir, f'{crunchyroll_id}.mp4'),
+            os.path.join(temp_dir, f'{crunchyroll_id}.m4a'),
+            os.path.join(temp_dir, f'crunchyroll-{crunchyroll_id}.mp4')
+        )
+        command_video, command_audio = media_commands(
+            crunchyroll_id,
+            os.path.join(temp_dir, f'{crunchyroll_id}.mp4'),
+            os.path.join(temp_dir, f'{crunchyroll_id}.m4a')
+        )
 
         video = threading.Thread(target=extract_media, args=(command_video,))
         audio = threading.Thread(target=extract_media, args=(command_audio,))
@@ -426,23 +639,21 @@ def download(crunchyroll_id):
             os.path.join(temp_dir, f'crunchyroll-{crunchyroll_id}.mp4')
         )
 
-        
         f.Folders().clean_waste(
             [
                 os.path.join(temp_dir, f'{crunchyroll_id}.mp4'), 
                 os.path.join(temp_dir, f'{crunchyroll_id}.m4a')
             ]
         )
+        return os.path.join(temp_dir, f'crunchyroll-{crunchyroll_id}.mp4')
 
+    # Concurrent requests wait on the same job instead of polling temp/
+    output_file = jobs.run(source_platform, crunchyroll_id, produce)
+    if not output_file:
+        abort(500)
 
-    if isin and not os.path.isfile(os.path.join(temp_dir, f'crunchyroll-{crunchyroll_id}.mp4')):
-        while not os.path.isfile(os.path.join(temp_dir, f'crunchyroll-{crunchyroll_id}.mp4')):
-            time.sleep(5)
-        isin = False
-        
-    return send_file(
-        os.path.join(temp_dir, f'crunchyroll-{crunchyroll_id}.mp4')
-    )
+    temp_cache.touch(output_file)
+    return send_file(output_file)
     #return stream_video(f'{crunchyroll_id}.mp4', f'{crunchyroll_id}.m4a')
 
 #experimental not works.
@@ -479,20 +690,24 @@ def streams(media, crunchyroll_id):
 
     if command and mimetype:
         # Ejecutar el comando y obtener el output en modo binario
-        process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        worker = w.Worker(command)
+        process = worker.spawn(stdout=subprocess.PIPE, stderr=subprocess.PIPE)
 
         def generate():
             # Leer la salida en modo binario en pequeños bloques
-            while True:
-                output = process.stdout.read(1024)
-                if output:
-                    yield output
-                else:
-                    break
+            try:
+                while True:
+                    output = process.stdout.read(1024)
+                    if output:
+                        yield output
+                    else:
+                        break
+            finally:
+                worker.reap()
 
         def log_stderr():
             for line in iter(process.stderr.readline, b''):
-                log_text (line.decode('utf-8', errors='ignore'))  # Imprimir la salida de error por consola
+                log_text = (line.decode('utf-8', errors='ignore'))  # Imprimir la salida de error por consola
                 l.log("crunchyroll", log_text)
 
         # Lanzar la función log_stderr en un hilo separado para capturar stderr mientras se transmite stdout
@@ -525,7 +740,8 @@ def remux_streams(crunchyroll_id):
     ffmpeg_options = '-reconnect 1 -reconnect_at_eof 1 -reconnect_streamed 1 -reconnect_delay_max 2'.split()
 
     ffmpeg_command = ffmpeg_command[:1] + ffmpeg_options + ffmpeg_command[1:]
-    ffmpeg_process = subprocess.Popen(ffmpeg_command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, bufsize=10**8)
+    ffmpeg_worker = w.Worker(ffmpeg_command)
+    ffmpeg_process = ffmpeg_worker.spawn(stdout=subprocess.PIPE, stderr=subprocess.PIPE, bufsize=10**8)
 
     # Event to signal that ffmpeg_process has finished
     ffmpeg_done_event = threading.Event()
@@ -557,7 +773,7 @@ def remux_streams(crunchyroll_id):
             # Ensure FFmpeg process is terminated
             log_text = ("Cleaning up FFmpeg process")
             l.log("crunchyroll", log_text)
-            ffmpeg_process.terminate()
+            ffmpeg_worker.reap()
             ffmpeg_process.stdout.close()
             ffmpeg_process.stderr.close()
             # Wait for logging thread to finish
@@ -1,9 +1,11 @@
 from sanitize_filename import sanitize
 import os
 import json
-import requests
+import hashlib
+import threading
 from clases.config import config as c
 from clases.folders import folders as f
+from clases.http_client.http_client import http
 from clases.nfo import nfo as n
 from clases.log import log as l
 
@@ -20,9 +22,76 @@ config = c.config(
 source_platform = "pokemon_tv"
 media_folder = config["strm_output_folder"]
 channels_list = config["channels_list_file"]
+
+# Keep-alive session shared by the listing and database requests
+catalogue_session = http.session(config)
+catalogue_state_file = os.path.join('logs', 'pokemon_tv_catalogue.json')
+catalogue_state_lock = threading.Lock()
 ## -- END
 
-def channels():
+## -- CATALOGUE STATE
+def load_catalogue_state():
+    try:
+        with open(catalogue_state_file, 'r', encoding='utf-8') as file:
+            state = json.load(file)
+        return state if isinstance(state, dict) else {}
+    except FileNotFoundError:
+        return {}
+    except Exception as e:
+        l.log("pokemon_tv", f"Error reading {catalogue_state_file}: {e}")
+        return {}
+
+
+def save_catalogue_state(state):
+    temp_file = f"{catalogue_state_file}.tmp"
+    try:
+        with catalogue_state_lock:
+            os.makedirs(os.path.dirname(catalogue_state_file), exist_ok=True)
+            with open(temp_file, 'w', encoding='utf-8') as file:
+                json.dump(state, file, indent=4)
+            os.replace(temp_file, catalogue_state_file)
+    except Exception as e:
+        l.log("pokemon_tv", f"Error saving {catalogue_state_file}: {e}")
+
+
+def conditional_get(url, cached):
+    """
+    GET with the validators of an earlier response.
+    Returns (response, validators), response is None when nothing changed.
+    GitHub does not count 304 answers against the API rate limit.
+    """
+    headers = {}
+    if cached.get('etag'):
+        headers['If-None-Match'] = cached['etag']
+    if cached.get('last_modified'):
+        headers['If-Modified-Since'] = cached['last_modified']
+
+    response = catalogue_session.get(url, headers=headers, timeout=30)
+    if response.status_code == 304:
+        return None, cached
+    response.raise_for_status()
+
+    validators = {
+        'etag': response.headers.get('ETag'),
+        'last_modified': response.headers.get('Last-Modified')
+    }
+    return response, {key: value for key, value in validators.items() if value}
+
+
+def item_fingerprint(item, file_content):
+    """Hash of the fields that end up in the STRM, NFO and artwork of an item"""
+    fields = {
+        'title': item.get('title'),
+        'description': item.get('description'),
+        'season': item.get('season'),
+        'episode': item.get('episode'),
+        'preview': item.get('images', {}).get('large'),
+        'url': file_content
+    }
+    return hashlib.sha1(json.dumps(fields, sort_keys=True).encode('utf-8')).hexdigest()
+## -- END
+
+def channels(state=None):
     
     github_base_url = "https://api.github.com/repos/seiya-dev/pokemon-tv/contents/database/"
     github_raw_base_url = "https://raw.githubusercontent.com/seiya-dev/pokemon-tv/master/database/"
@@ -32,8 +101,16 @@ def channels():
          config["pokemon_tv_language"]
     )  # change USERNAME, REPOSITORY and FOLDER with actual name
 
-    result = requests.get(github_url)
-    databases = json.loads(result.text)
+    state = state if state is not None else {}
+    listing = state.get('listing', {})
+    if listing.get('url') != github_url:
+        listing = {}
+
+    response, validators = conditional_get(github_url, listing)
+    if response is None:
+        return listing['files']
+
+    databases = response.json()
     databases_json_files = []
     for i in databases:
         if ('series' in i['name']
@@ -47,11 +124,15 @@ def channels():
                 )
             )
 
+    state['listing'] = dict(validators, url=github_url, files=databases_json_files)
     return databases_json_files
 
 
 def to_strm(method):
-    for channel in channels():
+    state = load_catalogue_state()
+    databases = state.setdefault('databases', {})
+
+    for channel in channels(state):
         log_text = (channel)
         l.log("pokemon_tv", log_text)
         seasson_type = "serie/Pokemon"
@@ -68,28 +149,39 @@ def to_strm(method):
              .split('-',1)[1]
              .split('.json')[0]
         ) if seasson_type != "movies" else "Pokemon"
-        
+
+        database = databases.get(channel, {})
+        response, validators = conditional_get(channel, database)
+        if response is None:
+            log_text = (f"{channel} not modified, skipping")
+            l.log("pokemon_tv", log_text)
+            continue
+
         seasson_api = json.loads(
-             requests.get(channel)
-             .text
+             response.text
         )
 
-        f.Folders().make_clean_folder(
-            "{}/{}/{}/{}".format(
-                media_folder, 
-                "Pokemon",
-                seasson_type,
-                sanitize(
-                    "{} - {}".format(
-                        pokemon_channel_folder,
-                        seasson_api["channel_name"]
-                    )
+        season_folder = "{}/{}/{}/{}".format(
+            media_folder, 
+            "Pokemon",
+            seasson_type,
+            sanitize(
+                "{} - {}".format(
+                    pokemon_channel_folder,
+                    seasson_api["channel_name"]
                 )
-            ),
+            )
+        )
+        f.Folders().make_clean_folder(
+            season_folder,
             False,
             config
         )
 
+        known_items = database.get('items', {})
+        items = {}
+        changed = 0
+
         for item in seasson_api["media"]:
             video_name = (
                 "{} - {}".format(
@@ -105,58 +197,41 @@ def to_strm(method):
                     item['title']
                 )
             )
+            item_name = sanitize(video_name)
 
             if 'stream_url' in item:
                 file_content = item['stream_url']
             else:
                 file_content = item["offline_url"]
             file_path = (
-                "{}/{}/{}/{}/{}.{}".format(
-                    media_folder,
-                    "Pokemon",
-                    seasson_type,
-                    sanitize(
-                        "{} - {}".format(
-                            pokemon_channel_folder,
-                            seasson_api["channel_name"]
-                        )
-                    ),
-                    sanitize(video_name),
+                "{}/{}.{}".format(
+                    season_folder,
+                    item_name,
                     "strm"
                 )
             )
 
-            f.Folders().make_clean_folder(
-                "{}/{}/{}/{}".format(
-                    media_folder, 
-                    "Pokemon",
-                    seasson_type,
-                    sanitize(
-                        "{} - {}".format(
-                            pokemon_channel_folder,
-                            seasson_api["channel_name"]
-                        )
-                    )
-                ),
-                False,
-                config
-            )
+            fingerprint = item_fingerprint(item, file_content)
+            items[item_name] = fingerprint
+            if known_items.get(item_name) == fingerprint and os.path.isfile(file_path):
+                continue
+
+            # Files are only written when missing, drop the outdated ones first
+            if item_name in known_items:
+                f.Folders().clean_waste(
+                    [
+                        file_path,
+                        "{}/{}.nfo".format(season_folder, item_name),
+                        "{}/{}.png".format(season_folder, item_name)
+                    ]
+                )
+
             ## -- BUILD VIDEO NFO FILE
             n.Nfo(
                 nfo_type,
-                "{}/{}/{}/{}".format(
-                    media_folder, 
-                    "Pokemon",
-                    seasson_type,
-                    sanitize(
-                        "{} - {}".format(
-                            pokemon_channel_folder,
-                            seasson_api["channel_name"]
-                        )
-                    )
-                ),
+                season_folder,
                 {
-                    "item_name" : sanitize(video_name),
+                    "item_name" : item_name,
                     "title" : item['title'],
                     "plot" : item['description'],
                     "season" : item['season'],
@@ -167,9 +242,17 @@ def to_strm(method):
                 }
             ).make_nfo()
 
+            f.Folders().write_file(file_path, file_content)
+            changed += 1
+
+        log_text = (f"{changed} of {len(items)} items written for {channel}")
+        l.log("pokemon_tv", log_text)
+
+        # Validators are stored only once every item of the database is on disk
+        databases[channel] = dict(validators, items=items)
+        save_catalogue_state(state)
 
-            if not os.path.isfile(file_path):
-                f.Folders().write_file(file_path, file_content)
+    save_catalogue_state(state)
 
                 
 def direct(pokemon_tv_id): #Sponsorblock doesn't work in this mode
@@ -0,0 +1,243 @@
+"""
+Native streaming of Telegram media.
+
+Media is read through one long-lived Telethon client in chunk_size pieces,
+so a seek costs a single chunk fetch instead of a restart. Fetched chunks go
+to a bounded on-disk cache under temp/telegram that every reader of a file
+shares, and the chunks after the one being served are fetched ahead.
+"""
+
+import asyncio
+import os
+import threading
+from collections import OrderedDict
+
+from cachetools import LRUCache
+from telethon import TelegramClient
+
+from clases.log import log as l
+from clases.metrics.metrics import metrics
+
+# Telegram serves files in parts of up to 512 KiB at 4 KiB aligned offsets
+chunk_size = 512 * 1024
+
+
+class ClientThread:
+    """A Telethon client on its own event loop, for the synchronous Flask handlers"""
+
+    def __init__(self, session_name, api_id, api_hash):
+        self.session_name = session_name
+        self.api_id = api_id
+        self.api_hash = api_hash
+        self.loop = None
+        self.client = None
+        self.lock = threading.Lock()
+
+    def submit(self, coro):
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def get_client(self, timeout):
+        with self.lock:
+            if self.client:
+                return self.client
+            if not self.loop:
+                self.loop = asyncio.new_event_loop()
+                threading.Thread(target=self.loop.run_forever, daemon=True).start()
+
+            async def connect():
+                # The client binds to the loop it is created on
+                client = TelegramClient(self.session_name, self.api_id, self.api_hash)
+                await client.connect()
+                if not await client.is_user_authorized():
+                    await client.disconnect()
+                    raise PermissionError(f"Telegram session {self.session_name} is not authorized")
+                return client
+
+            self.client = self.submit(connect()).result(timeout)
+            l.log("telegram", "Streaming client connected")
+            return self.client
+
+
+class ChunkCache:
+    """Size-bounded LRU of media chunks stored as files"""
+
+    def __init__(self, path, max_bytes):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()
+        self.total = 0
+        os.makedirs(self.path, exist_ok=True)
+
+        # Chunks cached by an earlier run, least recently used first
+        existing = []
+        with os.scandir(self.path) as entries:
+            for entry in entries:
+                if entry.is_file() and entry.name.endswith('.chunk'):
+                    stat = entry.stat()
+                    existing.append((stat.st_atime, entry.name[:-len('.chunk')], stat.st_size))
+        for _, key, size in sorted(existing):
+            self.entries[key] = size
+            self.total += size
+
+    def file_path(self, key):
+        return os.path.join(self.path, f"{key}.chunk")
+
+    def __contains__(self, key):
+        with self.lock:
+            return key in self.entries
+
+    def get(self, key):
+        with self.lock:
+            if key not in self.entries:
+                return None
+            self.entries.move_to_end(key)
+
+        try:
+            with open(self.file_path(key), 'rb') as f:
+                return f.read()
+        except FileNotFoundError:
+            with self.lock:
+                self.total -= self.entries.pop(key, 0)
+            return None
+
+    def put(self, key, data):
+        temp_path = f"{self.file_path(key)}.tmp"
+        try:
+            with open(temp_path, 'wb') as f:
+                f.write(data)
+            os.replace(temp_path, self.file_path(key))
+        except OSError as e:
+            l.log("telegram", f"Could not cache chunk {key}: {e}")
+            return
+
+        evicted = []
+        with self.lock:
+            self.total += len(data) - self.entries.pop(key, 0)
+            self.entries[key] = len(data)
+            while self.total > self.max_bytes and len(self.entries) > 1:
+                old_key, size = self.entries.popitem(last=False)
+                self.total -= size
+                evicted.append(old_key)
+
+        for old_key in evicted:
+            try:
+                os.remove(self.file_path(old_key))
+            except FileNotFoundError:
+                pass
+
+
+class TelegramStreamer:
+    def __init__(self, config, session_name, api_id, api_hash):
+        self.client_thread = ClientThread(session_name, api_id, api_hash)
+        self.cache = ChunkCache(
+            os.path.join(os.getcwd(), 'temp', 'telegram'),
+            int(float(config.get('telegram_chunk_cache_mb', 512)) * 1024 * 1024)
+        )
+        # Chunks fetched ahead of the one being served
+        self.read_ahead = int(config.get('telegram_read_ahead', 2))
+        self.timeout = int(config.get('telegram_chunk_timeout', 60))
+        self.messages = LRUCache(maxsize=200)
+        self.lock = threading.Lock()
+        self.in_flight = {}
+
+    @staticmethod
+    def split_id(telegram_id):
+        channel, message_id = telegram_id.rsplit('-', 1)
+        return channel, int(message_id)
+
+    def message(self, telegram_id, refresh=False):
+        """The message carrying the media, cached so readers share one lookup"""
+        with self.lock:
+            message = None if refresh else self.messages.get(telegram_id)
+        if message:
+            return message
+
+        channel, message_id = self.split_id(telegram_id)
+        client = self.client_thread.get_client(self.timeout)
+        message = self.client_thread.submit(client.get_messages(channel, ids=message_id)).result(self.timeout)
+        if not message or not message.file:
+            raise FileNotFoundError(f"No media in Telegram message {telegram_id}")
+
+        with self.lock:
+            self.messages[telegram_id] = message
+        return message
+
+    async def download_chunk(self, client, message, index):
+        data = bytearray()
+        async for part in client.iter_download(
+            message.media,
+            offset=index * chunk_size,
+            request_size=chunk_size,
+            limit=1,
+            file_size=message.file.size
+        ):
+            data.extend(part)
+        return bytes(data)
+
+    def fetch(self, telegram_id, message, index):
+        """Future for a chunk, shared with any reader already fetching it"""
+        key = f"{telegram_id}-{index}"
+        client = self.client_thread.get_client(self.timeout)
+        with self.lock:
+            future = self.in_flight.get(key)
+            if future:
+                return future
+            future = self.client_thread.submit(self.download_chunk(client, message, index))
+            self.in_flight[key] = future
+
+        def done(future):
+            # Cache before leaving in_flight so readers never miss the chunk
+            if not future.cancelled() and not future.exception():
+                self.cache.put(key, future.result())
+            with self.lock:
+                # A retry may already have replaced this future
+                if self.in_flight.get(key) is future:
+                    del self.in_flight[key]
+
+        future.add_done_callback(done)
+        return future
+
+    def read_chunk(self, telegram_id, message, index):
+        total_chunks = -(-message.file.size // chunk_size)
+        for ahead in range(index + 1, min(index + 1 + self.read_ahead, total_chunks)):
+            if f"{telegram_id}-{ahead}" not in self.cache:
+                self.fetch(telegram_id, message, ahead)
+
+        key = f"{telegram_id}-{index}"
+        data = self.cache.get(key)
+        metrics.cache('telegram_chunks', data is not None)
+        if data is not None:
+            return data
+
+        future = self.fetch(telegram_id, message, index)
+        try:
+            return future.result(self.timeout)
+        except Exception as e:
+            # The done callback may not have run yet, the retry must not get the failed future back
+            with self.lock:
+                if self.in_flight.get(key) is future:
+                    del self.in_flight[key]
+            # File references expire, fetch the message again and retry once
+            l.log("telegram", f"Chunk {index} of {telegram_id} failed ({e}), refreshing the message")
+            message = self.message(telegram_id, refresh=True)
+            return self.fetch(telegram_id, message, index).result(self.timeout)
+
+    def iter_range(self, telegram_id, start, stop):
+        """Yield the bytes in [start, stop) of a media file"""
+        message = self.message(telegram_id)
+        offset = start
+        while offset < stop:
+            index = offset // chunk_size
+            data = self.read_chunk(telegram_id, message, index)
+            piece = data[offset - index * chunk_size:stop - index * chunk_size]
+            if not piece:
+                l.log("telegram", f"Short read on {telegram_id} at byte {offset}")
+                break
+            yield piece
+            offset += len(piece)
+
+    def warm(self, telegram_id):
+        """Fetch the first chunks of a file so playback starts from the cache"""
+        message = self.message(telegram_id)
+        self.read_chunk(telegram_id, message, 0)
@@ -1,28 +1,30 @@
 
 import os
 import re
-import socket
+import json
+import time
 import asyncio
 import threading
-import subprocess
-from multiprocessing import Process
-from telethon import TelegramClient
+from flask import Response, abort, request, stream_with_context
 from sanitize_filename import sanitize
 from clases.config import config as c
 from clases.worker import worker as w
 from clases.folders import folders as f
 from clases.nfo import nfo as n
+from clases.log import log as l
+from clases.prefetch.prefetch import prefetch
+from plugins.telegram.stream import TelegramStreamer
 
 ## -- CRUNCHYROLL CLASS
 class Telegram:
-    def __init__(self, channel=None, api_id=None, api_hash=None, session_file=None):
+    def __init__(self, channel=None, client=None, channel_state=None):
         self.channel = channel.split('/')[-1] if channel else None
-        self.api_id = api_id
-        self.api_hash = api_hash
-        self.session_name = session_file.rsplit('.', 1)[0] if session_file else None
-        self.client = TelegramClient(self.session_name, self.api_id, self.api_hash)
+        self.client = client
+        channel_state = channel_state or {}
         self.videos = []
-        self.current_series_title = '' # Will be set later in get_group_topic
+        # Resume where the previous scan stopped, the series title comes from an earlier message
+        self.last_message_id = int(channel_state.get('last_message_id', 0))
+        self.current_series_title = channel_state.get('series_title', '')
 
     def extract_serie(self, message):
         if re.search(r"titulo|título|sinopsis|episodios|episodes|serie", message.text or "", re.IGNORECASE):
@@ -94,31 +96,38 @@ class Telegram:
         return episode_name
     
     async def get_videos(self):
-        async with self.client:
-            entity = await self.client.get_entity(self.channel)
-
-            async for message in self.client.iter_messages(entity, reverse=True):
-                if message.video:
-                    # Actualiza el group_topic para cada video
-                    if not re.search(r"trailer", message.text, re.IGNORECASE):
-                        video_id = message.id
-                        message_text = message.text or ""
-                        video_info = {
-                            "channel" : self.channel,
-                            "id": video_id,
-                            "series_title": self.current_series_title,
-                            "seasson" : self.extract_seasson(message_text),
-                            "episode" : self.extract_episode(message_text),
-                            "episode_name" : self.extract_episode_name(message_text.split('.')[0].split('\n')[0], self.current_series_title)
-                        }
-                        self.videos.append(video_info)
-                else:
-                    self.extract_serie(message)
-    
-    
+        entity = await self.client.get_entity(self.channel)
+
+        # min_id skips every message an earlier scan already processed
+        async for message in self.client.iter_messages(entity, reverse=True, min_id=self.last_message_id):
+            self.last_message_id = max(self.last_message_id, message.id)
+            if message.video:
+                # Actualiza el group_topic para cada video
+                if not re.search(r"trailer", message.text, re.IGNORECASE):
+                    video_id = message.id
+                    message_text = message.text or ""
+                    video_info = {
+                        "channel" : self.channel,
+                        "id": video_id,
+                        "series_title": self.current_series_title,
+                        "seasson" : self.extract_seasson(message_text),
+                        "episode" : self.extract_episode(message_text),
+                        "episode_name" : self.extract_episode_name(message_text.split('.')[0].split('\n')[0], self.current_series_title)
+                    }
+                    self.videos.append(video_info)
+            else:
+                self.extract_serie(message)
+
+    def get_state(self):
+        return {
+            'last_message_id': self.last_message_id,
+            'series_title': self.current_series_title,
+            'scanned_at': time.time()
+        }
+
     @classmethod
-    async def create_and_fetch_videos(cls, channel, api_id, api_hash, session_file):
-        instance = cls(channel, api_id, api_hash, session_file)
+    async def create_and_fetch_videos(cls, channel, client, channel_state=None):
+        instance = cls(channel, client, channel_state)
         await instance.get_videos()
         return instance
 ## -- END
@@ -142,134 +151,210 @@ channels_list = config["channels_list_file"]
 api_id = config["telegram_api_id"]
 api_hash = config["telegram_api_hash"]
 session_file = config["telegram_session_file"]
+# Channels scanned at once on the shared client
+concurrent_channels = int(config.get('telegram_concurrent_channels', 4))
+
+channel_state_file = os.path.join('logs', 'telegram_channels.json')
+channel_state_lock = threading.Lock()
+# Scanned channels write their files one at a time, off the client loop
+write_lock = threading.Lock()
 ## -- END
 
-## -- telegram-video-downloader
-def is_telegram_video_downloader(puerto):
-    s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+## -- SCAN STATE
+def load_channel_state():
     try:
-        s.bind(("127.0.0.1", puerto))
-    except socket.error as e:
-        if e.errno == 98:  # Código de error para "dirección ya en uso" en Linux
-            return True
-    except OSError as e:
-        if e.errno == 48:  # Código de error para "dirección ya en uso" en MacOS
-            return True
-        elif e.errno == 10048:  # Código de error para "dirección ya en uso" en Windows
-            return True
-    else:
-        s.close()
-        return False
-    s.close()
-    return True
-
-def telegram_video_downloader():
-    # Este es el comando que deseas ejecutar
-    command = f'telegram-video-downloader --api_id {api_id} --api_hash {api_hash} --session_file "{session_file}"'
-    # Usamos subprocess para ejecutar el comando
+        with open(channel_state_file, 'r', encoding='utf-8') as file:
+            state = json.load(file)
+        return state if isinstance(state, dict) else {}
+    except FileNotFoundError:
+        return {}
+    except Exception as e:
+        l.log("telegram", f"Error reading {channel_state_file}: {e}")
+        return {}
+
+
+def save_channel_state(state):
+    temp_file = f"{channel_state_file}.tmp"
     try:
-        process = subprocess.run(command, shell=True)
-    finally:
-        try:
-            process.kill()
-        except:
-            pass
+        with channel_state_lock:
+            os.makedirs(os.path.dirname(channel_state_file), exist_ok=True)
+            with open(temp_file, 'w', encoding='utf-8') as file:
+                json.dump(state, file, indent=4)
+            os.replace(temp_file, channel_state_file)
+    except Exception as e:
+        l.log("telegram", f"Error saving {channel_state_file}: {e}")
+## -- END
 
-if not is_telegram_video_downloader(5151):
-    thread_telegram_video_downloader = threading.Thread(target=telegram_video_downloader)
-    # Configuramos el thread como un demonio para que termine cuando el programa principal termine
-    thread_telegram_video_downloader.daemon = True
-    # Iniciamos el thread
-    thread_telegram_video_downloader.start()
+## -- STREAMING
+streamer = TelegramStreamer(
+    config,
+    session_file.rsplit('.', 1)[0],
+    api_id,
+    api_hash
+)
 
-else:
-    print("ya está en ejecución")
-## -- EMD
+# Warm the first chunks of the next episode
+prefetch.register(source_platform, media_folder, {'direct': streamer.warm})
+## -- END
 
 ## -- MANDATORY TO_STRM FUNCTION 
-async def get_data():
-    for telegram_channel in channels:
-        print("Preparing channel {}".format(telegram_channel))
+def write_videos(telegram, prepared_folders, rescan):
+    for video in telegram.videos:
+        video_id = video['id']
+        serie = video['series_title']
+        season_number = video['seasson']
+        episode_number = video['episode']
+        episode = video['episode_name']
 
-        telegram = await Telegram.create_and_fetch_videos(
-            telegram_channel,
-            api_id,
-            api_hash,
-            session_file
+        video_name = "{} - {}".format(
+            "S{}E{}".format(
+                season_number, 
+                episode_number
+            ), 
+            episode
+        )
+        file_content = "http://{}:{}/{}/{}/{}".format(
+            ytdlp2strm_config['ytdlp2strm_host'], 
+            ytdlp2strm_config['ytdlp2strm_port'], 
+            source_platform, 
+            'direct', 
+            f'{telegram.channel}-{video_id}'
+        )
+        folder_path = "{}/{}/{}".format(
+            media_folder,  
+            sanitize(
+                "{}".format(
+                    serie
+                )
+            ),  
+            sanitize(
+                "S{}".format(
+                    season_number
+                )
+            )
+        )
+        file_path = "{}/{}.{}".format(
+            folder_path,
+            sanitize(video_name), 
+            "strm"
         )
-        
-
 
-        for video in telegram.videos:
-            video_id = video['id']
-            serie = video['series_title']
-            season_number = video['seasson']
-            episode_number = video['episode']
-            episode = video['episode_name']
+        # Prepare each season folder once per run. Incremental scans only
+        # see new messages, so they must never clean what earlier runs wrote.
+        if folder_path not in prepared_folders:
+            prepared_folders.add(folder_path)
+            if rescan:
+                f.Folders().make_clean_folder(
+                    folder_path,
+                    False,
+                    config
+                )
+            else:
+                os.makedirs(folder_path, exist_ok=True)
 
-            video_name = "{} - {}".format(
-                "S{}E{}".format(
-                    season_number, 
-                    episode_number
-                ), 
-                episode
-            )
-            file_content = "http://{}:{}/{}/{}/{}".format(
-                ytdlp2strm_config['ytdlp2strm_host'], 
-                ytdlp2strm_config['ytdlp2strm_port'], 
-                source_platform, 
-                'direct', 
-                f'{telegram.channel}-{video_id}'
+        if not os.path.isfile(file_path):
+            f.Folders().write_file(
+                file_path, 
+                file_content
             )
-            file_path = "{}/{}/{}/{}.{}".format(
-                media_folder,  
-                sanitize(
-                    "{}".format(
-                        serie
-                    )
-                ),  
-                sanitize(
-                    "S{}".format(
-                        season_number
-                    )
-                ), 
-                sanitize(video_name), 
-                "strm"
-            )
-            f.Folders().make_clean_folder(
-                "{}/{}/{}".format(
-                    media_folder,  
-                    sanitize(
-                        "{}".format(
-                            serie
-                        )
-                    ),  
-                    sanitize(
-                        "S{}".format(
-                            season_number
-                        )
-                    )
-                ),
-                False,
-                config
+
+
+def write_channel(telegram, telegram_channel, state, prepared_folders, rescan):
+    with write_lock:
+        write_videos(telegram, prepared_folders, rescan)
+
+        # Only advance once the STRM files for these messages exist
+        state[telegram_channel] = telegram.get_state()
+        save_channel_state(state)
+
+
+async def scan_channel(client, telegram_channel, state, semaphore, prepared_folders, rescan):
+    async with semaphore:
+        channel_state = {} if rescan else state.get(telegram_channel, {})
+        log_text = ("Preparing channel {} from message {}".format(
+            telegram_channel,
+            channel_state.get('last_message_id', 0)
+        ))
+        l.log("telegram", log_text)
+
+        try:
+            telegram = await Telegram.create_and_fetch_videos(
+                telegram_channel,
+                client,
+                channel_state
             )
+        except Exception as e:
+            log_text = (f"Error scanning {telegram_channel}: {e}")
+            l.log("telegram", log_text)
+            return []
 
-            if not os.path.isfile(file_path):
-                f.Folders().write_file(
-                    file_path, 
-                    file_content
-                )
+    await asyncio.get_running_loop().run_in_executor(
+        None, write_channel, telegram, telegram_channel, state, prepared_folders, rescan
+    )
+    log_text = (f"{telegram_channel}: {len(telegram.videos)} new videos, last message {telegram.last_message_id}")
+    l.log("telegram", log_text)
+    return telegram.videos
 
 
-    return telegram.videos 
+async def get_data(client, rescan=False):
+    state = load_channel_state()
+    semaphore = asyncio.Semaphore(max(concurrent_channels, 1))
+    prepared_folders = set()
+
+    # One client, the channels share its connection
+    results = await asyncio.gather(
+        *(
+            scan_channel(client, telegram_channel, state, semaphore, prepared_folders, rescan)
+            for telegram_channel in channels
+        )
+    )
+
+    return [video for videos in results for video in videos]
 
 
 def to_strm(method):
-    videos = asyncio.run(
-        get_data()
-    )
+    # The sync runs on the streaming client, two clients on one session file lock its database
+    client_thread = streamer.client_thread
+    client = client_thread.get_client(streamer.timeout)
+    # cli.py --media telegram --params rescan rebuilds every channel from its first message
+    videos = client_thread.submit(
+        get_data(client, rescan=method == 'rescan')
+    ).result()
 
 ## -- END
 
 def direct(telegram_id):
-    pass
\ No newline at end of file
+    """Serve Telegram media through the plugin's own client, honouring Range requests"""
+    prefetch.played(source_platform, telegram_id)
+
+    try:
+        message = streamer.message(telegram_id)
+    except (ValueError, FileNotFoundError) as e:
+        l.log("telegram", f"Cannot stream {telegram_id}: {e}")
+        abort(404)
+    except Exception as e:
+        l.log("telegram", f"Telegram client unavailable for {telegram_id}: {e}")
+        abort(503)
+
+    size = message.file.size
+    headers = {'Accept-Ranges': 'bytes'}
+    status = 200
+    start, stop = 0, size
+
+    if request.range:
+        byte_range = request.range.range_for_length(size)
+        if byte_range is None:
+            headers['Content-Range'] = f'bytes */{size}'
+            return Response(status=416, headers=headers)
+        start, stop = byte_range
+        status = 206
+        headers['Content-Range'] = f'bytes {start}-{stop - 1}/{size}'
+
+    headers['Content-Length'] = str(stop - start)
+    return Response(
+        stream_with_context(streamer.iter_range(telegram_id, start, stop)),
+        status=status,
+        mimetype=message.file.mime_type or 'video/mp4',
+        headers=headers,
+        direct_passthrough=True
+    )
\ No newline at end of file
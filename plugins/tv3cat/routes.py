@@ -0,0 +1,8 @@
+from __main__ import app
+from plugins.tv3cat.tv3cat import direct
+
+### TV3CAT ZONE
+# Resolve the episode media URL on demand and redirect to it
+@app.route("/tv3cat/direct/<tv3cat_id>")
+def tv3cat_direct(tv3cat_id):
+    return direct(tv3cat_id)
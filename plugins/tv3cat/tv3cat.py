@@ -1,21 +1,31 @@
 import requests
 from bs4 import BeautifulSoup
 import json
+import os
+import threading
+from cachetools import TTLCache
 from clases.config import config as c
 from clases.worker import worker as w
 from clases.folders import folders as f
+from clases.http_client.http_client import http
 from clases.nfo import nfo as n
 from clases.log import log as l
+from clases.metrics.metrics import metrics
+from clases.prefetch.prefetch import prefetch
 from sanitize_filename import sanitize
+from flask import redirect, abort
 
 class tv3cat:
     def __init__(self, channel=False):
         self.channel = channel
+        self.episodes = []
+        self.channel_name = None
         # Uso de las funciones
         program_id, seasons = self.fetch_program_id_and_seasons()
         if program_id and seasons:
             self.episodes = self.fetch_json_data(program_id, seasons)
-            self.channel_name = self.episodes[0]['programa']
+            if self.episodes:
+                self.channel_name = self.episodes[0]['programa']
         else:
             log_text = ("No se pudo extraer el programId o las temporadas.")
             l.log("tv3cat", log_text)
@@ -39,7 +49,7 @@ class tv3cat:
 
     def fetch_program_id_and_seasons(self):
         url = self.channel
-        response = requests.get(url)
+        response = tv3cat_session.get(url, timeout=request_timeout)
         seasons = []
 
         if response.status_code == 200:
@@ -61,27 +71,40 @@ class tv3cat:
                     return program_id, seasons
         return None, []
 
-    def get_video_url(self, video_id):
-        url = f"https://api-media.ccma.cat/pvideo/media.jsp?media=video&versio=vast&idint={video_id}&profile=pc_3cat&format=dm"
-        response = requests.get(url)
-        if response.status_code == 200:
-            json_data = response.json()
-            video_url = json_data.get('media', {}).get('url', [])[0].get('file')
+    @staticmethod
+    def get_video_url(video_id):
+        with video_urls_lock:
+            video_url = video_urls.get(video_id)
+        metrics.cache('tv3cat_urls', video_url)
+        if video_url:
             return video_url
-        return None
+
+        url = f"https://api-media.ccma.cat/pvideo/media.jsp?media=video&versio=vast&idint={video_id}&profile=pc_3cat&format=dm"
+        try:
+            response = tv3cat_session.get(url, timeout=request_timeout)
+            if response.status_code != 200:
+                return None
+            video_url = response.json().get('media', {}).get('url', [])[0].get('file')
+        except (requests.RequestException, ValueError, IndexError, AttributeError) as e:
+            log_text = (f"No se pudo resolver el vídeo {video_id}: {e}")
+            l.log("tv3cat", log_text)
+            return None
+
+        if video_url:
+            with video_urls_lock:
+                video_urls[video_id] = video_url
+        return video_url
 
     def fetch_json_data(self, program_id, seasons):
         episodes = []
         #url = f"https://www.ccma.cat/api/3cat/dades/?queryKey=%5B%22tira%22%2C%7B%22url%22%3A%22%25%25dataResources.apiCCMA%25%25%2Fvideos%3F_format%3Djson%26no_agrupacio%3DPUAGR_LLSIGN%26tipus_contingut%3DPPD%26items_pagina%3D16%26pagina%3D1%26sdom%3Dimg%26version%3D2.0%26cache%3D180%26https%3Dtrue%26master%3Dyes%26programatv_id%3D{program_id}%26ordre%3Dcapitol%26temporada%3D{season}%22%7D%5D"
         #url = f"https://www.ccma.cat/api/3cat/dades/?queryKey=%5B%22tira%22%2C%7B%22url%22%3A%22%25%25dataResources.apiCCMA%25%25%2Fvideos%3F_format%3Djson%26no_agrupacio%3DPUAGR_LLSIGN%26tipus_contingut%3DPPD%26items_pagina%3D16%26pagina%3D1%26sdom%3Dimg%26version%3D2.0%26cache%3D180%26https%3Dtrue%26master%3Dyes%26programatv_id%3D69956%26origen%3Dauto%26perfil%3Dpc%26origen%3Dauto%26perfil%3Dpc%22%7D%5D"
         url = f"https://www.ccma.cat/api/3cat/dades/?queryKey=%5B%22tira%22%2C%7B%22url%22%3A%22%25%25dataResources.apiCCMA%25%25%2Fvideos%3F_format%3Djson%26no_agrupacio%3DPUAGR_LLSIGN%26tipus_contingut%3DPPD%26items_pagina%3D1000%26pagina%3D1%26sdom%3Dimg%26version%3D2.0%26cache%3D180%26https%3Dtrue%26master%3Dyes%26programatv_id%3D{program_id}%26ordre%3Dcapitol%22%7D%5D"
-        response = requests.get(url)
+        response = tv3cat_session.get(url, timeout=request_timeout)
         if response.status_code == 200:
             json_data = response.json()
             items = json_data.get('resposta', {}).get('items', {}).get('item', [])
             for item in items:
-                video_id = item.get('id')
-                video_url = self.get_video_url(video_id)
                 try:
                     temporada = item.get('temporades',[])[0].get('id').split('_')[1]
                 except:
@@ -91,8 +114,7 @@ class tv3cat:
                     'titulo': item.get('permatitle'),
                     'capitulo': item.get('capitol_temporada') if item.get('capitol_temporada') > 0 else item.get('capitol'),
                     'temporada': temporada,
-                    'programa': item.get('programa'),
-                    'video_url': video_url
+                    'programa': item.get('programa')
                     })
         return episodes
 
@@ -112,6 +134,16 @@ channels = c.config(
 ).get_channels()
 media_folder = config["strm_output_folder"]
 
+source_platform = "tv3cat"
+
+# Media lookups share one keep-alive session
+request_timeout = int(config.get('request_timeout', 15))
+tv3cat_session = http.session(config)
+
+# Resolved media URLs per episode ID, the CDN rotates them
+video_urls = TTLCache(maxsize=5000, ttl=int(config.get('media_cache_ttl', 21600)))
+video_urls_lock = threading.Lock()
+
 def to_strm(method):
     for tv3cat_channel in channels:
         log_text = (f'Working {tv3cat_channel}...')
@@ -132,6 +164,8 @@ def to_strm(method):
                 config
             )
 
+            prepared_folders = set()
+            # Media URLs are resolved when an episode is played, see direct()
             for episode in tv3.episodes:
                 video_name = "{} - {}".format(
                     "S{}E{}".format(
@@ -141,9 +175,15 @@ def to_strm(method):
                     episode['titulo']
                 )
 
-                file_content = episode['video_url']
+                file_content = "http://{}:{}/{}/{}/{}".format(
+                    ytdlp2strm_config['ytdlp2strm_host'], 
+                    ytdlp2strm_config['ytdlp2strm_port'], 
+                    source_platform, 
+                    'direct', 
+                    episode['id']
+                )
 
-                file_path = "{}/{}/{}/{}.{}".format(
+                folder_path = "{}/{}/{}".format(
                     media_folder,  
                     sanitize(
                         "{}".format(
@@ -154,30 +194,48 @@ def to_strm(method):
                         "S{}".format(
                             str(episode['temporada']).zfill(2)
                         )
-                    ), 
+                    )
+                )
+                file_path = "{}/{}.{}".format(
+                    folder_path,
                     sanitize(video_name), 
                     "strm"
                 )
 
-                f.Folders().make_clean_folder(
-                    "{}/{}/{}".format(
-                        media_folder,  
-                        sanitize(
-                            "{}".format(
-                                tv3.channel_name
-                            )
-                        ),  
-                        sanitize(
-                            "S{}".format(
-                                str(episode['temporada']).zfill(2)
-                            )
-                        )
-                    ),
-                    False,
-                    config
-                )
+                # Clean each season folder once, not once per episode
+                if folder_path not in prepared_folders:
+                    prepared_folders.add(folder_path)
+                    f.Folders().make_clean_folder(
+                        folder_path,
+                        False,
+                        config
+                    )
+
+                # STRMs from older versions hold an expiring CDN URL, point them at the route
+                if os.path.isfile(file_path):
+                    with open(file_path, 'r', encoding='utf-8') as strm:
+                        if strm.read().strip() != file_content:
+                            os.remove(file_path)
 
                 f.Folders().write_file(
                     file_path, 
                     file_content
-                )
\ No newline at end of file
+                )
+
+
+## -- REDIRECT VIDEO DATA
+def direct(tv3cat_id):
+    prefetch.played(source_platform, tv3cat_id)
+
+    video_url = tv3cat.get_video_url(tv3cat_id)
+    if not video_url:
+        abort(404)
+    # The CDN URL rotates, a permanent redirect could be cached past its expiry
+    return redirect(video_url, code=302)
+
+
+def warm_url(tv3cat_id):
+    """Resolve an episode ahead of playback so the request is served from the cache"""
+    tv3cat.get_video_url(tv3cat_id)
+
+prefetch.register(source_platform, media_folder, {'direct': warm_url})
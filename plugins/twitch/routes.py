@@ -1,7 +1,10 @@
 from __main__ import app
-from plugins.twitch.twitch import direct, bridge
+from plugins.twitch.twitch import direct, bridge, live_monitor
 from flask import request  # Importa request desde Flask
 
+# Keep the !000-live entries in step with the channels' live status
+live_monitor.start()
+
 ### TWITCH ZONE
 #Redirect to best pre-merget format youtube url
 @app.route("/twitch/direct/<twitch_id>")
@@ -1,28 +1,44 @@
-from flask import stream_with_context, Response, send_file, redirect
+from flask import stream_with_context, Response, send_file, redirect, abort
 from sanitize_filename import sanitize
 import os
+import json
 import requests
 import re
+import threading
 import time
 import sys
 from datetime import datetime
-from cachetools import TTLCache
+from urllib.parse import parse_qs, urlparse
+from cachetools import LRUCache, TLRUCache, TTLCache
+from clases.cadence.cadence import Cadence
 from clases.config import config as c
 from clases.worker import worker as w
 from clases.folders import folders as f
+from clases.http_client.http_client import http
 from clases.nfo import nfo as n
+from clases.prefetch.prefetch import prefetch
 from clases.log import log as l
+from clases.metrics.metrics import metrics
 
 
 ## -- TWITCH CLASS
 class Twitch:
-    def __init__(self, channel):
+    def __init__(self, channel, metadata=None, known_ids=None):
         self.channel = channel
         self.twitch_channel_url = "https://www.twitch.tv/{}".format(channel)
-        self.channel_name = self.get_name()
-        self.images = self.get_thumbs()
-        self.direct = self.get_direct()
-        self.videos = self.get_videos()
+        # Set once a VOD listing produced at least one entry
+        self.enumerated = False
+        if metadata:
+            # Everything but the VOD list comes from the batched GQL query
+            self.channel_name = metadata['name']
+            self.images = metadata['images']
+            self.direct = metadata['direct']
+            self.videos = []
+        else:
+            self.channel_name = self.get_name()
+            self.images = self.get_thumbs()
+            self.direct = self.get_direct()
+            self.videos = self.get_videos(known_ids)
 
     def get_name(self):
         command = [
@@ -39,7 +55,7 @@ class Twitch:
             '--no-warnings'
         ]
 
-        channel_name =Worker(
+        channel_name = w.Worker(
             command
         ).output()
         
@@ -63,7 +79,7 @@ class Twitch:
         ]
 
         return [
-           Worker(
+            w.Worker(
                 command
             ).output()
         ]
@@ -101,10 +117,11 @@ class Twitch:
             }
         ]
 
-        response = requests.post(
-            'https://gql.twitch.tv/gql', 
-            headers=headers, 
-            json=data
+        response = gql_session.post(
+            gql_url,
+            headers=headers,
+            json=data,
+            timeout=15
         )
 
         return response.json()
@@ -126,7 +143,7 @@ class Twitch:
         ]
         #The madness begins... 
         #No comments between lines, smoke a joint if you want understand it
-        lines =Worker(
+        lines = w.Worker(
             command
         ).output().split('\n')
         headers = []
@@ -173,13 +190,20 @@ class Twitch:
             "preview" : preview
         }
 
-    def get_videos(self):
+    def get_videos(self, known_ids=None):
+        """
+        Stream the flat VOD list newest first and stop at the first VOD already
+        in the library, then extract full metadata for the new ones only.
+        An empty known_ids lists every VOD.
+        """
+        if known_ids is None:
+            known_ids = library_video_ids(channel_folder(self.channel))
+
         command = [
-            'yt-dlp', 
-            '--print', '"%(id)s;%(title)s;%(description)s;%(thumbnail)s;%(upload_date)s"', 
-            '--dateafter', "today-{}days".format(days_after),
-            '--playlist-start', '1', 
-            '--playlist-end', videos_limit, 
+            'yt-dlp',
+            '--flat-playlist',
+            '--dump-json',
+            '--playlist-end', str(videos_limit),
             '--ignore-errors',
             '--no-warnings',
             '{}/{}'.format(
@@ -187,9 +211,46 @@ class Twitch:
                 "videos"
             )
         ]
-        returnWorker(
-            command
-        ).output().split('\n')
+
+        new_ids = []
+        for line in w.Worker(command).stream():
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            self.enumerated = True
+            if entry.get('id') in known_ids:
+                l.log("twitch", f"Reached known VOD {entry['id']}, stopping enumeration")
+                break
+            new_ids.append(entry['id'])
+
+        if not new_ids:
+            return []
+
+        command = [
+            'yt-dlp',
+            '--dump-json',
+            '--dateafter', "today-{}days".format(days_after),
+            '--ignore-errors',
+            '--no-warnings'
+        ] + ['https://www.twitch.tv/videos/{}'.format(video_id.lstrip('v')) for video_id in new_ids]
+
+        videos = []
+        for line in w.Worker(command).output().split('\n'):
+            if not line.strip():
+                continue
+            try:
+                data = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            videos.append({
+                "id": data.get('id'),
+                "title": data.get('title') or data.get('id'),
+                "description": data.get('description') or "",
+                "thumbnail": data.get('thumbnail') or "",
+                "upload_date": data.get('upload_date')
+            })
+        return videos
 ## -- END
 
 recent_requests = TTLCache(maxsize=200, ttl=30)
@@ -220,59 +281,388 @@ if 'days_dateafter' in config:
 else:
     days_after = "10"
     videos_limit = "10"
+
+gql_url = config.get('gql_url', 'https://gql.twitch.tv/gql')
+# Twitch rejects batches with more operations than this
+gql_batch_size = 35
+gql_session = http.session(config)
+gql_query = """
+query ChannelSync($login: String!) {
+    user(login: $login) {
+        login
+        displayName
+        profileImageURL(width: 300)
+        bannerImageURL
+        stream {
+            id
+            title
+            createdAt
+            previewImageURL(width: 1920, height: 1080)
+        }
+        videos(first: 1, sort: TIME) {
+            edges {
+                node {
+                    id
+                }
+            }
+        }
+    }
+}
+"""
+
+# Live status only, polled by the live monitor
+gql_live_query = """
+query ChannelLive($login: String!) {
+    user(login: $login) {
+        login
+        displayName
+        stream {
+            id
+            title
+            createdAt
+            previewImageURL(width: 1920, height: 1080)
+        }
+    }
+}
+"""
+
+# Resolved playback URLs, each kept until its signed token expires
+url_cache_ttl = int(config.get('url_cache_ttl', 3600))
+resolved_urls = TLRUCache(maxsize=500, ttu=lambda key, value, now: value[1], timer=time.time)
+# URL form that resolved each twitch_id last time
+url_forms = LRUCache(maxsize=5000)
+resolved_urls_lock = threading.Lock()
+
+channel_state_file = os.path.join('logs', 'twitch_channels.json')
+channel_state_lock = threading.Lock()
 ## -- END
 
 
-def video_id_exists_in_content(media_folder, video_id):
-    for root, dirs, files in os.walk(media_folder):
-        for file in files:
-            if file.endswith(".strm"):
-                file_path = os.path.join(root, file)
-                with open(file_path, 'r') as f:
-                    if video_id in f.read():
-                        return True
-    return False
+def gql_headers():
+    return {
+        'Accept': '*/*',
+        'Client-Id': client_id,
+        'Client-Version': client_version,
+        'Content-Type': 'text/plain;charset=UTF-8',
+        'Origin': 'https://www.twitch.tv',
+        'Referer': 'https://www.twitch.tv/',
+    }
+
+
+def get_channels_metadata(logins, query=gql_query):
+    """
+    Fetch names, images, live state and latest VOD of every channel with
+    batched GQL requests. Channels missing from the result fall back to yt-dlp.
+    """
+    metadata = {}
+    for start in range(0, len(logins), gql_batch_size):
+        batch = logins[start:start + gql_batch_size]
+        data = [
+            {
+                "query": query,
+                "variables": {"login": login}
+            }
+            for login in batch
+        ]
 
-## -- MANDATORY TO_STRM FUNCTION 
-def to_strm(method):
-    for twitch_channel in channels:
-        log_text = ("Preparing channel {}".format(twitch_channel))
-        l.log("twitch", log_text)
-        twitch_channel = twitch_channel.replace('https://www.twitch.tv/', '')
-        twitch = Twitch(twitch_channel)
+        try:
+            response = gql_session.post(gql_url, headers=gql_headers(), json=data, timeout=15)
+            response.raise_for_status()
+            results = response.json()
+        except (requests.RequestException, ValueError) as e:
+            l.log("twitch", f"GQL metadata request failed: {e}")
+            continue
+
+        for login, result in zip(batch, results):
+            user = (result.get('data') or {}).get('user')
+            if not user:
+                l.log("twitch", f"No GQL metadata for {login}")
+                continue
+            metadata[login] = parse_channel_metadata(user)
+
+    return metadata
+
+
+def parse_channel_metadata(user):
+    direct = []
+    stream = user.get('stream')
+    if stream:
+        try:
+            upload_date = datetime.strptime(stream['createdAt'][:10], '%Y-%m-%d').strftime('%Y%m%d')
+        except (TypeError, ValueError):
+            upload_date = datetime.now().strftime('%Y%m%d')
+        # Same layout yt-dlp prints for the live stream
+        direct.append('"{};{};NA;{};{}"'.format(
+            stream['id'],
+            (stream.get('title') or user['login']).replace(';', ','),
+            stream.get('previewImageURL') or '',
+            upload_date
+        ))
+    else:
+        direct.append('')
+
+    edges = (user.get('videos') or {}).get('edges') or []
+    return {
+        "name": user.get('displayName') or user['login'],
+        "images": {
+            "poster": user.get('profileImageURL') or '',
+            "landscape": user.get('bannerImageURL') or '',
+            "preview": ''
+        },
+        "direct": direct,
+        "latest_vod": edges[0]['node']['id'] if edges else None
+    }
+
+
+def load_channel_state():
+    try:
+        with open(channel_state_file, 'r', encoding='utf-8') as file:
+            state = json.load(file)
+        return state if isinstance(state, dict) else {}
+    except FileNotFoundError:
+        return {}
+    except Exception as e:
+        l.log("twitch", f"Error reading {channel_state_file}: {e}")
+        return {}
+
+
+def save_channel_state(state):
+    temp_file = f"{channel_state_file}.tmp"
+    try:
+        with channel_state_lock:
+            os.makedirs(os.path.dirname(channel_state_file), exist_ok=True)
+            with open(temp_file, 'w', encoding='utf-8') as file:
+                json.dump(state, file, indent=4)
+            os.replace(temp_file, channel_state_file)
+    except Exception as e:
+        l.log("twitch", f"Error saving {channel_state_file}: {e}")
+
+
+def channel_folder(twitch_channel):
+    return "{}/{}".format(
+        media_folder,
+        sanitize(
+            "{}".format(
+                twitch_channel
+            )
+        )
+    )
 
-        # -- MAKES CHANNEL DIR IF NOT EXIST,
-        f.Folders().make_clean_folder(
-            "{}/{}".format(
-                media_folder,  
-                sanitize(
-                    "{}".format(
-                        twitch.channel
-                    )
-                )
+
+def library_video_ids(folder_path):
+    """Collect the VOD IDs already present as STRM files in a channel folder"""
+    video_ids = set()
+    try:
+        for file_name in os.listdir(folder_path):
+            if not file_name.endswith(".strm"):
+                continue
+            try:
+                with open(os.path.join(folder_path, file_name), 'r', encoding='utf-8') as file:
+                    video_ids.add(file.read().strip().rsplit('@', 1)[-1])
+            except Exception:
+                continue
+    except FileNotFoundError:
+        pass
+    return video_ids
+
+def live_file_path(twitch_channel):
+    return "{}/{}/{}.{}".format(
+        media_folder,
+        sanitize(
+            "{}".format(
+                twitch_channel)
             ),
-            False,
-            ytdlp2strm_config
+        sanitize(
+            "!000-live-{}".format(
+                twitch_channel
+            )
+        ),
+        "strm"
+    )
+
+
+def write_live_files(twitch_channel, line, method):
+    """Write the !000-live STRM and NFO for a channel that is on air"""
+    file_path = live_file_path(twitch_channel)
+    line = line.replace('"', '')
+    video_id = str(line).rstrip().split(';')[0]
+    video_name = str(line).rstrip().split(';')[1].split(" ")
+    description = str(line).rstrip().split(';')[2]
+    if description == "NA":
+        description = ""
+    thumbnail = str(line).rstrip().split(';')[3]
+    try:
+        video_name.pop(3)
+    except:
+        pass
+
+    video_name = "{} [{}]".format(
+        ' '.join(
+            video_name
+        ),
+        video_id
+    )
+
+    file_content = "http://{}:{}/{}/{}/{}".format(
+        ytdlp2strm_config['ytdlp2strm_host'],
+        ytdlp2strm_config['ytdlp2strm_port'],
+        source_platform,
+        method, "{}@{}".format(
+            twitch_channel,
+            video_id
+            )
         )
-        ## -- END
-        # -- MAKES CHANNEL DIR IF NOT EXIST,
-        f.Folders().make_clean_folder(
-            "{}/{}".format(
-                media_folder,  
-                sanitize(
-                    "{}".format(
-                        twitch.channel
-                    )
+
+    if not os.path.isfile(file_path):
+        f.Folders().write_file(
+            file_path,
+            file_content
+        )
+    ## -- BUILD VIDEO NFO FILE
+    n.Nfo(
+        "episode",
+        "{}/{}".format(
+            media_folder,
+            "{}".format(
+                twitch_channel
+            )
+        ),
+        {
+            "item_name" : sanitize(
+                "!000-live-{}".format(
+                    twitch_channel
                 )
             ),
+            "title" : sanitize(f'!000-live-{video_name}'),
+            "upload_date" : "",
+            "year" : "",
+            "plot" : description.replace('\n', ' <br/>\n '),
+            "season" : "1",
+            "episode" : "",
+            "preview" : thumbnail
+        }
+    ).make_nfo()
+    ## -- END
+
+
+def remove_live_files(twitch_channel):
+    """Remove the !000-live STRM/NFO/PNG trio once a channel is off air"""
+    file_path = live_file_path(twitch_channel)
+    for path in (file_path, file_path.replace('.strm', '.nfo'), file_path.replace('.strm', '.png')):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+def sync_channel(twitch_channel, channel_metadata, channel_state, method):
+    """Write the STRM and NFO files of one channel, returns its (video_id, upload_date) pairs"""
+    # A folder that gets cleaned is rewritten from the listing alone, so it cannot stop at known VODs
+    known_ids = set() if ytdlp2strm_config.get("ytdlp2strm_keep_old_strm") == "False" else None
+    twitch = Twitch(twitch_channel, channel_metadata, known_ids)
+    if channel_metadata:
+        latest_vod = channel_metadata['latest_vod']
+        # Only list VODs with yt-dlp when a new one was published
+        if latest_vod and latest_vod != channel_state.get(twitch_channel, {}).get('latest_vod'):
+            twitch.videos = twitch.get_videos(known_ids)
+        else:
+            l.log("twitch", f"No new VODs for {twitch_channel}")
+    uploads = []
+
+    # -- MAKES CHANNEL DIR IF NOT EXIST,
+    # A folder may only be cleaned when its VODs were just listed, nothing rewrites it otherwise
+    folder_path = channel_folder(twitch_channel)
+    if twitch.enumerated or not os.path.isdir(folder_path):
+        f.Folders().make_clean_folder(
+            folder_path,
             False,
             ytdlp2strm_config
         )
-        ## -- END
+    ## -- END
+
+    ## -- BUILD CHANNEL NFO FILE
+    n.Nfo(
+        "tvshow",
+        "{}/{}".format(
+            media_folder, 
+            "{}".format(
+                twitch.channel
+            )
+        ),
+        {
+            "title" : twitch.channel_name,
+            "plot" : "",
+            "season" : "1",
+            "episode" : "-1",
+            "landscape" : twitch.images['landscape'],
+            "poster" : twitch.images['poster'],
+            "studio" : "Twitch"
+        }
+    ).make_nfo()
+    ## -- END 
+    
+    ## -- GET ON AIR STREAMING
+    for line in twitch.direct:
+        if line != "":
+            if not 'ERROR' in line:
+                write_live_files(twitch_channel, line, method)
+        else:
+            log_text = ("The channel is not currently live")
+            l.log("twitch", log_text)
+            remove_live_files(twitch_channel)
+    ## -- END
+
+    ## -- GET VIDEOS TAB
+    for video in twitch.videos:
+        video_id = video['id']
+        video_name = video['title'].split(" ")
+        description = video['description']
+        thumbnail = video['thumbnail']
+        try:
+            date = datetime.strptime(video['upload_date'], '%Y%m%d')
+        except (TypeError, ValueError):
+            date = datetime.now()
+        upload_date = date.strftime('%Y-%m-%d')
+        year = date.year
+        uploads.append((video_id, date.strftime('%Y%m%d')))
+        try:
+            video_name.pop(3)
+        except:
+            pass
+
+        video_name = ' '.join(
+            video_name
+        )
+        video_name = re.sub(r'\d{4}-\d{2}-\d{2} \d{4}', '', video_name).strip()
+        video_name = "{} [{}]".format(
+            video_name,
+            video_id
+        )
 
-        ## -- BUILD CHANNEL NFO FILE
+        file_content = "http://{}:{}/{}/{}/{}".format(
+            ytdlp2strm_config['ytdlp2strm_host'], 
+            ytdlp2strm_config['ytdlp2strm_port'], 
+            source_platform,
+            method, 
+            "{}@{}".format(
+                twitch_channel, 
+                video_id
+            )
+        )
+
+        file_path = "{}/{}.{}".format(
+            channel_folder(twitch_channel),
+            sanitize(
+                "{}".format(
+                    video_name
+                )
+            ), 
+            "strm"
+        )
+
+        ## -- BUILD VIDEO NFO FILE
         n.Nfo(
-            "tvshow",
+            "episode",
             "{}/{}".format(
                 media_folder, 
                 "{}".format(
@@ -280,363 +670,227 @@ def to_strm(method):
                 )
             ),
             {
-                "title" : twitch.channel_name,
-                "plot" : "",
+                "item_name" : sanitize(video_name),
+                "title" : sanitize(video_name),
+                "upload_date" : upload_date,
+                "year" : year,
+                "plot" : description.replace('\n', ' <br/>\n '),
                 "season" : "1",
-                "episode" : "-1",
-                "landscape" : twitch.images['landscape'],
-                "poster" : twitch.images['poster'],
-                "studio" : "Twitch"
+                "episode" : "",
+                "preview" : thumbnail
             }
         ).make_nfo()
         ## -- END 
-        
-        ## -- GET ON AIR STREAMING
-        for line in twitch.direct:
-            file_path = "{}/{}/{}.{}".format(
-                media_folder,  
-                sanitize(
-                    "{}".format(
-                        twitch_channel)
-                    ), 
-                sanitize(
-                    "!000-live-{}".format(
-                        twitch_channel
-                    )
-                ), 
-                "strm"
+
+        if not os.path.isfile(file_path):
+            f.Folders().write_file(
+                file_path, 
+                file_content
             )
-            if line != "":
-                if not 'ERROR' in line:
-                    line = line.replace('"', '')
-                    video_id = str(line).rstrip().split(';')[0]
-                    video_name = str(line).rstrip().split(';')[1]
-                    description = str(line).rstrip().split(';')[2]
-                    if description == "NA":
-                        description = ""
-                    thumbnail = str(line).rstrip().split(';')[3]
-                    date = datetime.strptime(str(line).rstrip().split(';')[4], '%Y%m%d')
-                    upload_date = date.strftime('%Y-%m-%d')
-                    year = date.year
-                    try:
-                        video_name.pop(3)
-                    except:
-                        pass
-
-                    video_name = "{} [{}]".format(
-                        ' '.join(
-                            video_name
-                        ),
-                        video_id
-                    )
+    ## --END
+    if channel_metadata and channel_metadata['latest_vod'] and twitch.enumerated:
+        channel_state.setdefault(twitch_channel, {})['latest_vod'] = channel_metadata['latest_vod']
+        save_channel_state(channel_state)
+    return uploads
 
-                    file_content = "http://{}:{}/{}/{}/{}".format(
-                        ytdlp2strm_config['ytdlp2strm_host'], 
-                        ytdlp2strm_config['ytdlp2strm_port'], 
-                        source_platform, 
-                        method, "{}@{}".format(
-                            twitch_channel, 
-                            video_id
-                            )
-                        )
 
-                    data = {
-                        "video_id" : video_id, 
-                        "video_name" : video_name
-                    }
+## -- MANDATORY TO_STRM FUNCTION 
+def to_strm(method):
+    cadence = Cadence(source_platform, config)
+    due_channels = cadence.due_channels(channels)
+    channel_state = load_channel_state()
+    metadata = get_channels_metadata(
+        [channel_entry.replace('https://www.twitch.tv/', '') for channel_entry in due_channels]
+    )
 
-                    if not os.path.isfile(file_path):
-                        f.Folders().write_file(
-                            file_path, 
-                            file_content
-                        )
-                    ## -- BUILD VIDEO NFO FILE
-                    n.Nfo(
-                        "episode",
-                        "{}/{}".format(
-                            media_folder, 
-                            "{}".format(
-                                twitch.channel
-                            )
-                        ),
-                        {
-                            "item_name" : sanitize(
-                                "!000-live-{}".format(
-                                    twitch.channel
-                                )
-                            ),
-                            "title" : sanitize(f'!000-live-{video_name}'),
-                            "upload_date" : "",
-                            "year" : "",
-                            "plot" : description.replace('\n', ' <br/>\n '),
-                            "season" : "1",
-                            "episode" : "",
-                            "preview" : thumbnail
-                        }
-                    ).make_nfo()
-                    ## -- END 
-            else:
-                log_text = ("The channel is not currently live")
-                l.log("twitch", log_text)
-                try:
-                    os.remove( file_path )
-                    os.remove( file_path.replace('.strm','.nfo'))
-                    os.remove( file_path.replace('.strm','.png'))
-                except:
-                    pass
-        ## -- END
-
-        ## -- GET VIDEOS TAB
-        for line in twitch.videos:
-            if line != "":
-                if not 'ERROR' in line:
-                    line = line.replace('"','')
-                    video_id = str(line).rstrip().split(';')[0]
-                    video_name = str(line).rstrip().split(';')[1].split(" ")
-                    description = str(line).rstrip().split(';')[2]
-                    if description == "NA":
-                        description = ""
-                    thumbnail = str(line).rstrip().split(';')[3]
-                    date = datetime.strptime(str(line).rstrip().split(';')[4], '%Y%m%d')
-                    upload_date = date.strftime('%Y-%m-%d')
-                    year = date.year
-                    try:
-                        video_name.pop(3)
-                    except:
-                        pass
-
-                    video_name = ' '.join(
-                        video_name
-                    )
-                    video_name = re.sub(r'\d{4}-\d{2}-\d{2} \d{4}', '', video_name).strip()
-                    video_name = "{} [{}]".format(
-                        video_name,
-                        video_id
-                    )
+    for channel_entry in due_channels:
+        log_text = ("Preparing channel {}".format(channel_entry))
+        l.log("twitch", log_text)
+        twitch_channel = channel_entry.replace('https://www.twitch.tv/', '')
+        try:
+            uploads = sync_channel(twitch_channel, metadata.get(twitch_channel), channel_state, method)
+        except Exception as e:
+            # One failing channel must not stop the others
+            l.log("twitch", f"Error syncing channel {twitch_channel}: {e}")
+            cadence.record_failure(channel_entry)
+            continue
+        cadence.record_sync(channel_entry, uploads)
 
-                    file_content = "http://{}:{}/{}/{}/{}".format(
-                        ytdlp2strm_config['ytdlp2strm_host'], 
-                        ytdlp2strm_config['ytdlp2strm_port'], 
-                        source_platform,
-                        method, 
-                        "{}@{}".format(
-                            twitch_channel, 
-                            video_id
-                        )
-                    )
+    return True 
+## -- END
 
-                    file_path = "{}/{}/{}.{}".format(
-                        media_folder,  
-                        sanitize(
-                            "{}".format(
-                                twitch_channel
-                            )
-                        ), 
-                        sanitize(
-                            "{}".format(
-                                video_name
-                            )
-                        ), 
-                        "strm"
-                    )
+class LiveMonitor:
+    """
+    Poll the live status of every configured channel with one batched GQL
+    request and toggle the !000-live entries as soon as it changes,
+    independently of the VOD sync.
+    """
+
+    def __init__(self, config):
+        self.enabled = str(config.get('live_monitor', False)).lower() == 'true'
+        self.interval = int(config.get('live_monitor_interval', 60))
+        self.method = config.get('live_monitor_method', 'direct')
+        # Last seen stream id per channel, None while offline
+        self.live = {}
+        self.thread = None
+
+    def start(self):
+        if not self.enabled or self.thread:
+            return
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+        l.log("twitch", f"Live monitor started, polling every {self.interval}s")
+
+    def run(self):
+        while True:
+            try:
+                self.poll()
+            except Exception as e:
+                l.log("twitch", f"Live monitor poll failed: {e}")
+            time.sleep(self.interval)
+
+    def poll(self):
+        logins = [
+            channel_entry.replace('https://www.twitch.tv/', '')
+            for channel_entry in c.config(channels_list).get_channels()
+        ]
+        metadata = get_channels_metadata(logins, gql_live_query)
 
+        for login, channel_metadata in metadata.items():
+            # The full sync creates the channel folder and tvshow.nfo
+            if not os.path.isdir("{}/{}".format(media_folder, sanitize(login))):
+                continue
 
-                    folder_path = "{}/{}".format(
-                        media_folder,  
-                        sanitize(
-                            "{}".format(
-                                twitch_channel
-                            )
-                        )
-                    )
+            line = channel_metadata['direct'][0]
+            stream_id = line.replace('"', '').split(';')[0] if line else None
+            if login in self.live and self.live[login] == stream_id:
+                continue
 
-                    if video_id_exists_in_content(folder_path, video_id):
-                        l.log("twitch", f'Video {video_id} already exists')
-                        continue
+            if line:
+                l.log("twitch", f"{login} is live, writing live entry")
+                write_live_files(login, line, self.method)
+            else:
+                if self.live.get(login):
+                    l.log("twitch", f"{login} went offline, removing live entry")
+                remove_live_files(login)
+            self.live[login] = stream_id
 
-                    data = {
-                        "video_id" : video_id, 
-                        "video_name" : video_name
-                    }
 
-                    ## -- BUILD VIDEO NFO FILE
-                    n.Nfo(
-                        "episode",
-                        "{}/{}".format(
-                            media_folder, 
-                            "{}".format(
-                                twitch.channel
-                            )
-                        ),
-                        {
-                            "item_name" : sanitize(video_name),
-                            "title" : sanitize(video_name),
-                            "upload_date" : upload_date,
-                            "year" : year,
-                            "plot" : description.replace('\n', ' <br/>\n '),
-                            "season" : "1",
-                            "episode" : "",
-                            "preview" : thumbnail
-                        }
-                    ).make_nfo()
-                    ## -- END 
-
-                    if not os.path.isfile(file_path):
-                        f.Folders().write_file(
-                            file_path, 
-                            file_content
-                        )
-        ## --END
-    
-    return True 
-## -- END
+live_monitor = LiveMonitor(config)
+
 
 ## --  REDIRECT VIDEO DATA 
-def direct(twitch_id, remote_addr): 
-    current_time = time.time()
-    cache_key = f"{remote_addr}_{twitch_id}"
-    
-    # Check if the request is already cached
-    if cache_key not in recent_requests:
-        log_text = f'[{remote_addr}] Playing {twitch_id}'
-        l.log("twitch", log_text)
-        recent_requests[cache_key] = current_time
+def url_candidates(channel, video_id):
+    """URL forms yt-dlp may need to resolve a twitch_id, in default order"""
+    return {
+        "vod": f'https://www.twitch.tv/videos/{video_id}',
+        "vod_numeric": f'https://www.twitch.tv/videos/{video_id.replace("v", "")}',
+        "live": f'https://www.twitch.tv/{channel}'
+    }
+
+
+def url_expiry(url):
+    """Expiry of a signed playback URL, taken from the token Twitch embeds in it"""
+    now = time.time()
+    try:
+        query = parse_qs(urlparse(url).query)
+        token = (query.get('token') or query.get('nauth'))[0]
+        expires = float(json.loads(token)['expires']) - 60
+    except Exception:
+        return now + url_cache_ttl
+    return min(expires, now + url_cache_ttl)
+
+
+def resolve_url(twitch_id):
+    """
+    Return the playback URL for a twitch_id, from the cache while it is valid.
+    The URL form that worked last time is tried first.
+    """
+    with resolved_urls_lock:
+        cached = resolved_urls.get(twitch_id)
+        learned = url_forms.get(twitch_id)
+    metrics.cache('twitch_urls', cached)
+    if cached:
+        return cached[0]
 
     channel = twitch_id.split("@")[0]
     video_id = twitch_id.split("@")[1]
-    command = [
-        'yt-dlp', 
-        '-f', 'best',
-        '--no-warnings',
-        f'https://www.twitch.tv/videos/{video_id}',
-        '--get-url'
-    ]
-
-    twitch_url =Worker(command).output()
-
-    if 'ERROR' in twitch_url or not twitch_url:
-        twitch_url =Worker(
+    candidates = url_candidates(channel, video_id)
+    forms = sorted(candidates, key=lambda form: form != learned)
+
+    for form in forms:
+        twitch_url = w.Worker(
             [
                 'yt-dlp', 
                 '-f', 'best',
                 '--no-warnings',
-                f'https://www.twitch.tv/videos/{video_id.replace("v", "")}',
+                candidates[form],
                 '--get-url'
-            ]   
-        ).output()
+            ]
+        ).output().strip()
 
-        if 'ERROR' in twitch_url or not twitch_url:
-            twitch_url =Worker(
-                [
-                    'yt-dlp', 
-                    '-f', 'best',
-                    '--no-warnings',
-                    f'https://www.twitch.tv/{channel}',
-                    '--get-url'
-                ]   
-            ).output()
-
-    twitch_url = twitch_url.strip()
-    return redirect(twitch_url, code=301)
-
-def bridge(twitch_id):
-    channel = twitch_id.split("@")[0]
-    video_id = twitch_id.split("@")[1]
+        if twitch_url and not 'ERROR' in twitch_url:
+            with resolved_urls_lock:
+                url_forms[twitch_id] = form
+                resolved_urls[twitch_id] = (twitch_url, url_expiry(twitch_url))
+            return twitch_url
 
-    turl = 'https://www.twitch.tv/videos/{}'.format(
-        video_id
-    )
-    twitch_url =Worker(
-        [
-            'yt-dlp', 
-            '-f', 'best',
-            '--no-warnings',
-            turl,
-            '--get-url'
-        ]   
-    ).output()
+    l.log("twitch", f"Could not resolve a playback URL for {twitch_id}")
+    return ""
 
-    if 'ERROR' in twitch_url:
 
-        turl = 'https://www.twitch.tv/videos/{}'.format(
-            video_id.replace(
-                'v',
-                ''
-            )
-        )
-
-        twitch_url =Worker(
-            [
-                'yt-dlp', 
-                '-f', 'best',
-                '--no-warnings',
-                turl,
-                '--get-url'
-            ]   
-        ).output()
+def warm_url(twitch_id):
+    """Resolve a VOD ahead of playback so the request is served from the cache"""
+    resolve_url(twitch_id)
 
-        if 'ERROR' in twitch_url:
+# Warm the next VOD whichever method the STRM files use
+prefetch.register(
+    source_platform,
+    media_folder,
+    {'direct': warm_url, 'bridge': warm_url}
+)
 
-            turl = 'https://www.twitch.tv/{}'.format(
-                channel          
-            )
 
-            twitch_url =Worker(
-                [
-                    'yt-dlp', 
-                    '-f', 'best',
-                    '--no-warnings',
-                    'https://www.twitch.tv/{}'.format(
-                        channel          
-                    ),
-                    '--get-url'
-                ]   
-            ).output()
+def direct(twitch_id, remote_addr): 
+    prefetch.played(source_platform, twitch_id)
+    current_time = time.time()
+    cache_key = f"{remote_addr}_{twitch_id}"
+    
+    # Check if the request is already cached
+    if cache_key not in recent_requests:
+        log_text = f'[{remote_addr}] Playing {twitch_id}'
+        l.log("twitch", log_text)
+        recent_requests[cache_key] = current_time
 
+    twitch_url = resolve_url(twitch_id)
+    if not twitch_url:
+        abort(404)
+    # The resolved URL is signed and expires, a permanent redirect could be cached past its expiry
+    return redirect(twitch_url, code=302)
 
+def bridge(twitch_id):
+    prefetch.played(source_platform, twitch_id)
+    twitch_url = resolve_url(twitch_id)
+    if not twitch_url:
+        abort(404)
 
     def generate():
-        startTime = time.time()
-        buffer = []
-        sentBurst = False
+        # Remux the already resolved stream instead of extracting it again
         command = [
-            'yt-dlp', 
-            '-o', '-',
-            '-f', 'best',
-            '--no-warnings',
-            '--restrict-filenames',
-            turl
+            'ffmpeg',
+            '-loglevel', 'error',
+            '-i', twitch_url,
+            '-c', 'copy',
+            '-f', 'mpegts',
+            'pipe:1'
         ]
 
-        process =Worker(command).pipe()
-        try:
-            while True:
-                # Get some data from ffmpeg
-                line = process.stdout.read(1024)
-
-                # We buffer everything before outputting it
-                buffer.append(line)
-
-                # Minimum buffer time, 3 seconds
-                if sentBurst is False and time.time() > startTime + 3 and len(buffer) > 0:
-                    sentBurst = True
-
-                    for i in range(0, len(buffer) - 2):
-                        log_text = ("Send initial burst #", i)
-                        l.log("twitch", log_text)
-                        yield buffer.pop(0)
-
-                elif time.time() > startTime + 3 and len(buffer) > 0:
-                    yield buffer.pop(0)
-
-                process.poll()
-                if isinstance(process.returncode, int):
-                    if process.returncode > 0:
-                        log_text = ('yt-dlp Error', process.returncode)
-                        l.log("twitch", log_text)
-                    break
-        finally:
-            process.kill()
+        worker = w.Worker(command)
+        yield from worker.chunks()
+
+        if worker.returncode > 0:
+            log_text = f'ffmpeg error {worker.returncode} while bridging {twitch_id}'
+            l.log("twitch", log_text)
 
     return Response(
         stream_with_context(generate()), 
@@ -644,4 +898,4 @@ def bridge(twitch_id):
     ) 
 
 
-## -- END
\ No newline at end of file
+## -- END
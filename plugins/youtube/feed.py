@@ -0,0 +1,199 @@
+"""
+YouTube Atom feed pre-check.
+
+YouTube publishes a small Atom feed with the latest ~15 uploads of every
+channel and playlist. Fetching it with a conditional GET is far cheaper than
+a full yt-dlp extraction, so syncs use it to find out whether anything new
+was published and only hand the new video IDs to yt-dlp.
+"""
+
+import json
+import os
+import threading
+import time
+import xml.etree.ElementTree as ET
+from datetime import datetime
+
+import requests
+
+from clases.http_client.http_client import http
+from clases.log import log as l
+
+# Keep-alive session shared by every feed request
+feed_session = http.session()
+state_lock = threading.Lock()
+
+namespaces = {
+    'atom': 'http://www.w3.org/2005/Atom',
+    'yt': 'http://www.youtube.com/xml/schemas/2015',
+    'media': 'http://search.yahoo.com/mrss/'
+}
+
+
+def parse_feed(xml_text):
+    """Parse a YouTube Atom feed into a list of entries, newest first"""
+    entries = []
+    root = ET.fromstring(xml_text)
+
+    for entry in root.findall('atom:entry', namespaces):
+        video_id = entry.findtext('yt:videoId', default='', namespaces=namespaces)
+        if not video_id:
+            continue
+
+        published = entry.findtext('atom:published', default='', namespaces=namespaces)
+        try:
+            upload_date = datetime.fromisoformat(published.replace('Z', '+00:00')).strftime('%Y%m%d')
+        except ValueError:
+            upload_date = None
+
+        entries.append({
+            'id': video_id,
+            'channel_id': entry.findtext('yt:channelId', default='', namespaces=namespaces),
+            'title': entry.findtext('atom:title', default='', namespaces=namespaces),
+            'published': published,
+            'upload_date': upload_date
+        })
+
+    return entries
+
+
+def library_video_ids(folder_path):
+    """Collect the video IDs already present as STRM files in a channel folder"""
+    video_ids = set()
+    try:
+        for file_name in os.listdir(folder_path):
+            if not file_name.endswith('.strm'):
+                continue
+            try:
+                with open(os.path.join(folder_path, file_name), 'r', encoding='utf-8') as f:
+                    video_ids.add(f.read().strip().rstrip('/').split('/')[-1])
+            except Exception:
+                continue
+    except FileNotFoundError:
+        pass
+    return video_ids
+
+
+class Feed:
+    def __init__(self, config):
+        self.enabled = str(config.get('rss_precheck', False)).lower() == 'true'
+        self.feed_url = config.get('rss_feed_url', 'https://www.youtube.com/feeds/videos.xml')
+        self.timeout = int(config.get('rss_timeout', 10))
+        # Run a full yt-dlp sync at least this often to pick up edits the feed does not carry
+        self.full_sync_interval = int(config.get('rss_full_sync_interval', 86400))
+        self.state_file = os.path.join('logs', 'youtube_feeds.json')
+        self.state = self.load_state()
+
+    def load_state(self):
+        try:
+            with open(self.state_file, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+            return state if isinstance(state, dict) else {}
+        except FileNotFoundError:
+            return {}
+        except Exception as e:
+            l.log("youtube", f"Error reading {self.state_file}: {e}")
+            return {}
+
+    def save_state(self):
+        temp_file = f"{self.state_file}.tmp"
+        try:
+            with state_lock:
+                os.makedirs(os.path.dirname(self.state_file), exist_ok=True)
+                with open(temp_file, 'w', encoding='utf-8') as f:
+                    json.dump(self.state, f, indent=4)
+                os.replace(temp_file, self.state_file)
+        except Exception as e:
+            l.log("youtube", f"Error saving {self.state_file}: {e}")
+
+    @staticmethod
+    def is_supported(channel):
+        """Audio, keyword and YouTube Music sources have no usable feed"""
+        return not any(keyword in channel for keyword in ('extractaudio-', 'keyword', 'music.youtube.com'))
+
+    def can_precheck(self, channel):
+        """A feed pre-check needs a previous full sync that located the channel folder"""
+        if not self.enabled or not self.is_supported(channel):
+            return False
+
+        channel_state = self.state.get(channel)
+        if not channel_state or not channel_state.get('channel_id') or not channel_state.get('folder_path'):
+            return False
+
+        last_full_sync = channel_state.get('last_full_sync', 0)
+        return time.time() - last_full_sync < self.full_sync_interval
+
+    @staticmethod
+    def feed_params(channel, channel_id):
+        """
+        Channel sources read the uploads playlist of the tab the full sync lists,
+        UULF for /videos and UULV for /streams, so shorts and other tabs stay out.
+        """
+        if channel_id.startswith('UC'):
+            prefix = 'UULV' if '/streams' in channel else 'UULF'
+            return {'playlist_id': f"{prefix}{channel_id[2:]}"}
+        return {'playlist_id': channel_id}
+
+    def fetch(self, channel):
+        """
+        Conditional GET of the channel feed.
+        Returns (status, entries, validators) where status is 'not_modified', 'ok' or 'error'.
+        """
+        channel_state = self.state.get(channel, {})
+        headers = {}
+        if channel_state.get('etag'):
+            headers['If-None-Match'] = channel_state['etag']
+        if channel_state.get('last_modified'):
+            headers['If-Modified-Since'] = channel_state['last_modified']
+
+        try:
+            response = feed_session.get(
+                self.feed_url,
+                params=self.feed_params(channel, channel_state['channel_id']),
+                headers=headers,
+                timeout=self.timeout
+            )
+        except requests.RequestException as e:
+            l.log("youtube", f"Feed request failed for {channel}: {e}")
+            return 'error', [], {}
+
+        if response.status_code == 304:
+            return 'not_modified', [], {}
+
+        if response.status_code != 200:
+            l.log("youtube", f"Feed for {channel} returned HTTP {response.status_code}")
+            return 'error', [], {}
+
+        try:
+            entries = parse_feed(response.content)
+        except ET.ParseError as e:
+            l.log("youtube", f"Invalid feed for {channel}: {e}")
+            return 'error', [], {}
+
+        validators = {
+            'etag': response.headers.get('ETag'),
+            'last_modified': response.headers.get('Last-Modified')
+        }
+        return 'ok', entries, validators
+
+    def commit(self, channel, validators):
+        """Store feed validators once the entries they cover have been written"""
+        channel_state = self.state.setdefault(channel, {})
+        channel_state.update({key: value for key, value in validators.items() if value})
+        channel_state['last_check'] = time.time()
+        self.save_state()
+
+    def remember(self, channel, channel_id, folder_path, folder_name):
+        """Record where a full yt-dlp sync put the channel so later syncs can use the feed"""
+        channel_state = self.state.setdefault(channel, {})
+        if channel_state.get('channel_id') != channel_id:
+            # Different feed, old validators do not apply
+            channel_state.pop('etag', None)
+            channel_state.pop('last_modified', None)
+        channel_state.update({
+            'channel_id': channel_id,
+            'folder_path': folder_path,
+            'folder_name': folder_name,
+            'last_full_sync': time.time()
+        })
+        self.save_state()
@@ -0,0 +1,142 @@
+"""
+Canonical channel resolution cache.
+
+Handles and custom URLs cost an extra page hop every time yt-dlp has to turn
+them into a channel. Once a full sync has seen the canonical UC channel ID,
+the configured identifier is cached together with its uploads playlist and
+display name, so later syncs can enumerate the playlist directly. Entries are
+revalidated periodically and dropped when the channel URL 404s or redirects.
+"""
+
+import json
+import os
+import threading
+import time
+
+import requests
+
+from clases.http_client.http_client import http
+from clases.log import log as l
+
+resolver_session = http.session()
+state_lock = threading.Lock()
+
+
+class Resolver:
+    def __init__(self, config):
+        self.enabled = str(config.get('channel_cache', True)).lower() == 'true'
+        # Revalidate cached entries against the channel URL this often
+        self.ttl = int(config.get('channel_cache_ttl', 604800))
+        self.timeout = int(config.get('channel_cache_timeout', 10))
+        self.state_file = os.path.join('logs', 'youtube_channels.json')
+        self.state = self.load_state()
+
+    def load_state(self):
+        try:
+            with open(self.state_file, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+            return state if isinstance(state, dict) else {}
+        except FileNotFoundError:
+            return {}
+        except Exception as e:
+            l.log("youtube", f"Error reading {self.state_file}: {e}")
+            return {}
+
+    def save_state(self):
+        temp_file = f"{self.state_file}.tmp"
+        try:
+            with state_lock:
+                os.makedirs(os.path.dirname(self.state_file), exist_ok=True)
+                with open(temp_file, 'w', encoding='utf-8') as f:
+                    json.dump(self.state, f, indent=4)
+                os.replace(temp_file, self.state_file)
+        except Exception as e:
+            l.log("youtube", f"Error saving {self.state_file}: {e}")
+
+    @staticmethod
+    def is_playlist(channel):
+        """A list- entry or a playlist URL, but not a handle that merely contains 'list'"""
+        return channel.startswith('list-') or 'list=' in channel or '/playlist' in channel
+
+    @staticmethod
+    def is_cacheable(channel):
+        """Only plain channel identifiers map to a single uploads playlist"""
+        if Resolver.is_playlist(channel):
+            return False
+        if any(keyword in channel for keyword in ('extractaudio-', 'keyword', 'music.youtube.com', '/streams')):
+            return False
+        return not channel.startswith(('PL', 'UU', 'OL'))
+
+    @staticmethod
+    def uploads_url(entry):
+        """
+        Uploads playlist URL for a cached channel. The UULF variant lists the
+        same long-form uploads as the channel /videos tab.
+        """
+        return f"https://www.youtube.com/playlist?list=UULF{entry['channel_id'][2:]}"
+
+    def lookup(self, channel):
+        """Return the cached resolution for a channel, or None when it must be resolved again"""
+        if not self.enabled or not self.is_cacheable(channel):
+            return None
+
+        entry = self.state.get(channel)
+        if not entry:
+            return None
+
+        if time.time() - entry.get('validated_at', 0) > self.ttl and not self.validate(channel):
+            return None
+        return entry
+
+    def validate(self, channel):
+        """
+        Check that the channel URL still answers without a redirect.
+        Returns False and drops the entry on 404 or redirect.
+        """
+        entry = self.state.get(channel)
+        if not entry:
+            return False
+
+        try:
+            response = resolver_session.head(entry['url'], allow_redirects=False, timeout=self.timeout)
+        except requests.RequestException as e:
+            # Inconclusive, keep using the entry
+            l.log("youtube", f"Could not revalidate {channel}: {e}")
+            return True
+
+        location = response.headers.get('Location', '')
+        if response.status_code in (404, 410) or (response.is_redirect and 'consent.' not in location):
+            l.log("youtube", f"Channel URL for {channel} returned HTTP {response.status_code}, resolving again")
+            self.invalidate(channel)
+            return False
+
+        entry['validated_at'] = time.time()
+        self.save_state()
+        return True
+
+    def remember(self, channel, channel_url, channel_id, name):
+        """Cache the canonical IDs a full extraction found for a configured channel"""
+        if not self.enabled or not self.is_cacheable(channel):
+            return
+        if not channel_id or not channel_id.startswith('UC') or not name:
+            return
+
+        entry = self.state.get(channel, {})
+        if entry.get('channel_id') == channel_id and entry.get('name') == name:
+            return
+
+        now = time.time()
+        self.state[channel] = {
+            'url': channel_url,
+            'channel_id': channel_id,
+            'uploads_playlist': f"UU{channel_id[2:]}",
+            'name': name,
+            'resolved_at': now,
+            'validated_at': now
+        }
+        self.save_state()
+        l.log("youtube", f"Resolved {channel} to {channel_id} ({name})")
+
+    def invalidate(self, channel):
+        if self.state.pop(channel, None) is not None:
+            self.save_state()
@@ -1,7 +1,7 @@
 # plugins/youtube/routes.py
 
 from flask import Blueprint, request, redirect, Response, send_file, abort, jsonify
-from plugins.youtube.youtube import direct, bridge, download, serve_downloaded_file
+from plugins.youtube.youtube import direct, bridge, download, serve_downloaded_file, websub, websub_channel_ids
 import logging
 import os
 
@@ -9,6 +9,9 @@ logger = logging.getLogger(__name__)
 
 youtube_bp = Blueprint('youtube', __name__, url_prefix='/youtube')
 
+# Subscribe configured channels and keep their leases alive while the app runs
+websub.start(websub_channel_ids)
+
 
 @youtube_bp.route('/direct/<youtube_id>')
 def youtube_direct(youtube_id):
@@ -114,6 +117,23 @@ def youtube_status(youtube_id):
         }), 500
 
 
+@youtube_bp.route('/websub', methods=['GET', 'POST'])
+def youtube_websub():
+    """
+    WebSub callback: answers hub verification requests (GET) and
+    receives upload notifications (POST).
+    """
+    if request.method == 'GET':
+        challenge = websub.verify(request.args)
+        if challenge is None:
+            abort(404, description="Unknown subscription")
+        return Response(challenge, mimetype='text/plain')
+
+    queued = websub.receive(request.get_data(), request.headers.get('X-Hub-Signature'))
+    logger.info(f"WebSub notification received, {queued} videos queued")
+    return Response(status=204)
+
+
 @youtube_bp.errorhandler(404)
 def youtube_not_found(error):
     """Handle 404 errors specifically for YouTube routes"""
@@ -0,0 +1,255 @@
+"""
+WebSub (PubSubHubbub) push notifications for YouTube uploads.
+
+YouTube pushes an Atom entry to a subscribed callback within seconds of a
+video being published. Subscriptions are kept alive by renewing leases
+before they expire, and every verified notification queues a single-video
+ingest so polling only has to act as an infrequent reconciliation pass.
+"""
+
+import hashlib
+import hmac
+import json
+import os
+import queue
+import threading
+import time
+import xml.etree.ElementTree as ET
+
+import requests
+
+from clases.http_client.http_client import http
+from clases.log import log as l
+from plugins.youtube.feed import parse_feed
+
+topic_url = 'https://www.youtube.com/xml/feeds/videos.xml?channel_id={}'
+# Guards WebSub.state, changed by hub callbacks on request threads and by the renew loop
+state_lock = threading.Lock()
+
+
+class WebSub:
+    def __init__(self, config, handler):
+        self.enabled = str(config.get('websub_enabled', False)).lower() == 'true'
+        self.hub_url = config.get('websub_hub_url', 'https://pubsubhubbub.appspot.com/subscribe')
+        self.callback_url = config.get('websub_callback_url', '')
+        self.secret = config.get('websub_secret', '')
+        self.lease_seconds = int(config.get('websub_lease_seconds', 432000))
+        # Renew leases that expire within this many seconds
+        self.renew_margin = int(config.get('websub_renew_margin', 86400))
+        self.renew_interval = int(config.get('websub_renew_interval', 3600))
+        self.timeout = int(config.get('websub_timeout', 10))
+        self.handler = handler
+        self.session = http.session(config)
+        self.state_file = os.path.join('logs', 'youtube_websub.json')
+        self.state = self.load_state()
+        self.ingest_queue = queue.Queue()
+        self.queued = set()
+        self.queued_lock = threading.Lock()
+        self.threads = []
+
+    def load_state(self):
+        try:
+            with open(self.state_file, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+            return state if isinstance(state, dict) else {}
+        except FileNotFoundError:
+            return {}
+        except Exception as e:
+            l.log("youtube", f"Error reading {self.state_file}: {e}")
+            return {}
+
+    def save_state(self):
+        """Write the state file, the caller holds state_lock"""
+        temp_file = f"{self.state_file}.tmp"
+        try:
+            os.makedirs(os.path.dirname(self.state_file), exist_ok=True)
+            with open(temp_file, 'w', encoding='utf-8') as f:
+                json.dump(self.state, f, indent=4)
+            os.replace(temp_file, self.state_file)
+        except Exception as e:
+            l.log("youtube", f"Error saving {self.state_file}: {e}")
+
+    def start(self, channels_provider):
+        """
+        Start the ingest worker and the lease renewal loop.
+        channels_provider returns a {configured channel: UC channel id} mapping.
+        """
+        if not self.enabled or self.threads:
+            return
+        if not self.callback_url:
+            l.log("youtube", "WebSub enabled but websub_callback_url is not set, not subscribing")
+            return
+
+        for target, args in ((self.ingest_worker, ()), (self.renew_loop, (channels_provider,))):
+            thread = threading.Thread(target=target, args=args, daemon=True)
+            thread.start()
+            self.threads.append(thread)
+        l.log("youtube", f"WebSub started with callback {self.callback_url}")
+
+    def renew_loop(self, channels_provider):
+        while True:
+            try:
+                self.renew(channels_provider())
+            except Exception as e:
+                l.log("youtube", f"WebSub renewal failed: {e}")
+            time.sleep(self.renew_interval)
+
+    def renew(self, channel_ids):
+        """Subscribe new channels, renew expiring leases and drop removed channels"""
+        now = time.time()
+        wanted = {topic_url.format(channel_id): channel
+                  for channel, channel_id in channel_ids.items() if channel_id.startswith('UC')}
+
+        due = []
+        with state_lock:
+            for topic, channel in wanted.items():
+                topic_state = self.state.get(topic, {})
+                # A pending unsubscribe is overridden right away, whatever lease it still has
+                if topic_state.get('mode') == 'subscribe':
+                    if topic_state.get('lease_expires', 0) - now > self.renew_margin:
+                        continue
+                    # Give the hub time to verify a recent request before asking again
+                    if topic_state.get('requested_at', 0) > now - self.renew_interval:
+                        continue
+                due.append((topic, channel, 'subscribe'))
+
+            expired = [topic for topic, topic_state in self.state.items()
+                       if topic not in wanted and topic_state.get('lease_expires', 0) <= now]
+            for topic in expired:
+                # Nothing left at the hub to unsubscribe from
+                del self.state[topic]
+            if expired:
+                self.save_state()
+
+            for topic, topic_state in self.state.items():
+                if topic in wanted:
+                    continue
+                # Retry an unsubscribe the hub has not verified once renew_interval has passed
+                if topic_state.get('mode') == 'unsubscribe' and topic_state.get('requested_at', 0) > now - self.renew_interval:
+                    continue
+                due.append((topic, topic_state.get('channel'), 'unsubscribe'))
+
+        # Hub requests are made without the lock, the hub verifies through our callback meanwhile
+        for topic, channel, mode in due:
+            self.subscribe(topic, channel, mode=mode)
+
+    def subscribe(self, topic, channel, mode='subscribe'):
+        data = {
+            'hub.callback': self.callback_url,
+            'hub.topic': topic,
+            'hub.mode': mode,
+            'hub.verify': 'async',
+            'hub.lease_seconds': str(self.lease_seconds)
+        }
+        if self.secret:
+            data['hub.secret'] = self.secret
+
+        # Record the intent first, the hub may verify before the request returns
+        with state_lock:
+            topic_state = self.state.setdefault(topic, {})
+            topic_state.update({'channel': channel, 'mode': mode, 'requested_at': time.time()})
+            self.save_state()
+
+        try:
+            response = self.session.post(self.hub_url, data=data, timeout=self.timeout)
+        except requests.RequestException as e:
+            l.log("youtube", f"WebSub {mode} request failed for {topic}: {e}")
+            return False
+
+        if response.status_code not in (202, 204):
+            l.log("youtube", f"WebSub hub rejected {mode} for {topic}: HTTP {response.status_code}")
+            return False
+
+        l.log("youtube", f"WebSub {mode} requested for {channel} ({topic})")
+        return True
+
+    def verify(self, args):
+        """
+        Answer a hub verification request.
+        Returns the challenge to echo back, or None when the request is not ours.
+        """
+        mode = args.get('hub.mode')
+        topic = args.get('hub.topic')
+        challenge = args.get('hub.challenge')
+
+        with state_lock:
+            topic_state = self.state.get(topic)
+            if mode not in ('subscribe', 'unsubscribe') or not challenge or not topic_state \
+                    or topic_state.get('mode') != mode:
+                l.log("youtube", f"WebSub rejected {mode} verification for {topic}")
+                return None
+
+            if mode == 'subscribe':
+                try:
+                    lease_seconds = int(args.get('hub.lease_seconds') or self.lease_seconds)
+                except ValueError:
+                    lease_seconds = self.lease_seconds
+                topic_state['lease_expires'] = time.time() + lease_seconds
+                l.log("youtube", f"WebSub subscription verified for {topic_state.get('channel')}, lease {lease_seconds}s")
+            else:
+                del self.state[topic]
+                l.log("youtube", f"WebSub unsubscription verified for {topic}")
+
+            self.save_state()
+        return challenge
+
+    def check_signature(self, body, signature_header):
+        if not self.secret:
+            return True
+        if not signature_header or '=' not in signature_header:
+            return False
+
+        algorithm, signature = signature_header.split('=', 1)
+        if algorithm not in ('sha1', 'sha256', 'sha384', 'sha512'):
+            return False
+
+        expected = hmac.new(self.secret.encode('utf-8'), body, getattr(hashlib, algorithm)).hexdigest()
+        return hmac.compare_digest(expected, signature)
+
+    def receive(self, body, signature_header):
+        """
+        Handle a content notification. Invalid signatures are acknowledged but
+        ignored, as the WebSub spec requires. Returns the number of videos queued.
+        """
+        if not self.check_signature(body, signature_header):
+            l.log("youtube", "WebSub notification with invalid signature ignored")
+            return 0
+
+        try:
+            entries = parse_feed(body)
+        except ET.ParseError as e:
+            l.log("youtube", f"WebSub notification could not be parsed: {e}")
+            return 0
+
+        with state_lock:
+            subscribed = {topic for topic, topic_state in self.state.items() if topic_state.get('mode') == 'subscribe'}
+
+        queued = 0
+        for entry in entries:
+            if topic_url.format(entry['channel_id']) not in subscribed:
+                l.log("youtube", f"WebSub notification for unsubscribed channel {entry['channel_id']} ignored")
+                continue
+            if self.enqueue(entry['channel_id'], entry['id']):
+                queued += 1
+        return queued
+
+    def enqueue(self, channel_id, video_id):
+        with self.queued_lock:
+            if video_id in self.queued:
+                return False
+            self.queued.add(video_id)
+        self.ingest_queue.put((channel_id, video_id))
+        l.log("youtube", f"WebSub queued video {video_id} from {channel_id}")
+        return True
+
+    def ingest_worker(self):
+        while True:
+            channel_id, video_id = self.ingest_queue.get()
+            try:
+                self.handler(channel_id, video_id)
+            except Exception as e:
+                l.log("youtube", f"WebSub ingest failed for {video_id}: {e}")
+            finally:
+                with self.queued_lock:
+                    self.queued.discard(video_id)
+                self.ingest_queue.task_done()
@@ -35,24 +35,33 @@ import re
 import shutil
 import subprocess
 import sys
+import threading
 import time
-from datetime import datetime
+from datetime import datetime, timedelta
 from pathlib import Path
 
-import requests
 import unicodedata
-from cachetools import TTLCache
+from cachetools import TLRUCache, TTLCache
 
 root_dir = Path(__file__).resolve().parents[2]
 sys.path.append(str(root_dir))
 
+from clases.cadence.cadence import Cadence
 from clases.config import config as c
+from clases.http_client.http_client import http
+from clases.cache.cache import temp_cache
+from clases.jobs.jobs import jobs
 from clases.worker import worker as w
 from clases.nfo.nfo import Nfo as n
 from clases.log import log as l
+from clases.metrics.metrics import metrics
+from clases.prefetch.prefetch import prefetch
+from plugins.youtube.feed import Feed, library_video_ids
+from plugins.youtube.resolver import Resolver
+from plugins.youtube.websub import WebSub
 
 from sanitize_filename import sanitize
-from flask import stream_with_context, Response, send_file, redirect
+from flask import stream_with_context, Response, send_file, redirect, abort
 
 # Initialize cache for recent requests
 recent_requests = TTLCache(maxsize=200, ttl=30)
@@ -60,6 +69,8 @@ recent_requests = TTLCache(maxsize=200, ttl=30)
 # Load configurations
 ytdlp2strm_config = c.config('./config/config.json').get_config()
 config = c.config('./plugins/youtube/config.json').get_config()
+# Posters, thumbnails and manifests share one keep-alive session
+youtube_session = http.session(config)
 channels = c.config(config["channels_list_file"]).get_channels()
 
 # Configuration variables
@@ -94,6 +105,53 @@ else:
     proxy = False
     proxy_url = ""
 
+# Resolved stream URLs, kept until the signed URL expires
+url_cache_ttl = int(config.get('url_cache_ttl', 3600))
+resolved_urls = TLRUCache(maxsize=500, ttu=lambda key, value, now: value[2], timer=time.time)
+resolved_urls_lock = threading.Lock()
+
+
+def apply_config(new_config):
+    """
+    Pick up edits to the plugin config without a restart.
+    strm_output_folder is only read at start, the library stays where it is.
+    """
+    global config, youtube_session, days_dateafter, videos_limit, cookies, cookie_value, proxy, proxy_url, url_cache_ttl, channels
+    config = new_config
+    days_dateafter = config["days_dateafter"]
+    videos_limit = config["videos_limit"]
+    cookies = config.get("cookies", 'cookies-from-browser')
+    cookie_value = config.get("cookie_value", 'chromium')
+    proxy = config.get('proxy', False)
+    proxy_url = config.get('proxy_url', "")
+    # Sessions are pooled per proxy, this picks the one behind the new proxy
+    youtube_session = http.session(config)
+    url_cache_ttl = int(config.get('url_cache_ttl', 3600))
+    channels = c.config(config["channels_list_file"]).get_channels()
+    watch_channels(config["channels_list_file"])
+
+
+watched_channel_lists = set()
+
+
+def watch_channels(channels_list_file):
+    if channels_list_file in watched_channel_lists:
+        return
+    watched_channel_lists.add(channels_list_file)
+
+    def apply_channels(new_channels):
+        global channels
+        # Only while it is still the configured list
+        if config["channels_list_file"] == channels_list_file:
+            channels = new_channels
+            l.log("youtube", f"Channel list reloaded, {len(channels)} channels")
+
+    c.config(channels_list_file).subscribe(apply_channels)
+
+
+c.config('./plugins/youtube/config.json').subscribe(apply_config)
+watch_channels(config["channels_list_file"])
+
 
 class Youtube:
     """Main YouTube processing class"""
@@ -101,6 +159,7 @@ class Youtube:
     def __init__(self, channel=None, download_mode=False):
         self.channel = channel
         self.channel_url = None
+        self.channel_id = None
         self.channel_name = None
         self.channel_description = None
         self.channel_poster = None
@@ -238,6 +297,7 @@ class Youtube:
 
             with open(strm_path, 'w', encoding='utf-8') as f:
                 f.write(strm_content)
+            metrics.item_written(strm_path)
             l.log("youtube", f"Created STRM file: {strm_path}")
 
         # Create NFO file (for both modes)
@@ -284,7 +344,7 @@ class Youtube:
             poster_path = os.path.join(folder_path, 'poster.jpg')
             if not os.path.exists(poster_path):
                 try:
-                    response = requests.get(self.channel_poster, timeout=10)
+                    response = youtube_session.get(self.channel_poster, timeout=10)
                     if response.status_code == 200:
                         with open(poster_path, 'wb') as f:
                             f.write(response.content)
@@ -350,7 +410,7 @@ class Youtube:
             else:
                 # Fallback to URL download
                 if thumbnail_url:
-                    response = requests.get(thumbnail_url, timeout=10)
+                    response = youtube_session.get(thumbnail_url, timeout=10)
                     if response.status_code == 200:
                         with open(thumbnail_path, 'wb') as f:
                             f.write(response.content)
@@ -430,7 +490,7 @@ class Youtube:
         elif 'keyword' in self.channel:
             return self.get_keyword_videos()
 
-        elif 'list' in self.channel:
+        elif Resolver.is_playlist(self.channel):
             self.channel_url = self.channel.replace('list-', '')
             if not 'www.youtube' in self.channel_url:
                 self.channel_url = f'https://www.youtube.com/playlist?list={self.channel_url}'
@@ -459,12 +519,36 @@ class Youtube:
             if not 'www.youtube' in self.channel:
                 self.channel_url = f'https://www.youtube.com/{self.channel}'
 
-            self.channel_name = self.get_channel_name()
+            configured_url = self.channel_url
+            resolver = Resolver(config)
+            resolved = resolver.lookup(self.channel)
+            if resolved:
+                l.log("youtube", f"Using cached resolution {resolved['channel_id']} for {self.channel}")
+                self.channel_id = resolved['channel_id']
+                self.channel_name = resolved['name']
+                # The canonical URL skips resolving the @handle page on the calls below
+                self.channel_url = f"https://www.youtube.com/channel/{resolved['channel_id']}"
+            else:
+                self.channel_name = self.get_channel_name()
+
             self.channel_description = self.get_channel_description()
             thumbs = self.get_channel_images()
             self.channel_poster = thumbs['poster']
             self.channel_landscape = thumbs['landscape']
-            return self.get_channel_videos()
+
+            if resolved:
+                videos = self.get_channel_videos(resolver.uploads_url(resolved))
+                # An empty uploads playlist is either a quiet channel or a stale entry
+                if videos or resolver.validate(self.channel):
+                    return videos
+                self.channel_id = None
+                self.channel_url = configured_url
+                self.channel_name = self.get_channel_name()
+
+            videos = self.get_channel_videos()
+            if videos:
+                resolver.remember(self.channel, self.channel_url, videos[0]['channel_id'], self.channel_name)
+            return videos
 
     def is_youtube_music_url(self):
         """NEW: Check if the URL is a YouTube Music URL"""
@@ -876,9 +960,9 @@ class Youtube:
 
         return videos
 
-    def get_channel_videos(self):
-        """Get videos from channel"""
-        cu = self.channel_url if '/streams' in self.channel_url else f'{self.channel_url}/videos'
+    def get_channel_videos(self, url=None):
+        """Get videos from channel, or from its uploads playlist when url is given"""
+        cu = url or (self.channel_url if '/streams' in self.channel_url else f'{self.channel_url}/videos')
 
         command = [
             'yt-dlp',
@@ -920,6 +1004,46 @@ class Youtube:
 
         return videos
 
+    def get_videos_by_id(self, video_ids):
+        """Get metadata for specific videos with a single yt-dlp call"""
+        if not video_ids:
+            return []
+
+        command = [
+            'yt-dlp',
+            '--compat-options', 'no-youtube-unavailable-videos',
+            '--sleep-interval', str(self.sleep_interval),
+            '-t', 'sleep',
+            '--no-warnings',
+            '--dump-json'
+        ] + [f'https://www.youtube.com/watch?v={video_id}' for video_id in video_ids]
+
+        self.set_proxy(command)
+        self.set_cookies(command)
+
+        result = w.Worker(command).output()
+        videos = []
+
+        for line in result.split('\n'):
+            if line.strip():
+                try:
+                    data = json.loads(line)
+                    video = {
+                        'id': data.get('id'),
+                        'title': data.get('title'),
+                        'upload_date': data.get('upload_date'),
+                        'thumbnail': data.get('thumbnail'),
+                        'description': data.get('description'),
+                        'channel_id': data.get('channel_id'),
+                        'uploader_id': data.get('uploader_id')
+                    }
+                    videos.append(video)
+                    l.log("youtube", f"Found video: {video['title']}")
+                except json.JSONDecodeError:
+                    l.log("youtube", f"Error parsing video JSON")
+
+        return videos
+
     def get_channel_name(self):
         """Get channel or playlist name"""
         if 'playlist' in self.channel_url:
@@ -1149,70 +1273,188 @@ def video_file_exists_in_downloads(download_folder, video_id):
 
 def to_strm(method):
     """Main function to process channels and create STRM files"""
-    for youtube_channel in channels:
+    cadence = Cadence(source_platform, config)
+
+    feed = Feed(config)
+
+    for youtube_channel in cadence.due_channels(channels):
+        try:
+            sync_channel(youtube_channel, cadence, feed)
+        except Exception as e:
+            l.log("youtube", f"Error processing {youtube_channel}: {str(e)}")
+            cadence.record_failure(youtube_channel)
+            continue
+
+
+def sync_from_feed(youtube_channel, feed, cadence):
+    """
+    Fast path: check the channel Atom feed and only run yt-dlp for unseen IDs.
+    Returns False when the feed cannot cover the sync and a full extraction is needed.
+    """
+    channel_state = feed.state[youtube_channel]
+    status, entries, validators = feed.fetch(youtube_channel)
+
+    if status == 'not_modified':
+        l.log("youtube", f'Feed unchanged for {youtube_channel}, nothing to do')
+        cadence.record_sync(youtube_channel)
+        return True
+
+    if status != 'ok':
+        return False
+
+    folder_path = channel_state['folder_path']
+    library = library_video_ids(folder_path)
+
+    # No overlap with the library means the gap may be longer than the feed covers
+    if not library or (entries and not any(entry['id'] in library for entry in entries)):
+        l.log("youtube", f'Feed for {youtube_channel} does not cover the sync window, running full sync')
+        return False
+
+    # Same window as the full sync, channels only list the last days_dateafter days
+    cutoff = None
+    if channel_state['channel_id'].startswith('UC'):
+        cutoff = (datetime.now() - timedelta(days=int(days_dateafter))).strftime('%Y%m%d')
+
+    new_entries = []
+    for entry in entries:
+        # Entries are newest first, anything older than a video already in the library is known
+        if entry['id'] in library:
+            break
+        if cutoff and entry['upload_date'] and entry['upload_date'] < cutoff:
+            continue
+        new_entries.append(entry)
+    new_entries = new_entries[:int(videos_limit)]
+
+    if new_entries:
+        l.log("youtube", f'Feed lists {len(new_entries)} new videos for {youtube_channel}')
         yt = Youtube(youtube_channel)
+        videos = yt.get_videos_by_id([entry['id'] for entry in new_entries])
+        for video in videos:
+            yt.write_video_files(video, folder_path, channel_state['folder_name'], channel_state['channel_id'])
+
+        if len(videos) < len(new_entries):
+            # Leave the validators untouched so the next run retries the missing IDs
+            l.log("youtube", f'Only {len(videos)} of {len(new_entries)} new videos could be extracted')
+            cadence.record_sync(youtube_channel, [(video['id'], video.get('upload_date')) for video in videos])
+            return True
+    else:
+        l.log("youtube", f'No new videos in feed for {youtube_channel}')
 
-        l.log("youtube", " --------------- ")
-        l.log("youtube", f'Working on {youtube_channel}...')
+    feed.commit(youtube_channel, validators)
+    cadence.record_sync(youtube_channel, [(entry['id'], entry['upload_date']) for entry in entries])
+    return True
 
-        videos = yt.get_results()
-        channel_name = yt.channel_name
-        channel_url = yt.channel_url
-        channel_description = yt.channel_description
 
-        l.log("youtube", f'Channel URL: {channel_url}')
-        l.log("youtube", f'Channel Name: {channel_name}')
-        l.log("youtube", f'Channel Poster: {yt.channel_poster}')
-        l.log("youtube", f'Channel Landscape: {yt.channel_landscape}')
-        l.log("youtube", 'Channel Description:')
-        l.log("youtube", channel_description)
+def sync_channel(youtube_channel, cadence=None, feed=None):
+    """Create STRM files for a single configured channel and record its upload cadence"""
+    cadence = cadence or Cadence(source_platform, config)
+    feed = feed or Feed(config)
 
-        if videos:
-            l.log("youtube", f'Videos detected: {len(videos)}')
+    if feed.can_precheck(youtube_channel) and sync_from_feed(youtube_channel, feed, cadence):
+        return
 
-            # Process first video to get channel info if needed
-            first_video = videos[0]
-            channel_id = first_video['channel_id']
+    yt = Youtube(youtube_channel)
 
-            # Step 1: Create channel directory
-            folder_path, folder_name = yt.create_channel_directory(channel_id)
+    l.log("youtube", " --------------- ")
+    l.log("youtube", f'Working on {youtube_channel}...')
 
-            # Step 2: Download channel poster
-            yt.download_channel_poster(folder_path)
+    videos = yt.get_results()
+    channel_name = yt.channel_name
+    channel_url = yt.channel_url
+    channel_description = yt.channel_description
 
-            # Step 3: Create channel NFO
-            channel_nfo_data = {
-                "title": channel_name,
-                "plot": channel_description.replace('\n', ' <br/>'),
-                "season": "1",
-                "episode": "-1",
-                "landscape": yt.channel_landscape,
-                "poster": yt.channel_poster,
-                "studio": "Youtube"
-            }
+    l.log("youtube", f'Channel URL: {channel_url}')
+    l.log("youtube", f'Channel Name: {channel_name}')
+    l.log("youtube", f'Channel Poster: {yt.channel_poster}')
+    l.log("youtube", f'Channel Landscape: {yt.channel_landscape}')
+    l.log("youtube", 'Channel Description:')
+    l.log("youtube", channel_description)
 
-            n("tvshow", folder_path, channel_nfo_data).make_nfo()
-            l.log("youtube", "Created channel NFO file")
+    if videos:
+        l.log("youtube", f'Videos detected: {len(videos)}')
 
-            # Step 4 & 5: Process videos one by one
-            for video in videos:
-                video_id = video['id']
+        # Process first video to get channel info if needed
+        first_video = videos[0]
+        channel_id = yt.channel_id or first_video['channel_id']
 
-                # Check if video already exists
-                if video_id_exists_in_content(folder_path, video_id):
-                    l.log("youtube", f'Video {video_id} already exists, checking for updates...')
+        # Step 1: Create channel directory
+        folder_path, folder_name = yt.create_channel_directory(channel_id)
 
-                    # Step 8: Check and update existing files
-                    needs_update = yt.check_and_update_existing_files(folder_path, video_id, video)
+        # Step 2: Download channel poster
+        yt.download_channel_poster(folder_path)
 
-                    if not needs_update:
-                        continue
+        # Step 3: Create channel NFO
+        channel_nfo_data = {
+            "title": channel_name,
+            "plot": channel_description.replace('\n', ' <br/>'),
+            "season": "1",
+            "episode": "-1",
+            "landscape": yt.channel_landscape,
+            "poster": yt.channel_poster,
+            "studio": "Youtube"
+        }
 
-                # Step 6: Write files individually
-                yt.write_video_files(video, folder_path, folder_name, channel_id)
+        n("tvshow", folder_path, channel_nfo_data).make_nfo()
+        l.log("youtube", "Created channel NFO file")
+
+        # Step 4 & 5: Process videos one by one
+        for video in videos:
+            video_id = video['id']
+
+            # Check if video already exists
+            if video_id_exists_in_content(folder_path, video_id):
+                l.log("youtube", f'Video {video_id} already exists, checking for updates...')
+
+                # Step 8: Check and update existing files
+                needs_update = yt.check_and_update_existing_files(folder_path, video_id, video)
+
+                if not needs_update:
+                    continue
+
+            # Step 6: Write files individually
+            yt.write_video_files(video, folder_path, folder_name, channel_id)
+
+        if Feed.is_supported(youtube_channel):
+            feed.remember(youtube_channel, channel_id, folder_path, folder_name)
+
+    else:
+        l.log("youtube", "No videos detected...")
+
+    cadence.record_sync(youtube_channel, [(video['id'], video.get('upload_date')) for video in videos or []])
+
+def ingest_video(channel_id, video_id):
+    """Write STRM/NFO for a single pushed video of an already synced channel"""
+    feed = Feed(config)
+    for youtube_channel, channel_state in feed.state.items():
+        if channel_state.get('channel_id') == channel_id and youtube_channel in channels:
+            break
+    else:
+        l.log("youtube", f'Pushed video {video_id} belongs to an unknown or unsynced channel {channel_id}')
+        return
+
+    folder_path = channel_state['folder_path']
+    if video_id in library_video_ids(folder_path):
+        l.log("youtube", f'Pushed video {video_id} already exists')
+        return
+
+    yt = Youtube(youtube_channel)
+    for video in yt.get_videos_by_id([video_id]):
+        yt.write_video_files(video, folder_path, channel_state['folder_name'], channel_id)
+        l.log("youtube", f'Ingested pushed video {video_id} for {youtube_channel}')
+
+
+def websub_channel_ids():
+    """Configured channels whose canonical channel ID is already known"""
+    feed = Feed(config)
+    return {
+        youtube_channel: feed.state[youtube_channel]['channel_id']
+        for youtube_channel in channels
+        if feed.state.get(youtube_channel, {}).get('channel_id')
+    }
+
+
+websub = WebSub(config, ingest_video)
 
-        else:
-            l.log("youtube", "No videos detected...")
 
 def to_download(method, channel_list=None):
     """Enhanced download function to process all kinds of media sources"""
@@ -1422,24 +1664,27 @@ def serve_downloaded_file(video_id):
         return "Video file not found", 404
 
 
-def direct(youtube_id, remote_addr):
-    """Enhanced direct streaming handler - checks for downloaded files first"""
-    current_time = time.time()
-    cache_key = f"{remote_addr}_{youtube_id}"
+def url_expiry(url):
+    """Expiry of a signed googlevideo URL, capped by url_cache_ttl"""
+    now = time.time()
+    match = re.search(r'expire[/=](\d+)', url)
+    if not match:
+        return now + url_cache_ttl
+    return min(float(match.group(1)) - 60, now + url_cache_ttl)
 
-    # Check if the request is already cached
-    if cache_key not in recent_requests:
-        log_text = f'[{remote_addr}] Playing {youtube_id}'
-        l.log("youtube", log_text)
-        recent_requests[cache_key] = current_time
 
-    # NEW: Check if we have a downloaded file first
-    downloaded_file = video_file_exists_in_downloads(download_folder, youtube_id)
-    if downloaded_file:
-        l.log("youtube", f"Serving downloaded file instead of streaming: {downloaded_file}")
-        return send_file(downloaded_file)
+def resolve_stream(youtube_id):
+    """
+    Return (kind, url) for a video: 'manifest' with its HLS manifest URL, or
+    'redirect' with a direct media URL. Resolutions are cached until the
+    signed URL expires.
+    """
+    with resolved_urls_lock:
+        cached = resolved_urls.get(youtube_id)
+    metrics.cache('youtube_urls', cached)
+    if cached:
+        return cached[0], cached[1]
 
-    # Original streaming logic if no downloaded file exists
     if '-audio' not in youtube_id:
         command = [
             'yt-dlp',
@@ -1465,7 +1710,9 @@ def direct(youtube_id, remote_addr):
         except:
             pass
 
-        if not m3u8_url:
+        if m3u8_url:
+            kind, url = 'manifest', m3u8_url
+        else:
             log_text = ('No manifest detected. Check your cookies config.')
             l.log("youtube", log_text)
 
@@ -1481,22 +1728,7 @@ def direct(youtube_id, remote_addr):
             Youtube().set_proxy(command)
             Youtube().set_cookies(command)
 
-            sd_url = w.Worker(command).output()
-            return redirect(sd_url.strip(), 301)
-        else:
-            response = requests.get(m3u8_url)
-            if response.status_code == 200:
-                m3u8_content = response.text
-                filtered_content = filter_and_modify_bandwidth(m3u8_content)
-                headers = {
-                    'Content-Type': 'application/vnd.apple.mpegurl',
-                    'Content-Disposition': 'inline; filename="playlist.m3u8"',
-                    'Cache-Control': 'no-cache',
-                    'Pragma': 'no-cache',
-                    'Expires': '0'
-                }
-
-                return Response(filtered_content, mimetype='application/vnd.apple.mpegurl', headers=headers)
+            kind, url = 'redirect', w.Worker(command).output().strip()
     else:
         # Audio handling
         s_youtube_id = youtube_id.split('-audio')[0]
@@ -1512,9 +1744,63 @@ def direct(youtube_id, remote_addr):
         Youtube().set_cookies(command)
         Youtube().set_proxy(command)
 
-        audio_url = w.Worker(command).output()
-        return redirect(audio_url, 301)
+        kind, url = 'redirect', w.Worker(command).output().strip()
+
+    if url.startswith('http'):
+        with resolved_urls_lock:
+            resolved_urls[youtube_id] = (kind, url, url_expiry(url))
+    return kind, url
+
 
+def warm_stream(youtube_id):
+    """Resolve a video ahead of playback so the request is served from the cache"""
+    if not video_file_exists_in_downloads(download_folder, youtube_id):
+        resolve_stream(youtube_id)
+
+# Download endpoints are warmed by pulling the start of the file through the server
+prefetch.register(source_platform, media_folder, {'direct': warm_stream})
+
+
+def direct(youtube_id, remote_addr):
+    """Enhanced direct streaming handler - checks for downloaded files first"""
+    prefetch.played(source_platform, youtube_id)
+    current_time = time.time()
+    cache_key = f"{remote_addr}_{youtube_id}"
+
+    # Check if the request is already cached
+    if cache_key not in recent_requests:
+        log_text = f'[{remote_addr}] Playing {youtube_id}'
+        l.log("youtube", log_text)
+        recent_requests[cache_key] = current_time
+
+    # NEW: Check if we have a downloaded file first
+    downloaded_file = video_file_exists_in_downloads(download_folder, youtube_id)
+    if downloaded_file:
+        l.log("youtube", f"Serving downloaded file instead of streaming: {downloaded_file}")
+        return send_file(downloaded_file)
+
+    # Original streaming logic if no downloaded file exists
+    kind, url = resolve_stream(youtube_id)
+    if kind == 'redirect':
+        return redirect(url, 301)
+
+    response = youtube_session.get(url)
+    if response.status_code == 200:
+        m3u8_content = response.text
+        filtered_content = filter_and_modify_bandwidth(m3u8_content)
+        headers = {
+            'Content-Type': 'application/vnd.apple.mpegurl',
+            'Content-Disposition': 'inline; filename="playlist.m3u8"',
+            'Cache-Control': 'no-cache',
+            'Pragma': 'no-cache',
+            'Expires': '0'
+        }
+
+        return Response(filtered_content, mimetype='application/vnd.apple.mpegurl', headers=headers)
+
+    # The cached manifest may have been revoked early
+    with resolved_urls_lock:
+        resolved_urls.pop(youtube_id, None)
     return "Manifest URL not found or failed to redirect.", 404
 
 
@@ -1557,7 +1843,8 @@ def bridge(youtube_id):
         if '-audio' in youtube_id:
             command[5] = 'bestaudio'
 
-        process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+        worker = w.Worker(command)
+        process = worker.spawn(stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
         time.sleep(3)
 
         try:
@@ -1580,7 +1867,7 @@ def bridge(youtube_id):
 
                 process.poll()
         finally:
-            process.kill()
+            worker.reap()
 
     return Response(
         stream_with_context(generate()),
@@ -1590,6 +1877,8 @@ def bridge(youtube_id):
 
 def download(youtube_id):
     """Enhanced download handler - serves existing files or downloads new ones"""
+    prefetch.played(source_platform, youtube_id)
+
     # Check if file already exists in downloads
     existing_file = video_file_exists_in_downloads(download_folder, youtube_id)
     if existing_file:
@@ -1604,47 +1893,52 @@ def download(youtube_id):
     # Create temp directory if it doesn't exist
     os.makedirs(temp_dir, exist_ok=True)
 
-    if config.get("sponsorblock", False):
-        command = [
-            'yt-dlp',
-            '-f', 'bv*+ba+ba.2',
-            '-o', os.path.join(temp_dir, '%(title)s.%(ext)s'),
-            '--sponsorblock-remove', config.get('sponsorblock_cats', 'all'),
-            '--restrict-filenames',
-            '--sleep-interval', str(5),
-            '-t', 'sleep',
-            s_youtube_id
-        ]
-    else:
-        command = [
-            'yt-dlp',
-            '-f', 'bv*+ba+ba.2',
-            '-o', os.path.join(temp_dir, '%(title)s.%(ext)s'),
-            '--restrict-filenames',
-            '--sleep-interval', str(5),
-            '-t', 'sleep',
-            s_youtube_id
-        ]
+    # yt-dlp names its format and merge intermediates after the output template
+    output_prefix = os.path.join(temp_dir, f'youtube-{youtube_id}.')
 
-    Youtube().set_proxy(command)
-    Youtube().set_cookies(command)
+    def produce():
+        jobs.get(source_platform, youtube_id).pin_prefix(output_prefix)
+        if config.get("sponsorblock", False):
+            command = [
+                'yt-dlp',
+                '-f', 'bv*+ba+ba.2',
+                '-o', f'{output_prefix}%(ext)s',
+                '--sponsorblock-remove', config.get('sponsorblock_cats', 'all'),
+                '--restrict-filenames',
+                '--print', 'after_move:filepath',
+                '--sleep-interval', str(5),
+                '-t', 'sleep',
+                s_youtube_id
+            ]
+        else:
+            command = [
+                'yt-dlp',
+                '-f', 'bv*+ba+ba.2',
+                '-o', f'{output_prefix}%(ext)s',
+                '--restrict-filenames',
+                '--print', 'after_move:filepath',
+                '--sleep-interval', str(5),
+                '-t', 'sleep',
+                s_youtube_id
+            ]
 
-    if '-audio' in youtube_id:
-        command[2] = 'bestaudio'
+        Youtube().set_proxy(command)
+        Youtube().set_cookies(command)
 
-    w.Worker(command).call()
+        if '-audio' in youtube_id:
+            command[2] = 'bestaudio'
 
-    # Get the filename
-    filename_command = [
-        'yt-dlp',
-        '--print', 'filename',
-        '--restrict-filenames',
-        f'https://www.youtube.com/watch?v={s_youtube_id}'
-    ]
+        # The download itself prints where the merged file ended up
+        output = w.Worker(command).output().strip()
+        return output.splitlines()[-1] if output else None
 
-    filename = w.Worker(filename_command).output().strip()
+    # Concurrent requests for the same video share one download
+    path = jobs.run(source_platform, youtube_id, produce)
+    if not path:
+        abort(500)
 
-    return send_file(os.path.join(temp_dir, filename))
+    temp_cache.touch(path)
+    return send_file(path)
 
 
 def process_single_channel(channel_identifier, download_mode=False):
@@ -0,0 +1,60 @@
+"""
+Temp cache sweep against the files of in-flight jobs.
+"""
+
+import os
+import sys
+import time
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from standin import base_dir  # noqa: E402
+
+from clases.cache.cache import TempCache  # noqa: E402
+from clases.jobs.jobs import jobs  # noqa: E402
+
+
+class TempCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = os.path.join(base_dir, 'temp')
+        os.makedirs(self.temp_dir, exist_ok=True)
+        for file_name in os.listdir(self.temp_dir):
+            os.remove(os.path.join(self.temp_dir, file_name))
+        # Every byte is over budget
+        self.cache = TempCache({'ytdlp2strm_temp_cache_max_mb': 0.000001})
+        self.job, _ = jobs.claim('youtube', 'abc123')
+
+    def tearDown(self):
+        jobs.finish(self.job)
+
+    def write(self, file_name):
+        path = os.path.join(self.temp_dir, file_name)
+        with open(path, 'wb') as f:
+            f.write(b'media')
+        os.utime(path, (time.time() - 60, time.time() - 60))
+        return path
+
+    def test_pinned_prefix_survives_eviction(self):
+        self.job.pin_prefix(os.path.join(self.temp_dir, 'youtube-abc123.'))
+        video = self.write('youtube-abc123.f137.mp4')
+        audio = self.write('youtube-abc123.f140.m4a')
+        merging = self.write('youtube-abc123.temp.mp4')
+        other = self.write('youtube-other.mp4')
+
+        self.cache.sweep()
+
+        self.assertTrue(all(os.path.exists(path) for path in (video, audio, merging)))
+        self.assertFalse(os.path.exists(other))
+
+    def test_released_once_the_job_finishes(self):
+        self.job.pin_prefix(os.path.join(self.temp_dir, 'youtube-abc123.'))
+        merged = self.write('youtube-abc123.mp4')
+
+        jobs.finish(self.job)
+        self.cache.sweep()
+
+        self.assertFalse(os.path.exists(merged))
+
+
+if __name__ == '__main__':
+    unittest.main()
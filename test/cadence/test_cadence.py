@@ -0,0 +1,56 @@
+"""
+Cadence state shared by concurrent jobs of the same platform.
+"""
+
+import json
+import os
+import sys
+import threading
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import standin  # noqa: E402,F401
+
+from clases.cadence.cadence import Cadence  # noqa: E402
+
+
+class CadenceStateTest(unittest.TestCase):
+    def setUp(self):
+        self.state_file = os.path.join('logs', 'cadence_standin.json')
+        if os.path.exists(self.state_file):
+            os.remove(self.state_file)
+
+    def saved(self):
+        with open(self.state_file, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def test_instances_keep_each_others_channels(self):
+        first = Cadence('standin')
+        second = Cadence('standin')
+
+        first.record_sync('channel-a', [('a1', '20240710')])
+        second.record_failure('channel-b')
+        first.record_sync('channel-c')
+
+        saved = self.saved()
+        self.assertEqual(sorted(saved), ['channel-a', 'channel-b', 'channel-c'])
+        self.assertIn('a1', saved['channel-a']['recent_uploads'])
+        self.assertEqual(saved['channel-b']['failures'], 1)
+
+    def test_concurrent_jobs(self):
+        def job(index):
+            cadence = Cadence('standin')
+            for channel in range(10):
+                cadence.record_sync(f'job{index}-channel{channel}')
+
+        threads = [threading.Thread(target=job, args=(index,)) for index in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(self.saved()), 40)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,70 @@
+"""
+Process-wide config store against files edited on disk.
+"""
+
+import json
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from standin import base_dir  # noqa: E402
+
+from clases.config.config import ConfigStore, read_config_file  # noqa: E402
+
+
+def write(path, data):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f)
+    # Same size and possibly the same mtime tick, the inode still tells them apart
+    os.utime(path, ns=(os.stat(path).st_atime_ns, os.stat(path).st_mtime_ns + 1000))
+
+
+class ConfigStoreTest(unittest.TestCase):
+    def setUp(self):
+        self.store = ConfigStore()
+        self.path = os.path.join(base_dir, 'config', 'store_test.json')
+        write(self.path, {'value': 1})
+
+    def test_cached_until_edited(self):
+        first = self.store.load(self.path)
+        version = self.store.version
+
+        self.assertIs(self.store.load(self.path), first)
+        self.assertEqual(self.store.version, version)
+
+        write(self.path, {'value': 2})
+        self.assertEqual(self.store.load(self.path), {'value': 2})
+        self.assertEqual(self.store.version, version + 1)
+
+    def test_edit_while_reading(self):
+        edits = [{'value': 2}]
+
+        def read_then_edit(path):
+            # The first read races an edit that lands before it returns
+            data = read_config_file(path)
+            if edits:
+                write(path, edits.pop())
+            return data
+
+        self.assertEqual(self.store.get(self.path, read_then_edit), {'value': 1})
+        self.assertEqual(self.store.get(self.path, read_then_edit), {'value': 2})
+
+    def test_subscribers(self):
+        changes = []
+        self.store.subscribe(self.path, changes.append)
+
+        self.store.load(self.path)
+        write(self.path, {'value': 2})
+        self.store.load(self.path)
+        self.store.load(self.path)
+
+        self.assertEqual(changes, [{'value': 2}])
+
+    def test_relative_and_absolute_paths_share_entries(self):
+        relative = os.path.relpath(self.path)
+        self.assertIs(self.store.load(relative), self.store.load(self.path))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,2 @@
+# ffmpeg_test is a manual script, not a test module
+collect_ignore = ["ffmpeg_test"]
@@ -0,0 +1,66 @@
+"""
+Prometheus /metrics route access.
+"""
+
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from standin import ui_app  # noqa: E402
+
+token = 'scrape-secret'
+
+
+class MetricsRouteTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.app = ui_app()
+        from ui import routes
+        cls.routes = routes
+
+    def setUp(self):
+        self.client = self.app.test_client()
+        self.saved = self.routes.metrics_token
+
+    def tearDown(self):
+        self.routes.metrics_token = self.saved
+
+    def login(self):
+        with self.client.session_transaction() as session:
+            session['authenticated'] = True
+
+    def test_refused_without_credentials(self):
+        for configured in ('', token):
+            self.routes.metrics_token = configured
+            response = self.client.get('/metrics')
+            self.assertEqual(response.status_code, 302)
+            self.assertNotIn(b'ytdlp2strm_', response.data)
+
+    def test_refused_with_wrong_token(self):
+        self.routes.metrics_token = token
+        for wrong in ('nope', 'ñandú'):
+            self.assertEqual(self.client.get('/metrics', query_string={'token': wrong}).status_code, 403)
+            self.assertEqual(self.client.get('/metrics', headers={'Authorization': f'Bearer {wrong}'}).status_code, 403)
+
+    def test_token_without_configured_token(self):
+        self.routes.metrics_token = ''
+        self.assertEqual(self.client.get('/metrics', query_string={'token': token}).status_code, 403)
+
+    def test_token(self):
+        self.routes.metrics_token = token
+        for response in (self.client.get('/metrics', query_string={'token': token}),
+                         self.client.get('/metrics', headers={'Authorization': f'Bearer {token}'})):
+            self.assertEqual(response.status_code, 200)
+            self.assertIn(b'ytdlp2strm_uptime_seconds', response.data)
+
+    def test_session(self):
+        self.routes.metrics_token = ''
+        self.login()
+        response = self.client.get('/metrics')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b'ytdlp2strm_uptime_seconds', response.data)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,96 @@
+"""
+Jellyfin webhook route against a local stand-in of the Jellyfin API.
+"""
+
+import json
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from standin import StandIn, base_dir, ui_app  # noqa: E402
+
+from clases.prefetch.prefetch import prefetch  # noqa: E402
+
+token = 'webhook-secret'
+api_key = 'jellyfin-key'
+strm_path = os.path.join(base_dir, 'media', 'crunchyroll', 'Show', 'S01', 'Show S01E02.strm')
+
+
+def answer(request):
+    if request['headers'].get('X-Emby-Token') != api_key:
+        return 401, {}, ''
+    items = {
+        '/Users/user1/Items/remote': {'MediaSources': [{'Path': 'http://127.0.0.1:5000/crunchyroll/direct/GR3VWXP96'}]},
+        '/Items/local': {'Path': strm_path},
+    }
+    if request['path'] not in items:
+        return 404, {}, ''
+    return 200, {'Content-Type': 'application/json'}, json.dumps(items[request['path']])
+
+
+class JellyfinWebhookTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.client = ui_app().test_client()
+        os.makedirs(os.path.dirname(strm_path), exist_ok=True)
+        with open(strm_path, 'w', encoding='utf-8') as f:
+            f.write('http://127.0.0.1:5000/crunchyroll/remux/GY8VEQ95Y\n')
+
+    def setUp(self):
+        self.jellyfin = StandIn(answer)
+        self.saved = {key: getattr(prefetch, key) for key in ('enabled', 'webhook_token', 'jellyfin_url', 'jellyfin_api_key')}
+        prefetch.enabled = True
+        prefetch.webhook_token = token
+        prefetch.jellyfin_url = self.jellyfin.url
+        prefetch.jellyfin_api_key = api_key
+        self.played = []
+        prefetch.played = lambda platform, media_id: self.played.append((platform, media_id))
+
+    def tearDown(self):
+        del prefetch.played
+        for key, value in self.saved.items():
+            setattr(prefetch, key, value)
+        self.jellyfin.close()
+
+    def post(self, payload, query_token=token):
+        return self.client.post(f'/api/prefetch/jellyfin?token={query_token}', json=payload)
+
+    def test_refused_without_configured_token(self):
+        prefetch.webhook_token = ''
+
+        response = self.post({'NotificationType': 'PlaybackStart', 'ItemId': 'remote', 'UserId': 'user1'}, '')
+
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(self.jellyfin.requests, [])
+        self.assertEqual(self.played, [])
+
+    def test_refused_with_wrong_token(self):
+        for wrong in ('nope', 'ñandú'):
+            response = self.post({'NotificationType': 'PlaybackStart', 'ItemId': 'remote'}, wrong)
+            self.assertEqual(response.status_code, 403)
+        self.assertEqual(self.jellyfin.requests, [])
+
+    def test_playback_start_with_remote_path(self):
+        response = self.post({'NotificationType': 'PlaybackStart', 'ItemId': 'remote', 'UserId': 'user1'})
+
+        self.assertEqual(response.get_json(), {'success': True, 'prefetch': True})
+        self.assertEqual(self.played, [('crunchyroll', 'GR3VWXP96')])
+
+    def test_playback_start_with_strm_path(self):
+        response = self.post({'NotificationType': 'PlaybackStart', 'ItemId': 'local'})
+
+        self.assertEqual(response.get_json(), {'success': True, 'prefetch': True})
+        self.assertEqual(self.played, [('crunchyroll', 'GY8VEQ95Y')])
+
+    def test_ignored_events(self):
+        for payload in ({'NotificationType': 'PlaybackStop', 'ItemId': 'remote'},
+                        {'NotificationType': 'PlaybackStart'},
+                        {'NotificationType': 'PlaybackStart', 'ItemId': 'unknown'}):
+            response = self.post(payload)
+            self.assertEqual(response.get_json(), {'success': True, 'prefetch': False})
+        self.assertEqual(self.played, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,103 @@
+"""
+Local stand-ins for the services the plugins talk to.
+
+Importing this module points the app at a scratch base directory built from
+the example configs, with every strm_output_folder inside it, so tests never
+touch config/ or a real library. Import it before any clases or plugins
+module, they read their config at import time.
+
+    python -m pytest test
+"""
+
+import atexit
+import glob
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+repo_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+base_dir = tempfile.mkdtemp(prefix='ytdlp2strm-test-')
+
+
+def build_base_dir():
+    for example in glob.glob(os.path.join(repo_dir, 'config', '*.example.json')) + \
+            glob.glob(os.path.join(repo_dir, 'plugins', '*', '*.example.json')):
+        relative = os.path.relpath(example, repo_dir)
+        target = os.path.join(base_dir, relative.replace('.example.json', '.json'))
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        with open(example, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        if isinstance(data, dict) and 'strm_output_folder' in data:
+            data['strm_output_folder'] = os.path.join(base_dir, 'media', os.path.basename(os.path.dirname(target)))
+        with open(target, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=4)
+    os.makedirs(os.path.join(base_dir, 'logs'), exist_ok=True)
+
+
+build_base_dir()
+atexit.register(shutil.rmtree, base_dir, ignore_errors=True)
+os.environ['APP_BASE_DIR'] = base_dir
+os.chdir(base_dir)
+sys.path.insert(0, repo_dir)
+
+
+def ui_app():
+    """Flask app with ui.routes registered on it, the way main.py builds it"""
+    import __main__
+    from flask import Flask
+
+    if not hasattr(__main__, 'app'):
+        __main__.app = Flask('ytdlp2strm', template_folder=os.path.join(repo_dir, 'ui', 'html'))
+        __main__.app.secret_key = 'test'
+    from ui import routes  # noqa: F401
+    return __main__.app
+
+
+class StandIn:
+    """
+    HTTP server on a free local port answering with handler(request), where
+    request is a dict with method, path, headers and body, and the handler
+    returns (status, headers, body). Every request is kept in requests.
+    """
+
+    def __init__(self, handler):
+        self.handler = handler
+        self.requests = []
+        standin = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def respond(self):
+                length = int(self.headers.get('Content-Length') or 0)
+                request = {
+                    'method': self.command,
+                    'path': self.path,
+                    'headers': dict(self.headers),
+                    'body': self.rfile.read(length) if length else b''
+                }
+                standin.requests.append(request)
+                status, headers, body = standin.handler(request)
+                if isinstance(body, str):
+                    body = body.encode('utf-8')
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            do_GET = do_POST = respond
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
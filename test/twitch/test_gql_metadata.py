@@ -0,0 +1,112 @@
+"""
+Batched GQL channel metadata against a recorded stand-in of gql.twitch.tv.
+"""
+
+import json
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from standin import StandIn  # noqa: E402
+
+from plugins.twitch import twitch  # noqa: E402
+
+# user objects as gql.twitch.tv answered the ChannelSync query
+recorded_offline = {
+    "login": "revenant",
+    "displayName": "Revenant",
+    "profileImageURL": "https://static-cdn.jtvnw.net/jtv_user_pictures/revenant-profile_image-300x300.png",
+    "bannerImageURL": "https://static-cdn.jtvnw.net/jtv_user_pictures/revenant-profile_banner-480.png",
+    "stream": None,
+    "videos": {"edges": [{"node": {"id": "2203618931"}}]}
+}
+recorded_live = {
+    "login": "elxokas",
+    "displayName": "ElXokas",
+    "profileImageURL": "https://static-cdn.jtvnw.net/jtv_user_pictures/elxokas-profile_image-300x300.png",
+    "bannerImageURL": None,
+    "stream": {
+        "id": "41375517245",
+        "title": "DIRECTO; charla y juegos",
+        "createdAt": "2024-07-11T18:02:13Z",
+        "previewImageURL": "https://static-cdn.jtvnw.net/previews-ttv/live_user_elxokas-1920x1080.jpg"
+    },
+    "videos": {"edges": []}
+}
+
+
+def answer(request):
+    operations = json.loads(request['body'])
+    results = []
+    for operation in operations:
+        login = operation['variables']['login']
+        if login == 'missing':
+            results.append({"data": {"user": None}})
+        elif login == 'broken':
+            results.append({"errors": [{"message": "service timeout"}], "data": None})
+        elif login == 'truncated':
+            # Twitch drops trailing operations it could not run
+            break
+        elif login == 'elxokas':
+            results.append({"data": {"user": recorded_live}})
+        else:
+            results.append({"data": {"user": dict(recorded_offline, login=login, displayName=login.title())}})
+    return 200, {'Content-Type': 'application/json'}, json.dumps(results)
+
+
+class GqlMetadataTest(unittest.TestCase):
+    def setUp(self):
+        self.standin = StandIn(answer)
+        self.gql_url = twitch.gql_url
+        twitch.gql_url = f"{self.standin.url}/gql"
+
+    def tearDown(self):
+        twitch.gql_url = self.gql_url
+        self.standin.close()
+
+    def test_batches_of_35(self):
+        logins = [f"channel{index}" for index in range(80)]
+        metadata = twitch.get_channels_metadata(logins)
+
+        sizes = [len(json.loads(request['body'])) for request in self.standin.requests]
+        self.assertEqual(sizes, [35, 35, 10])
+        self.assertEqual(sorted(metadata), sorted(logins))
+        self.assertEqual(metadata['channel79']['name'], 'Channel79')
+        self.assertEqual(metadata['channel79']['latest_vod'], '2203618931')
+
+    def test_missing_and_null_users(self):
+        metadata = twitch.get_channels_metadata(['revenant', 'missing', 'broken', 'elxokas', 'truncated', 'after'])
+
+        self.assertEqual(sorted(metadata), ['elxokas', 'revenant'])
+
+    def test_offline_channel(self):
+        metadata = twitch.get_channels_metadata(['revenant'])['revenant']
+
+        self.assertEqual(metadata['direct'], [''])
+        self.assertEqual(metadata['images']['poster'], recorded_offline['profileImageURL'])
+        self.assertEqual(metadata['images']['landscape'], recorded_offline['bannerImageURL'])
+        self.assertEqual(metadata['latest_vod'], '2203618931')
+
+    def test_live_channel(self):
+        metadata = twitch.get_channels_metadata(['elxokas'])['elxokas']
+
+        # Same layout yt-dlp prints, with the separator escaped out of the title
+        self.assertEqual(metadata['direct'], [
+            '"41375517245;DIRECTO, charla y juegos;NA;{};20240711"'.format(recorded_live['stream']['previewImageURL'])
+        ])
+        self.assertEqual(metadata['name'], 'ElXokas')
+        self.assertEqual(metadata['images']['landscape'], '')
+        self.assertIsNone(metadata['latest_vod'])
+
+    def test_sent_query(self):
+        twitch.get_channels_metadata(['revenant'])
+
+        request = self.standin.requests[0]
+        self.assertEqual(request['method'], 'POST')
+        self.assertEqual(request['headers']['Client-Id'], twitch.client_id)
+        self.assertEqual(json.loads(request['body']), [{"query": twitch.gql_query, "variables": {"login": "revenant"}}])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,241 @@
+"""
+Atom feed pre-check against a local stand-in of youtube.com/feeds.
+"""
+
+import os
+import sys
+import time
+import unittest
+from datetime import datetime, timedelta
+from urllib.parse import parse_qs, urlparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from standin import StandIn, base_dir  # noqa: E402
+
+from plugins.youtube import youtube  # noqa: E402
+from plugins.youtube.feed import Feed  # noqa: E402
+
+channel = 'https://www.youtube.com/@standin'
+channel_id = 'UCstandin0000000000000000'
+etag = '"feed-v2"'
+last_modified = 'Thu, 11 Jul 2024 18:02:13 GMT'
+
+
+def days_ago(days):
+    return datetime.now() - timedelta(days=days)
+
+
+def feed_xml(video_ids, ages):
+    """Feed entries published ages[video_id] days ago, one day apart by default"""
+    entries = ''.join(f"""
+    <entry>
+        <id>yt:video:{video_id}</id>
+        <yt:videoId>{video_id}</yt:videoId>
+        <yt:channelId>{channel_id}</yt:channelId>
+        <title>Video {video_id}</title>
+        <published>{days_ago(ages.get(video_id, index)).strftime('%Y-%m-%d')}T12:00:00+00:00</published>
+    </entry>""" for index, video_id in enumerate(video_ids))
+    return f"""<?xml version="1.0" encoding="UTF-8"?>
+<feed xmlns:yt="http://www.youtube.com/xml/schemas/2015" xmlns:media="http://search.yahoo.com/mrss/" xmlns="http://www.w3.org/2005/Atom">
+    <title>Stand-in</title>{entries}
+</feed>"""
+
+
+class FeedServer:
+    """Serves feed_xml(video_ids, ages) with validators, 304 when the client already has them"""
+
+    def __init__(self):
+        self.video_ids = ['new2', 'new1', 'old2', 'old1']
+        self.ages = {}
+        self.status = 200
+        self.standin = StandIn(self.answer)
+
+    def answer(self, request):
+        if self.status != 200:
+            return self.status, {}, 'unavailable'
+        if request['headers'].get('If-None-Match') == etag:
+            return 304, {}, ''
+        return 200, {'Content-Type': 'text/xml', 'ETag': etag, 'Last-Modified': last_modified}, feed_xml(self.video_ids, self.ages)
+
+
+class FakeCadence:
+    def __init__(self):
+        self.syncs = []
+
+    def record_sync(self, channel, uploads=None):
+        self.syncs.append((channel, uploads))
+
+
+class FakeYoutube:
+    """Youtube stand-in for sync_from_feed, extracts every requested ID"""
+    written = []
+    missing = set()
+
+    def __init__(self, channel):
+        self.channel = channel
+
+    def get_videos_by_id(self, video_ids):
+        return [{'id': video_id, 'upload_date': '20240710'} for video_id in video_ids if video_id not in self.missing]
+
+    def write_video_files(self, video, folder_path, folder_name, channel_id):
+        FakeYoutube.written.append(video['id'])
+
+
+class FeedTest(unittest.TestCase):
+    def setUp(self):
+        self.server = FeedServer()
+        self.folder_path = os.path.join(base_dir, 'media', 'youtube', 'standin')
+        os.makedirs(self.folder_path, exist_ok=True)
+        for file_name in os.listdir(self.folder_path):
+            os.remove(os.path.join(self.folder_path, file_name))
+        if os.path.exists(os.path.join('logs', 'youtube_feeds.json')):
+            os.remove(os.path.join('logs', 'youtube_feeds.json'))
+
+        self.feed = Feed({'rss_precheck': True, 'rss_feed_url': f"{self.server.standin.url}/feeds/videos.xml"})
+        self.feed.remember(channel, channel_id, self.folder_path, 'standin')
+
+        self.youtube = youtube.Youtube
+        self.videos_limit = youtube.videos_limit
+        youtube.Youtube = FakeYoutube
+        FakeYoutube.written = []
+        FakeYoutube.missing = set()
+
+    def tearDown(self):
+        youtube.Youtube = self.youtube
+        youtube.videos_limit = self.videos_limit
+        self.server.standin.close()
+
+    def library(self, *video_ids):
+        for video_id in video_ids:
+            with open(os.path.join(self.folder_path, f"{video_id}.strm"), 'w', encoding='utf-8') as f:
+                f.write(f"http://127.0.0.1:5000/youtube/direct/{video_id}")
+
+    def test_fetch_and_parse(self):
+        status, entries, validators = self.feed.fetch(channel)
+
+        self.assertEqual(status, 'ok')
+        self.assertEqual([entry['id'] for entry in entries], ['new2', 'new1', 'old2', 'old1'])
+        self.assertEqual(entries[0]['upload_date'], days_ago(0).strftime('%Y%m%d'))
+        self.assertEqual(entries[0]['channel_id'], channel_id)
+        self.assertEqual(validators, {'etag': etag, 'last_modified': last_modified})
+        # Long-form uploads only, like the /videos tab the full sync lists
+        query = parse_qs(urlparse(self.server.standin.requests[0]['path']).query)
+        self.assertEqual(query, {'playlist_id': ['UULF' + channel_id[2:]]})
+
+    def test_streams_source_reads_live_uploads(self):
+        streams = f"{channel}/streams"
+        self.feed.remember(streams, channel_id, self.folder_path, 'standin')
+
+        self.feed.fetch(streams)
+
+        query = parse_qs(urlparse(self.server.standin.requests[0]['path']).query)
+        self.assertEqual(query, {'playlist_id': ['UULV' + channel_id[2:]]})
+
+    def test_conditional_get(self):
+        self.feed.commit(channel, {'etag': etag, 'last_modified': last_modified})
+
+        status, entries, _ = self.feed.fetch(channel)
+
+        headers = self.server.standin.requests[0]['headers']
+        self.assertEqual(headers['If-None-Match'], etag)
+        self.assertEqual(headers['If-Modified-Since'], last_modified)
+        self.assertEqual((status, entries), ('not_modified', []))
+        # Validators survive a reload from logs/
+        self.assertEqual(Feed({}).state[channel]['etag'], etag)
+
+    def test_errors(self):
+        self.server.status = 404
+        self.assertEqual(self.feed.fetch(channel)[0], 'error')
+
+        self.server.status = 200
+        self.server.video_ids = ['<broken']
+        self.assertEqual(self.feed.fetch(channel)[0], 'error')
+
+    def test_new_channel_id_drops_validators(self):
+        self.feed.commit(channel, {'etag': etag, 'last_modified': last_modified})
+        self.feed.remember(channel, 'PLstandin', self.folder_path, 'standin')
+
+        self.assertNotIn('etag', self.feed.state[channel])
+        self.feed.fetch(channel)
+        query = parse_qs(urlparse(self.server.standin.requests[0]['path']).query)
+        self.assertEqual(query, {'playlist_id': ['PLstandin']})
+
+    def test_can_precheck(self):
+        self.assertTrue(self.feed.can_precheck(channel))
+        self.assertFalse(self.feed.can_precheck('https://www.youtube.com/@unknown'))
+        self.assertFalse(Feed({}).can_precheck(channel))
+
+        self.feed.state[channel]['last_full_sync'] = time.time() - self.feed.full_sync_interval - 1
+        self.assertFalse(self.feed.can_precheck(channel))
+
+        self.feed.state['https://music.youtube.com/channel/x'] = dict(self.feed.state[channel], last_full_sync=time.time())
+        self.assertFalse(self.feed.can_precheck('https://music.youtube.com/channel/x'))
+
+    def test_sync_writes_only_new_videos(self):
+        self.library('old1', 'old2')
+        cadence = FakeCadence()
+
+        self.assertTrue(youtube.sync_from_feed(channel, self.feed, cadence))
+
+        self.assertEqual(FakeYoutube.written, ['new2', 'new1'])
+        self.assertEqual(self.feed.state[channel]['etag'], etag)
+        self.assertEqual([video_id for video_id, _ in cadence.syncs[0][1]], ['new2', 'new1', 'old2', 'old1'])
+
+        # The next run is a 304 and writes nothing
+        self.assertTrue(youtube.sync_from_feed(channel, self.feed, cadence))
+        self.assertEqual(FakeYoutube.written, ['new2', 'new1'])
+        self.assertEqual(cadence.syncs[1], (channel, None))
+
+    def test_skips_entries_outside_window(self):
+        # days_dateafter is 10 in the example config
+        self.server.video_ids = ['new2', 'new1', 'stale', 'old1']
+        self.server.ages = {'stale': 30, 'old1': 31}
+        self.library('old1')
+
+        self.assertTrue(youtube.sync_from_feed(channel, self.feed, FakeCadence()))
+
+        self.assertEqual(FakeYoutube.written, ['new2', 'new1'])
+
+    def test_entries_older_than_library_are_known(self):
+        # gap fell outside videos_limit on the full sync
+        self.server.video_ids = ['new1', 'old2', 'gap', 'old1']
+        self.library('old1', 'old2')
+
+        self.assertTrue(youtube.sync_from_feed(channel, self.feed, FakeCadence()))
+
+        self.assertEqual(FakeYoutube.written, ['new1'])
+
+    def test_caps_new_entries_at_videos_limit(self):
+        youtube.videos_limit = '1'
+        self.library('old1', 'old2')
+
+        self.assertTrue(youtube.sync_from_feed(channel, self.feed, FakeCadence()))
+
+        self.assertEqual(FakeYoutube.written, ['new2'])
+
+    def test_partial_extraction_keeps_validators(self):
+        self.library('old1', 'old2')
+        FakeYoutube.missing = {'new1'}
+
+        self.assertTrue(youtube.sync_from_feed(channel, self.feed, FakeCadence()))
+
+        self.assertEqual(FakeYoutube.written, ['new2'])
+        self.assertNotIn('etag', self.feed.state[channel])
+
+    def test_fallback_to_full_sync(self):
+        # Empty library
+        self.assertFalse(youtube.sync_from_feed(channel, self.feed, FakeCadence()))
+
+        # No overlap, the gap may be longer than the feed
+        self.library('older')
+        self.assertFalse(youtube.sync_from_feed(channel, self.feed, FakeCadence()))
+
+        # Feed unavailable
+        self.library('old1')
+        self.server.status = 404
+        self.assertFalse(youtube.sync_from_feed(channel, self.feed, FakeCadence()))
+        self.assertEqual(FakeYoutube.written, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,28 @@
+"""
+Which channel entries the resolver may cache as a single uploads playlist.
+"""
+
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import standin  # noqa: E402,F401
+
+from plugins.youtube.resolver import Resolver  # noqa: E402
+
+
+class ResolverTest(unittest.TestCase):
+    def test_handles_containing_list(self):
+        for channel in ('@playlistnews', '@listenup', 'https://www.youtube.com/@listenup'):
+            self.assertFalse(Resolver.is_playlist(channel))
+            self.assertTrue(Resolver.is_cacheable(channel))
+
+    def test_playlists(self):
+        for channel in ('list-PLabc123', 'https://www.youtube.com/playlist?list=PLabc123',
+                        'https://www.youtube.com/watch?v=abc&list=PLabc123', 'PLabc123', 'UUabc123'):
+            self.assertFalse(Resolver.is_cacheable(channel))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,181 @@
+"""
+WebSub subscriptions and notifications against a local stand-in of the hub.
+"""
+
+import hashlib
+import hmac
+import os
+import queue
+import sys
+import time
+import unittest
+from urllib.parse import parse_qs
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from standin import StandIn  # noqa: E402
+
+from flask import Flask  # noqa: E402
+
+from plugins.youtube.routes import youtube_bp  # noqa: E402
+from plugins.youtube.websub import topic_url  # noqa: E402
+from plugins.youtube.youtube import websub  # noqa: E402
+
+secret = 'hub-secret'
+channel = 'https://www.youtube.com/@standin'
+channel_id = 'UCstandin0000000000000000'
+topic = topic_url.format(channel_id)
+
+app = Flask('websub-test')
+app.register_blueprint(youtube_bp)
+
+
+def notification(channel_ids):
+    entries = ''.join(f"""
+    <entry>
+        <id>yt:video:video-{index}</id>
+        <yt:videoId>video-{index}</yt:videoId>
+        <yt:channelId>{notified_channel}</yt:channelId>
+        <title>Video {index}</title>
+        <published>2024-07-11T18:02:13+00:00</published>
+    </entry>""" for index, notified_channel in enumerate(channel_ids))
+    return f"""<?xml version="1.0" encoding="UTF-8"?>
+<feed xmlns:yt="http://www.youtube.com/xml/schemas/2015" xmlns="http://www.w3.org/2005/Atom">{entries}
+</feed>""".encode('utf-8')
+
+
+def signed(body, algorithm='sha1', key=secret):
+    return f"{algorithm}={hmac.new(key.encode('utf-8'), body, getattr(hashlib, algorithm)).hexdigest()}"
+
+
+class Hub:
+    """Accepts (un)subscribe requests and verifies them through the callback before answering, like a real hub"""
+
+    def __init__(self):
+        self.client = app.test_client()
+        self.verify = True
+        self.lease_seconds = '3600'
+        self.verifications = []
+        self.standin = StandIn(self.answer)
+
+    def answer(self, request):
+        form = {key: values[0] for key, values in parse_qs(request['body'].decode('utf-8')).items()}
+        if self.verify:
+            response = self.client.get('/youtube/websub', query_string={
+                'hub.mode': form['hub.mode'],
+                'hub.topic': form['hub.topic'],
+                'hub.challenge': 'challenge-123',
+                'hub.lease_seconds': self.lease_seconds
+            })
+            self.verifications.append((response.status_code, response.get_data(as_text=True)))
+        return 202, {}, ''
+
+    def requests(self):
+        return [{key: values[0] for key, values in parse_qs(request['body'].decode('utf-8')).items()}
+                for request in self.standin.requests]
+
+
+class WebSubTest(unittest.TestCase):
+    def setUp(self):
+        self.hub = Hub()
+        self.saved = {key: getattr(websub, key) for key in ('hub_url', 'callback_url', 'secret', 'state', 'ingest_queue', 'queued')}
+        websub.hub_url = f"{self.hub.standin.url}/subscribe"
+        websub.callback_url = 'http://127.0.0.1:5000/youtube/websub'
+        websub.secret = secret
+        websub.state = {}
+        websub.ingest_queue = queue.Queue()
+        websub.queued = set()
+        self.client = app.test_client()
+
+    def tearDown(self):
+        for key, value in self.saved.items():
+            setattr(websub, key, value)
+        self.hub.standin.close()
+
+    def queued(self):
+        return list(websub.ingest_queue.queue)
+
+    def test_subscribe_verification(self):
+        self.assertTrue(websub.subscribe(topic, channel))
+
+        sent = self.hub.requests()[0]
+        self.assertEqual((sent['hub.mode'], sent['hub.topic'], sent['hub.secret']), ('subscribe', topic, secret))
+        self.assertEqual(self.hub.verifications, [(200, 'challenge-123')])
+        self.assertAlmostEqual(websub.state[topic]['lease_expires'], time.time() + 3600, delta=60)
+
+    def test_bad_lease_seconds(self):
+        self.hub.lease_seconds = 'forever'
+
+        websub.subscribe(topic, channel)
+
+        self.assertEqual(self.hub.verifications, [(200, 'challenge-123')])
+        self.assertAlmostEqual(websub.state[topic]['lease_expires'], time.time() + websub.lease_seconds, delta=60)
+
+    def test_mismatched_verification(self):
+        self.hub.verify = False
+        websub.subscribe(topic, channel)
+
+        for args in ({'hub.mode': 'unsubscribe', 'hub.topic': topic, 'hub.challenge': 'x'},
+                     {'hub.mode': 'subscribe', 'hub.topic': topic_url.format('UCother'), 'hub.challenge': 'x'},
+                     {'hub.mode': 'subscribe', 'hub.topic': topic},
+                     {'hub.mode': 'denied', 'hub.topic': topic, 'hub.challenge': 'x'}):
+            self.assertEqual(self.client.get('/youtube/websub', query_string=args).status_code, 404)
+        self.assertNotIn('lease_expires', websub.state[topic])
+
+    def test_check_signature(self):
+        body = notification([channel_id])
+
+        self.assertTrue(websub.check_signature(body, signed(body, 'sha1')))
+        self.assertTrue(websub.check_signature(body, signed(body, 'sha256')))
+        self.assertFalse(websub.check_signature(body, signed(body, 'sha256', 'wrong')))
+        self.assertFalse(websub.check_signature(body + b' ', signed(body, 'sha1')))
+        self.assertFalse(websub.check_signature(body, signed(body, 'md5')))
+        self.assertFalse(websub.check_signature(body, None))
+
+    def test_receive_only_subscribed_topics(self):
+        websub.subscribe(topic, channel)
+        body = notification([channel_id, 'UCunsubscribed000000000000'])
+
+        response = self.client.post('/youtube/websub', data=body, headers={'X-Hub-Signature': signed(body)})
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(self.queued(), [(channel_id, 'video-0')])
+
+        # A forged notification is acknowledged but ignored
+        self.client.post('/youtube/websub', data=notification([channel_id] * 2), headers={'X-Hub-Signature': signed(body)})
+        self.assertEqual(self.queued(), [(channel_id, 'video-0')])
+
+    def test_renew_retries_unverified_unsubscribe(self):
+        websub.subscribe(topic, channel)
+        self.hub.verify = False
+
+        websub.renew({})
+        websub.renew({})
+        self.assertEqual([sent['hub.mode'] for sent in self.hub.requests()], ['subscribe', 'unsubscribe'])
+
+        websub.state[topic]['requested_at'] -= websub.renew_interval + 1
+        websub.renew({})
+        self.assertEqual([sent['hub.mode'] for sent in self.hub.requests()], ['subscribe', 'unsubscribe', 'unsubscribe'])
+
+    def test_renew_drops_expired_unsubscribe(self):
+        websub.subscribe(topic, channel)
+        self.hub.verify = False
+        websub.renew({})
+
+        websub.state[topic]['lease_expires'] = time.time() - 1
+        websub.renew({})
+
+        self.assertNotIn(topic, websub.state)
+        self.assertEqual(len(self.hub.requests()), 2)
+
+    def test_renew_resubscribes_readded_channel(self):
+        websub.subscribe(topic, channel)
+        self.hub.verify = False
+        websub.renew({})
+
+        websub.renew({channel: channel_id})
+
+        self.assertEqual([sent['hub.mode'] for sent in self.hub.requests()], ['subscribe', 'unsubscribe', 'subscribe'])
+        self.assertEqual(websub.state[topic]['mode'], 'subscribe')
+
+
+if __name__ == '__main__':
+    unittest.main()
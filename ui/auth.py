@@ -6,7 +6,11 @@ import time
 import json
 import os
 import bcrypt
+import heapq
 import ipaddress
+import threading
+from collections import deque
+from itertools import islice
 from datetime import datetime, timedelta
 from functools import wraps
 from flask import session, request, redirect, url_for, jsonify, render_template
@@ -15,6 +19,46 @@ import logging
 logger = logging.getLogger(__name__)
 
 
+class NetworkTrie:
+    """
+    Binary prefix trie of whitelisted networks, one per IP version.
+    A lookup walks at most the address length in bits, however many
+    networks are listed.
+    """
+
+    def __init__(self, networks=()):
+        self.roots = {4: {}, 6: {}}
+        self.networks = []
+        for network in networks:
+            self.add(network)
+
+    def add(self, network):
+        node = self.roots[network.version]
+        bits = int(network.network_address)
+        for position in range(network.max_prefixlen - 1, network.max_prefixlen - 1 - network.prefixlen, -1):
+            node = node.setdefault((bits >> position) & 1, {})
+        node['network'] = network
+        self.networks.append(network)
+
+    def lookup(self, ip):
+        """Shortest whitelisted network containing an address, or None"""
+        node = self.roots[ip.version]
+        bits = int(ip)
+        for position in range(ip.max_prefixlen - 1, -1, -1):
+            if 'network' in node:
+                return node['network']
+            node = node.get((bits >> position) & 1)
+            if node is None:
+                return None
+        return node.get('network')
+
+    def __len__(self):
+        return len(self.networks)
+
+    def __iter__(self):
+        return iter(self.networks)
+
+
 class AuthManager:
     """Enhanced Authentication and security manager for ytdlp2STRM with IP whitelist support"""
 
@@ -41,11 +85,26 @@ class AuthManager:
 
         # In-memory storage for failed attempts (reset on restart)
         self.failed_attempts = {}
-        self.security_logs = []
+        # Most recent security events, the oldest fall off
+        self.security_logs = deque(maxlen=1000)
 
         # Ensure logs directory exists
         os.makedirs('./logs', exist_ok=True)
 
+        # IP locks live in memory, ordered by expiry in a heap, and are
+        # written to locked.json in the background when they change
+        self.locks_lock = threading.Lock()
+        self.locked_ips = {}
+        self.lock_expiry = []
+        self.locks_dirty = threading.Event()
+        for lock in self.read_locked_file():
+            expires_at = lock.get('time_locked', 0) + self.lockout_time
+            if lock.get('ip') and time.time() < expires_at:
+                lock['expires_at'] = expires_at
+                self.locked_ips[lock['ip']] = lock
+                heapq.heappush(self.lock_expiry, (expires_at, lock['ip']))
+        threading.Thread(target=self.persist_locks, daemon=True).start()
+
         # Clean up expired locks on startup
         self.cleanup_expired_locks()
 
@@ -58,8 +117,8 @@ class AuthManager:
             logger.info("✓ IP Whitelist disabled - all IPs subject to rate limiting")
 
     def parse_ip_whitelist(self, whitelist_raw):
-        """Parse IP whitelist entries into network objects"""
-        parsed_whitelist = []
+        """Parse IP whitelist entries into a prefix trie of networks"""
+        parsed_whitelist = NetworkTrie()
 
         if not whitelist_raw:
             return parsed_whitelist
@@ -70,7 +129,7 @@ class AuthManager:
                 if '/' in ip_entry:
                     # CIDR notation (e.g., "192.168.1.0/24")
                     network = ipaddress.ip_network(ip_entry, strict=False)
-                    parsed_whitelist.append(network)
+                    parsed_whitelist.add(network)
                 else:
                     # Single IP address
                     ip = ipaddress.ip_address(ip_entry)
@@ -79,7 +138,7 @@ class AuthManager:
                         network = ipaddress.IPv4Network(f"{ip}/32")
                     else:
                         network = ipaddress.IPv6Network(f"{ip}/128")
-                    parsed_whitelist.append(network)
+                    parsed_whitelist.add(network)
 
                 logger.debug(f"Parsed whitelist entry: {ip_entry} -> {network}")
 
@@ -100,10 +159,10 @@ class AuthManager:
         try:
             client_ip = ipaddress.ip_address(ip_address)
 
-            for network in self.ip_whitelist:
-                if client_ip in network:
-                    logger.debug(f"IP {ip_address} matches whitelist entry: {network}")
-                    return True
+            network = self.ip_whitelist.lookup(client_ip)
+            if network:
+                logger.debug(f"IP {ip_address} matches whitelist entry: {network}")
+                return True
 
             logger.debug(f"IP {ip_address} not found in whitelist")
             return False
@@ -217,8 +276,8 @@ class AuthManager:
             logger.error(f"Password verification error: {e}")
             return False
 
-    def load_locked_ips(self):
-        """Load locked IPs from locked.json"""
+    def read_locked_file(self):
+        """Locks persisted by an earlier run"""
         try:
             with open(self.locked_file, 'r') as f:
                 data = json.load(f)
@@ -226,36 +285,43 @@ class AuthManager:
         except (FileNotFoundError, json.JSONDecodeError):
             return []
 
-    def save_locked_ips(self, locked_ips):
-        """Save locked IPs to locked.json"""
-        try:
-            data = {
-                'locked_ip_addresses': locked_ips,
-                'last_updated': datetime.now().isoformat()
-            }
-            with open(self.locked_file, 'w') as f:
-                json.dump(data, f, indent=4)
-        except Exception as e:
-            logger.error(f"Failed to save locked IPs: {e}")
+    def persist_locks(self):
+        """Write locked.json whenever the lock table changed, off the request path"""
+        while True:
+            self.locks_dirty.wait()
+            self.locks_dirty.clear()
+            try:
+                data = {
+                    'locked_ip_addresses': self.load_locked_ips(),
+                    'last_updated': datetime.now().isoformat()
+                }
+                temp_file = f"{self.locked_file}.tmp"
+                with open(temp_file, 'w') as f:
+                    json.dump(data, f, indent=4)
+                os.replace(temp_file, self.locked_file)
+            except Exception as e:
+                logger.error(f"Failed to save locked IPs: {e}")
+
+    def load_locked_ips(self):
+        """Active IP locks"""
+        with self.locks_lock:
+            return [dict(lock) for lock in self.locked_ips.values()]
 
     def cleanup_expired_locks(self):
-        """Clean up expired IP locks"""
-        locked_ips = self.load_locked_ips()
+        """Drop the locks whose time is up, only looking at the front of the expiry heap"""
         current_time = time.time()
-
-        # Filter out expired locks
-        active_locks = []
-        for lock in locked_ips:
-            if current_time < lock.get('time_locked', 0) + self.lockout_time:
-                active_locks.append(lock)
-            else:
-                logger.info(f"Removing expired lock for IP: {lock.get('ip')}")
-
-        # Save cleaned up list
-        if len(active_locks) != len(locked_ips):
-            self.save_locked_ips(active_locks)
-
-        return active_locks
+        removed = False
+        with self.locks_lock:
+            while self.lock_expiry and self.lock_expiry[0][0] <= current_time:
+                expires_at, ip_address = heapq.heappop(self.lock_expiry)
+                lock = self.locked_ips.get(ip_address)
+                # A newer lock on the same IP has its own heap entry
+                if lock and lock['expires_at'] == expires_at:
+                    del self.locked_ips[ip_address]
+                    removed = True
+                    logger.info(f"Removing expired lock for IP: {ip_address}")
+        if removed:
+            self.locks_dirty.set()
 
     def is_ip_locked(self, ip_address):
         """Check if IP address is locked (respects whitelist)"""
@@ -264,13 +330,11 @@ class AuthManager:
             logger.debug(f"IP {ip_address} is whitelisted, cannot be locked")
             return False, 0
 
-        locked_ips = self.cleanup_expired_locks()
-        current_time = time.time()
-
-        for lock in locked_ips:
-            if (lock.get('ip') == ip_address and
-                    current_time < lock.get('time_locked', 0) + self.lockout_time):
-                return True, lock.get('time_locked', 0) + self.lockout_time
+        self.cleanup_expired_locks()
+        with self.locks_lock:
+            lock = self.locked_ips.get(ip_address)
+            if lock and time.time() < lock['expires_at']:
+                return True, lock['expires_at']
 
         return False, 0
 
@@ -284,27 +348,34 @@ class AuthManager:
                                     ip_address)
             return False
 
-        locked_ips = self.load_locked_ips()
         current_time = time.time()
 
-        # Remove existing lock for this IP if present
-        locked_ips = [lock for lock in locked_ips if lock.get('ip') != ip_address]
-
-        # Add new lock
+        # Replaces any existing lock for this IP
         new_lock = {
             'ip': ip_address,
             'time_locked': current_time,
             'reason': reason,
             'expires_at': current_time + self.lockout_time
         }
-        locked_ips.append(new_lock)
+        with self.locks_lock:
+            self.locked_ips[ip_address] = new_lock
+            heapq.heappush(self.lock_expiry, (new_lock['expires_at'], ip_address))
+        self.locks_dirty.set()
 
-        self.save_locked_ips(locked_ips)
         self.log_security_event('ip_locked', f'IP {ip_address} locked: {reason}', ip_address)
 
         logger.warning(f"IP {ip_address} locked for {self.lockout_time} seconds: {reason}")
         return True
 
+    def unlock_ip(self, ip_address):
+        """Lift the lock on an IP address, False when it was not locked"""
+        with self.locks_lock:
+            # Its heap entry is skipped once it expires
+            removed = self.locked_ips.pop(ip_address, None) is not None
+        if removed:
+            self.locks_dirty.set()
+        return removed
+
     def log_security_event(self, event_type, details, ip_address, username=None):
         """Log security events for monitoring"""
         if not self.config.get('auth_log_events', True):
@@ -324,10 +395,6 @@ class AuthManager:
         }
         self.security_logs.append(event)
 
-        # Keep only last 1000 events in memory
-        if len(self.security_logs) > 1000:
-            self.security_logs = self.security_logs[-1000:]
-
         whitelist_status = " [WHITELISTED]" if whitelisted else ""
         logger.info(f"SECURITY EVENT [{event_type}]: {details} - IP: {ip_address}{whitelist_status} - User: {username}")
 
@@ -399,9 +466,8 @@ class AuthManager:
 
     def get_security_stats(self):
         """Get security statistics"""
-        locked_ips = self.load_locked_ips()
-        active_locks = [lock for lock in locked_ips
-                        if time.time() < lock.get('time_locked', 0) + self.lockout_time]
+        self.cleanup_expired_locks()
+        active_locks = self.load_locked_ips()
 
         # Count whitelisted vs non-whitelisted events
         whitelisted_events = sum(1 for event in self.security_logs if event.get('ip_whitelisted', False))
@@ -411,7 +477,7 @@ class AuthManager:
             'whitelisted_events': whitelisted_events,
             'active_ip_locks': len(active_locks),
             'failed_attempts': len(self.failed_attempts),
-            'recent_events': self.security_logs[-10:] if self.security_logs else [],
+            'recent_events': list(islice(reversed(self.security_logs), 10))[::-1],
             'locked_ips': active_locks,
             'whitelist_info': {
                 'enabled': self.enable_ip_whitelist,
@@ -10,7 +10,11 @@ from flask_socketio import SocketIO, emit
 import json
 from clases.log import log as l
 import re
+import hmac
+from clases.config import config as c
 from clases.worker import worker as w
+from clases.metrics.metrics import metrics
+from clases.prefetch.prefetch import prefetch
 from ui.ui import Ui
 from ui.auth import auth_manager, requires_auth, requires_admin
 import bcrypt
@@ -18,6 +22,11 @@ import ipaddress
 from logging import log as l
 _ui = Ui()
 socketio = SocketIO(app)
+YTDLP2STRM_CONFIG = c.config('config/config.json').get_config()
+metrics_enabled = str(YTDLP2STRM_CONFIG.get('ytdlp2strm_metrics', True)).lower() == 'true'
+metrics_token = str(YTDLP2STRM_CONFIG.get('ytdlp2strm_metrics_token') or '')
+if metrics_enabled:
+    metrics.instrument(app)
 logging.getLogger('werkzeug').setLevel(logging.WARNING)
 
 
@@ -90,28 +99,14 @@ def api_update_plugins():
 @app.route('/api/status', methods=['GET'])
 @requires_auth  # Add this line
 def api_status():
-    # Your existing code remains the same
+    # Served from memory, unchanged polls get 304 Not Modified
     try:
-        plugins = _ui.plugins
-        crons = _ui.crons
+        body, etag = _ui.status
 
-        # Calculate statistics
-        total_plugins = len(plugins)
-        active_plugins = len([p for p in plugins if p.get('enabled', False)])
-        total_channels = sum(len(p.get('channels', [])) for p in plugins if p.get('channels'))
-        total_crons = len(crons)
-
-        return jsonify({
-            'success': True,
-            'stats': {
-                'total_plugins': total_plugins,
-                'active_plugins': active_plugins,
-                'total_channels': total_channels,
-                'total_crons': total_crons
-            },
-            'plugins': plugins,
-            'crons': crons
-        })
+        response = app.response_class(body, mimetype='application/json')
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = 'no-cache'
+        return response.make_conditional(request)
 
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
@@ -207,6 +202,38 @@ def get_cron_params(plugin_name):
         }), 500
 
 
+def render_metrics():
+    return app.response_class(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+
+@app.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    """Prometheus scrape target, for a logged in session or with ytdlp2strm_metrics_token as a bearer token or ?token="""
+    if not metrics_enabled:
+        return jsonify({'success': False, 'error': 'Metrics are disabled'}), 404
+
+    token = request.args.get('token', '')
+    authorization = request.headers.get('Authorization', '')
+    if authorization.startswith('Bearer '):
+        token = authorization[len('Bearer '):]
+    if not token:
+        return requires_auth(render_metrics)()
+    if not metrics_token or not hmac.compare_digest(token.encode('utf-8'), metrics_token.encode('utf-8')):
+        return jsonify({'success': False, 'error': 'Invalid token'}), 403
+
+    return render_metrics()
+
+
+@app.route('/api/prefetch/jellyfin', methods=['POST'])
+def prefetch_jellyfin_webhook():
+    """Jellyfin webhook plugin target, authenticated with ?token= instead of a session"""
+    if not prefetch.check_token(request.args.get('token', '')):
+        return jsonify({'success': False, 'error': 'Invalid token'}), 403
+
+    payload = request.get_json(silent=True) or {}
+    return jsonify({'success': True, 'prefetch': prefetch.jellyfin_event(payload)})
+
+
 @app.route('/general', methods=['GET', 'POST'])
 @requires_auth
 def general_settings():
@@ -678,12 +705,7 @@ def unlock_ip():
         return jsonify({'error': 'IP address required'}), 400
 
     # Remove the IP from locked list
-    locked_ips = auth_manager.load_locked_ips()
-    original_count = len(locked_ips)
-    locked_ips = [lock for lock in locked_ips if lock.get('ip') != ip_address]
-
-    if len(locked_ips) < original_count:
-        auth_manager.save_locked_ips(locked_ips)
+    if auth_manager.unlock_ip(ip_address):
         auth_manager.log_security_event('ip_unlocked', f'IP {ip_address} manually unlocked by admin',
                                         request.remote_addr, session.get('username'))
         return jsonify({'success': True, 'message': f'IP {ip_address} unlocked'})
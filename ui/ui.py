@@ -1,3 +1,5 @@
+import copy
+import hashlib
 import json
 import shlex
 import os
@@ -26,7 +28,27 @@ try:
 except ImportError:
     SocketIO = None
 
+def read_json(path):
+    try:
+        with open(path, 'r') as file:
+            return json.load(file)
+    except Exception:
+        return None
+
+
+def read_text(path):
+    try:
+        with open(path, 'r') as file:
+            return file.read()
+    except Exception:
+        return None
+
+
 class Ui:
+    # /api/status body and ETag, with the config store version they were built from
+    status_cache = (None, None, None)
+    status_lock = threading.Lock()
+
     def __init__(self, socketio_instance: Optional[SocketIO] = None):
         self.config_file = 'config/config.json'
         self.plugins_file = 'config/plugins.py'
@@ -76,12 +98,14 @@ class Ui:
         with open(self.plugins_file, 'w', newline="") as file:
             file.write(data)
 
-    @property
-    def plugins(self):
+    def plugin_entries(self):
+        """Plugins listed in plugins.py with their config and channels, shared with the file cache"""
         plugins = []
 
         # Parse plugins.py to find available plugins
-        plugins_content = self.plugins_py
+        plugins_content = c.store.get(self.plugins_file, read_text)
+        if plugins_content is None:
+            plugins_content = self.plugins_py
 
         # Look for plugin import lines - handle your specific format
         for line in plugins_content.split('\n'):
@@ -126,31 +150,19 @@ class Ui:
                 plugin_path = f'./plugins/{plugin_name}'
 
                 # Try to load plugin config
-                config_file = f'{plugin_path}/config.json'
-                config_data = {}
-                if os.path.exists(config_file):
-                    try:
-                        with open(config_file, 'r') as f:
-                            config_data = json.load(f)
-                    except:
-                        config_data = {"name": plugin_name}
-                else:
+                config_data = c.store.get(f'{plugin_path}/config.json', read_json)
+                if not isinstance(config_data, dict):
                     config_data = {"name": plugin_name}
 
                 # Try to load channels - handle your specific structure
                 channels_file = config_data.get('channels_list_file', f'{plugin_path}/channel_list.json')
+                channels_data = c.store.get(channels_file, read_json)
                 channels = []
-                if os.path.exists(channels_file):
-                    try:
-                        with open(channels_file, 'r') as f:
-                            channels_data = json.load(f)
-                            # Handle both list format and object format
-                            if isinstance(channels_data, list):
-                                channels = channels_data
-                            elif isinstance(channels_data, dict) and 'channels' in channels_data:
-                                channels = channels_data['channels']
-                    except:
-                        channels = []
+                # Handle both list format and object format
+                if isinstance(channels_data, list):
+                    channels = channels_data
+                elif isinstance(channels_data, dict) and 'channels' in channels_data:
+                    channels = channels_data['channels']
 
                 plugin_info = {
                     'name': plugin_name,
@@ -165,6 +177,11 @@ class Ui:
 
         return plugins
 
+    @property
+    def plugins(self):
+        # Callers may edit what they get, keep the cached files intact
+        return copy.deepcopy(self.plugin_entries())
+
     @plugins.setter
     def plugins(self, data):
         config_file = data['config_file']
@@ -181,18 +198,55 @@ class Ui:
             with open(config_file, 'w') as file:
                 json.dump(data, file, indent=4)
 
-    @property
-    def crons(self):
-        data = []
-        try:
-            with open(self.crons_file, 'r') as file:
-                data = json.load(file)
-        except FileNotFoundError:
-            # Create empty crons file if it doesn't exist
+    def cron_entries(self):
+        """Crons from crons.json, shared with the file cache"""
+        data = c.store.get(self.crons_file, read_json)
+        if data is None:
+            if not os.path.exists(self.crons_file):
+                # Create empty crons file if it doesn't exist
+                self.crons = json.dumps([])
             data = []
-            self.crons = json.dumps(data)
         return data
 
+    @property
+    def crons(self):
+        return copy.deepcopy(self.cron_entries())
+
+    @property
+    def status(self):
+        """
+        (body, etag) for /api/status, served from memory until one of the
+        files behind it changes on disk.
+        """
+        # Nothing was parsed again while reading the files when the version held
+        version = c.store.version
+        plugins = self.plugin_entries()
+        crons = self.cron_entries()
+        unchanged = c.store.version == version
+
+        with Ui.status_lock:
+            cached_version, body, etag = Ui.status_cache
+            if unchanged and cached_version == version:
+                return body, etag
+
+        body = json.dumps({
+            'success': True,
+            'stats': {
+                'total_plugins': len(plugins),
+                'active_plugins': len([p for p in plugins if p.get('enabled', False)]),
+                'total_channels': sum(len(p.get('channels', [])) for p in plugins if p.get('channels')),
+                'total_crons': len(crons)
+            },
+            'plugins': plugins,
+            'crons': crons
+        })
+        etag = hashlib.sha1(body.encode('utf-8')).hexdigest()
+
+        if unchanged:
+            with Ui.status_lock:
+                Ui.status_cache = (version, body, etag)
+        return body, etag
+
     @crons.setter
     def crons(self, data):
         os.makedirs(os.path.dirname(self.crons_file), exist_ok=True)